@@ -17,7 +17,10 @@ if str(src_dir) not in sys.path:
     sys.path.append(str(src_dir))
 
 try:
-    from planner_lib.md_parser import MarkdownParser, Node
+    from planner_lib.md_parser import MarkdownParser, Node, walk, write_markdown
+    from planner_lib.parse_cache import enable_disk_cache, get_default_cache
+    from planner_lib.schema import validate_many
+    from planner_lib.file_lock import atomic_write
     from planner_lib import migrate
 except ImportError as e:
     print(f"Error importing language tools: {e}")
@@ -31,9 +34,8 @@ def transform_github_url_to_folder_name(url):
     return name
 
 def adjust_level(node, increment):
-    node.level += increment
-    for child in node.children:
-        adjust_level(child, increment)
+    for current in walk(node):
+        current.level += increment
 
 def build_master_plan(repo_url, master_plan_path):
     repo_name = transform_github_url_to_folder_name(repo_url)
@@ -62,12 +64,24 @@ def build_master_plan(repo_url, master_plan_path):
         
         print(f"Found and audited {len(md_files)} Markdown files.")
 
+        # Schema check (reported, not fatal): all files at once, in parallel
+        problems = 0
+        for md_file, errors, failure in validate_many(md_files):
+            rel_path = os.path.relpath(md_file, temp_dir)
+            if failure:
+                print(f"Warning: Could not validate {rel_path}: {failure}")
+            for error in errors:
+                print(f"Schema: {rel_path}:{error.line + 1}: {error.message}")
+            problems += len(errors)
+        if problems:
+            print(f"Found {problems} schema problems in {repo_name}.")
+
         # 2. Prepare Master Plan
         parser = MarkdownParser()
         
         if os.path.exists(master_plan_path):
             print(f"Reading existing Master Plan: {master_plan_path}")
-            master_root = parser.parse_file(str(master_plan_path))
+            master_root = get_default_cache().parse_file(str(master_plan_path), parser)
         else:
             print(f"Creating new Master Plan: {master_plan_path}")
             master_root = Node(0, "Root")
@@ -111,7 +125,8 @@ def build_master_plan(repo_url, master_plan_path):
 
         for md_file in md_files:
             try:
-                source_root = parser.parse_file(md_file)
+                # Unchanged files from earlier syncs hit the content-addressed cache
+                source_root = get_default_cache().parse_file(md_file, parser)
                 
                 # Each file usually has specific headers.
                 # We append source_root.children to repo_node
@@ -129,10 +144,9 @@ def build_master_plan(repo_url, master_plan_path):
             except Exception as e:
                 print(f"Warning: Failed to parse {md_file}: {e}")
 
-        # 5. Write back
-        new_content = master_root.to_markdown()
-        with open(master_plan_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
+        # 5. Write back (temp file + rename: a crash never leaves a truncated plan)
+        with atomic_write(master_plan_path) as f:
+            write_markdown(master_root, f)
         
         print(f"Successfully built Master Plan at {master_plan_path}")
 
@@ -165,7 +179,10 @@ if __name__ == "__main__":
     parser.add_argument("--master-plan", default=str(default_plan), help=f"Path to Master Plan file (default: {default_plan})")
     
     args = parser.parse_args()
-    
+
+    # Unchanged files of earlier runs are parsed from the on-disk cache
+    enable_disk_cache()
+
     if args.all:
         update_all(str(default_repolist), args.master_plan)
     else:
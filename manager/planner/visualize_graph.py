@@ -134,7 +134,8 @@ def main():
         sys.exit(1)
         
     parser = MarkdownParser()
-    root_node = parser.parse_file(target_file)
+    # Only titles and metadata are drawn; content stays unparsed
+    root_node = parser.parse_file(target_file, lazy_content=True)
     
     G = build_graph(root_node)
     G = add_dependency_edges(G)
@@ -5,8 +5,10 @@ Provides REST API endpoints for applying edits to markdown files
 with line number tracking.
 """
 
+import atexit
 import logging
 import os
+import signal
 import sys
 import traceback
 from flask import Flask, request, jsonify
@@ -20,7 +22,12 @@ from log_config import setup_logging
 setup_logging()
 
 from pathlib import Path
-from planner_lib.file_editor import apply_edits_to_file, EditValidationError
+from planner_lib.file_editor import FileEditor, EditValidationError
+from planner_lib.file_lock import file_lock
+from planner_lib.index_cache import get_default_index_cache
+from planner_lib.document_buffer import DocumentBuffer, DEFAULT_FLUSH_INTERVAL, DEFAULT_FLUSH_EVERY
+from planner_lib.query import get_query_engine, node_summary, QuerySyntaxError
+from planner_lib.search import search_file, refresh_search_index, hit_summary, DEFAULT_LIMIT
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +36,49 @@ EDITS_PENDING_MARKER = Path(os.environ.get(
     "REPO_MOUNT_POINT", os.path.join(current_dir, os.pardir)
 )) / ".edits_pending"
 
+# Edits must carry the version token (node_hash) of the node they are based
+# on; set EDIT_REQUIRE_VERSION=0 to also accept edits without one
+REQUIRE_EDIT_VERSION = os.environ.get("EDIT_REQUIRE_VERSION", "1") != "0"
+
+# EDIT_BUFFER=1 keeps edited plans in memory and writes them behind: after
+# EDIT_FLUSH_INTERVAL seconds, after EDIT_FLUSH_EVERY edits of a file, on
+# POST /api/flush (Streamlit calls it before git operations) and on shutdown
+EDIT_BUFFER = os.environ.get("EDIT_BUFFER", "0") == "1"
+EDIT_FLUSH_INTERVAL = float(os.environ.get("EDIT_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+EDIT_FLUSH_EVERY = int(os.environ.get("EDIT_FLUSH_EVERY", DEFAULT_FLUSH_EVERY))
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 
+# One parsed document per file, shared by editors, /api/query and /api/search
+# (the query engine and search index are built over its tree)
+if EDIT_BUFFER:
+    document_cache = DocumentBuffer(flush_interval=EDIT_FLUSH_INTERVAL, flush_every=EDIT_FLUSH_EVERY)
+    atexit.register(document_cache.close)
+else:
+    document_cache = get_default_index_cache()
+
+
+def _after_file_edit(file_path):
+    """Bookkeeping after a successful edit: pending-push marker and search index."""
+    EDITS_PENDING_MARKER.touch()
+    try:
+        refresh_search_index(file_path, document_cache)
+    except Exception:
+        logger.exception("search index refresh failed", extra={"file_path": file_path})
+
+
+def _conflict_response(editor, message):
+    """409 with the node's current state, so the client can show it and retry."""
+    return jsonify({
+        "success": False,
+        "conflict": True,
+        "error": message,
+        "current": editor.last_conflict
+    }), 409
+
+
 @app.route('/api/save_edits', methods=['POST'])
 def save_edits():
     """
@@ -45,18 +91,28 @@ def save_edits():
             "id": "node.id",
             "title": "Node Title"
         },
+        "version": "<node_hash of the node as loaded>",
         "metadata_edits": {
-            "key": {"value": "new_value", "line_number": 123}
+            "key": {"value": "new_value"}
         },
         "content_edit": {
-            "value": "new content",
-            "start_line": 125,
-            "end_line": 127
+            "value": "new content"
         }
     }
 
+    The node is found by node_identifier in a cached index of the file (kept
+    while the file is unchanged), and the edit is applied at its current
+    lines. Older clients may still send "line_number" / "start_line" and
+    "end_line"; they are then checked against the node.
+
+    Line numbers are taken from the node's current position, so edits made
+    elsewhere in the file in the meantime do not matter. If the node itself
+    changed since it was loaded (its node_hash differs from "version"), the
+    edit is refused with 409 and the node's current state in "current".
+
     Returns:
-        JSON response with success status and message
+        JSON response with success status and message; on success "nodes"
+        holds the edited node's new state (including its new node_hash)
     """
     try:
         # Get JSON payload — log raw body on parse errors
@@ -82,15 +138,20 @@ def save_edits():
         logger.info("save_edits called", extra={"node_id": node_id, "file_path": file_path})
 
         # Apply edits
-        success, message = apply_edits_to_file(edits)
+        editor = FileEditor(require_version=REQUIRE_EDIT_VERSION, index_cache=document_cache)
+        success, message = editor.apply_edits(edits)
 
         if success:
             logger.info("save_edits succeeded", extra={"node_id": node_id, "file_path": file_path})
-            EDITS_PENDING_MARKER.touch()
+            _after_file_edit(file_path)
             return jsonify({
                 "success": True,
-                "message": message
+                "message": message,
+                "nodes": editor.updated_nodes
             })
+        elif editor.conflict:
+            logger.warning("save_edits conflict", extra={"node_id": node_id, "file_path": file_path, "error": message})
+            return _conflict_response(editor, message)
         else:
             logger.warning("save_edits failed", extra={"node_id": node_id, "file_path": file_path, "error": message})
             return jsonify({
@@ -116,6 +177,224 @@ def save_edits():
         }), 500
 
 
+@app.route('/api/save_edits_batch', methods=['POST'])
+def save_edits_batch():
+    """
+    Apply edits to many nodes of one markdown file in a single write.
+
+    All edits are validated against the current file first; if any is
+    invalid (or two edits touch the same lines) nothing is written.
+
+    Expected JSON payload:
+    {
+        "file_path": "/path/to/file.md",
+        "edits": [
+            {
+                "node_identifier": {"id": "node.id", "title": "Node Title"},
+                "version": "<node_hash of the node as loaded>",
+                "metadata_edits": {"status": {"value": "done"}},
+                "content_edit": {"value": "new content"}
+            },
+            ...
+        ]
+    }
+
+    A conflict in any edit (see /api/save_edits) refuses the whole batch
+    with 409; "current" then names the edit ("edit": 1-based number).
+
+    Returns:
+        JSON response with success status and message; on success "nodes"
+        holds the new state of each edited node, in the order of "edits"
+    """
+    try:
+        raw_body = request.get_data(as_text=True)
+        try:
+            batch = request.json
+        except Exception:
+            logger.exception("save_edits_batch JSON parse error", extra={"raw_body": raw_body[:1_048_576]})
+            return jsonify({
+                "success": False,
+                "error": "Invalid JSON payload"
+            }), 400
+
+        if not batch or not isinstance(batch, dict):
+            logger.warning("save_edits_batch empty payload", extra={"raw_body": (raw_body or "")[:1_048_576]})
+            return jsonify({
+                "success": False,
+                "error": "No JSON payload provided"
+            }), 400
+
+        file_path = batch.get("file_path", "unknown")
+        edit_count = len(batch.get("edits") or [])
+        logger.info("save_edits_batch called", extra={"file_path": file_path, "edit_count": edit_count})
+
+        editor = FileEditor(require_version=REQUIRE_EDIT_VERSION, index_cache=document_cache)
+        success, message = editor.apply_edits_batch(batch)
+
+        if success:
+            logger.info("save_edits_batch succeeded", extra={"file_path": file_path, "edit_count": edit_count})
+            _after_file_edit(file_path)
+            return jsonify({
+                "success": True,
+                "message": message,
+                "nodes": editor.updated_nodes
+            })
+        elif editor.conflict:
+            logger.warning("save_edits_batch conflict",
+                           extra={"file_path": file_path, "edit_count": edit_count, "error": message})
+            return _conflict_response(editor, message)
+        else:
+            logger.warning("save_edits_batch failed",
+                           extra={"file_path": file_path, "edit_count": edit_count, "error": message})
+            return jsonify({
+                "success": False,
+                "error": message
+            }), 400
+
+    except Exception as e:
+        logger.exception("save_edits_batch unexpected error")
+        tb_lines = traceback.format_exception(type(e), e, e.__traceback__)
+        tb_short = "".join(tb_lines[-4:])
+        return jsonify({
+            "success": False,
+            "error": f"Server error: {str(e)}",
+            "trace": tb_short
+        }), 500
+
+
+@app.route('/api/query', methods=['GET', 'POST'])
+def query_nodes():
+    """
+    Find nodes of a markdown file by metadata filter expression.
+
+    Parameters (query string for GET, JSON body for POST):
+    {
+        "file_path": "/path/to/file.md",
+        "q": "status=todo AND priority IN (high, critical) AND UNDER repo-x",
+        "limit": 100   (optional)
+    }
+
+    Returns:
+        JSON response with the total match count and the matching nodes in
+        document order (id, title, level, header_line, metadata)
+    """
+    if request.method == 'POST':
+        params = request.get_json(silent=True) or {}
+    else:
+        params = request.args
+    file_path = params.get("file_path")
+    expression = params.get("q")
+    if not file_path or not expression:
+        return jsonify({
+            "success": False,
+            "error": "Missing required parameters: file_path and q"
+        }), 400
+
+    try:
+        limit = int(params.get("limit", 0)) or None
+        # The nodes are the editors' too: read them under the file's lock
+        with file_lock(file_path):
+            count, nodes = get_query_engine(file_path, index_cache=document_cache).search(expression, limit)
+            return jsonify({
+                "success": True,
+                "count": count,
+                "nodes": [node_summary(node) for node in nodes]
+            })
+    except QuerySyntaxError as e:
+        return jsonify({
+            "success": False,
+            "error": f"Query error: {str(e)}"
+        }), 400
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        logger.exception("query unexpected error")
+        return jsonify({
+            "success": False,
+            "error": f"Server error: {str(e)}"
+        }), 500
+
+
+@app.route('/api/search', methods=['GET', 'POST'])
+def search_nodes():
+    """
+    Fuzzy search node titles, ids and content (autocomplete, jump-to-node).
+
+    Parameters (query string for GET, JSON body for POST):
+    {
+        "file_path": "/path/to/file.md",
+        "q": "authentcation",
+        "limit": 20   (optional)
+    }
+
+    Returns:
+        JSON response with ranked matches, best first (id, title, level,
+        header_line, content_start, content_end, score, match)
+    """
+    if request.method == 'POST':
+        params = request.get_json(silent=True) or {}
+    else:
+        params = request.args
+    file_path = params.get("file_path")
+    text = params.get("q")
+    if not file_path or not text:
+        return jsonify({
+            "success": False,
+            "error": "Missing required parameters: file_path and q"
+        }), 400
+
+    try:
+        limit = int(params.get("limit", DEFAULT_LIMIT))
+        with file_lock(file_path):
+            results = search_file(file_path, text, limit, index_cache=document_cache)
+            return jsonify({
+                "success": True,
+                "results": [hit_summary(*hit) for hit in results]
+            })
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        logger.exception("search unexpected error")
+        return jsonify({
+            "success": False,
+            "error": f"Server error: {str(e)}"
+        }), 500
+
+
+@app.route('/api/flush', methods=['POST'])
+def flush_edits():
+    """
+    Write buffered edits to disk (EDIT_BUFFER mode; a no-op otherwise).
+
+    Optional JSON payload: {"file_path": "/path/to/file.md"} flushes only
+    that file. Call before git operations on the files.
+
+    Returns:
+        JSON response with the number of files written
+    """
+    params = request.get_json(silent=True) or {}
+    file_path = params.get("file_path")
+    try:
+        flushed = document_cache.flush(file_path) if EDIT_BUFFER else 0
+        logger.info("flush succeeded", extra={"file_path": file_path, "files_written": flushed})
+        return jsonify({
+            "success": True,
+            "flushed": flushed
+        })
+    except Exception as e:
+        logger.exception("flush failed", extra={"file_path": file_path})
+        return jsonify({
+            "success": False,
+            "error": f"Flush failed: {str(e)}"
+        }), 500
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -133,6 +412,10 @@ def index():
         "version": "1.0",
         "endpoints": {
             "/api/save_edits": "POST - Apply edits to markdown files",
+            "/api/save_edits_batch": "POST - Apply edits to many nodes of one file at once",
+            "/api/query": "GET/POST - Find nodes by metadata filter expression",
+            "/api/search": "GET/POST - Fuzzy search node titles, ids and content",
+            "/api/flush": "POST - Write buffered edits to disk (EDIT_BUFFER mode)",
             "/api/health": "GET - Health check"
         }
     })
@@ -143,5 +426,9 @@ if __name__ == '__main__':
     port = int(os.environ.get('API_PORT', 8502))
     host = os.environ.get('API_HOST', '0.0.0.0')
 
+    if EDIT_BUFFER:
+        # Exit through atexit on TERM as well, so buffered edits are written
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     print(f"Starting Markdown Editor API server on {host}:{port}")
     app.run(host=host, port=port, debug=False)
@@ -18,12 +18,42 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 from git_manager import GitManager
+from planner_lib.parse_cache import get_default_cache
 import visualize_html
 
 # Marker file: Flask writes this on successful edit, Streamlit reads/clears it.
 # Bridges state between the two separate processes.
 EDITS_PENDING_MARKER = Path(os.environ.get("REPO_MOUNT_POINT", str(current_dir.parent))) / ".edits_pending"
 
+# The Flask API may buffer edits in memory (EDIT_BUFFER, same environment as
+# the API server); ask it to write them before anything reads or commits the files.
+EDIT_BUFFER = os.environ.get("EDIT_BUFFER", "0") == "1"
+API_URL = os.environ.get("API_URL", f"http://127.0.0.1:{os.environ.get('API_PORT', 8502)}")
+FLUSH_TIMEOUT = float(os.environ.get("EDIT_FLUSH_TIMEOUT", 5))
+
+
+def flush_pending_edits():
+    """
+    Have the API server write buffered edits to disk. Returns (success, error).
+
+    A no-op unless the API server buffers edits and some were made since the
+    last push (the pending-edits marker).
+    """
+    if not EDIT_BUFFER or not EDITS_PENDING_MARKER.exists():
+        return True, ""
+    try:
+        response = requests.post(f"{API_URL}/api/flush", timeout=FLUSH_TIMEOUT)
+    except requests.ConnectionError:
+        # No API server running, so nothing is buffered
+        return True, ""
+    except requests.RequestException as e:
+        logger.error("Flushing buffered edits failed", extra={"error": str(e)})
+        return False, str(e)
+    if not response.ok:
+        logger.error("Flushing buffered edits failed", extra={"status": response.status_code, "body": response.text[:1000]})
+        return False, response.text
+    return True, ""
+
 # Page Layout
 st.set_page_config(layout="wide", page_title="Master Plan Visualization")
 
@@ -47,7 +77,10 @@ git = GitManager(repo_url, repo_path, github_token)
 
 if "git_init_done" not in st.session_state:
     try:
-        # Startup sync: clone or pull latest
+        # Startup sync: clone or pull latest (after buffered edits are on disk)
+        flushed, error = flush_pending_edits()
+        if not flushed:
+            raise RuntimeError(f"Could not write buffered edits before pulling: {error}")
         success, output = git.startup_sync(branch="main")
         st.session_state["git_init_done"] = True
         st.session_state["git_output"] = output
@@ -78,10 +111,14 @@ with st.sidebar:
     with col1:
         if st.button("Git Pull ⬇️"):
             with st.spinner("Pulling..."):
-                success, output = git.pull()
+                success, output = flush_pending_edits()
+                if success:
+                    success, output = git.pull()
                 st.session_state["git_output"] = output
                 if success:
                     st.session_state["git_error"] = False
+                    # Pulled files are re-fingerprinted anyway; drop entries that can no longer hit
+                    get_default_cache().clear()
                     st.success("Pulled updates.")
                 else:
                     st.session_state["git_error"] = True
@@ -92,7 +129,9 @@ with st.sidebar:
     with col2:
         if st.button("Git Push ⬆️"):
             with st.spinner("Pushing..."):
-                success, output = git.push(message="Sync from Central Planner App")
+                success, output = flush_pending_edits()
+                if success:
+                    success, output = git.push(message="Sync from Central Planner App")
                 st.session_state["git_output"] = output
                 if success:
                     st.session_state["has_unsaved_edits"] = False
@@ -123,6 +162,9 @@ if not target_file.exists():
     st.error(f"MASTER_PLAN.md not found at {target_file}")
     st.stop()
 
+# Show edits the API server has not written yet
+flush_pending_edits()
+
 # File download — always available, independent of visualization
 with st.sidebar:
     with open(target_file, "r", encoding="utf-8") as f:
@@ -146,6 +188,7 @@ with st.spinner("Generating Visualization..."):
             str(target_file),
             embed_d3=True,
             edit_disabled=st.session_state["git_error"],
+            edits_pending=st.session_state["has_unsaved_edits"],
         )
     except Exception as e:
         logger.exception("Error generating HTML")
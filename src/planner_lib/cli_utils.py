@@ -1,4 +1,5 @@
 import argparse
+import glob
 import os
 import sys
 
@@ -126,3 +127,23 @@ def validate_and_get_pairs(args, positional_args, tool_name="Tool", allow_single
                 sys.exit(1)
 
     return input_output_pairs
+
+def expand_input_patterns(patterns):
+    """
+    Expands file arguments that may contain glob patterns (including '**').
+
+    Plain paths are kept as given (missing files are reported later by the tool);
+    patterns are expanded in sorted order. Duplicates are dropped, first occurrence wins.
+    """
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if any(char in pattern for char in '*?['):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for path in matches:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
@@ -0,0 +1,378 @@
+"""
+Dependencies Module - Analyses of the blocked_by dependency graph of a plan.
+
+The graph is built once from a parsed tree into flat adjacency arrays
+(one node per metadata id, one edge per blocked_by reference), and every
+analysis below runs in time linear in nodes + edges:
+
+1. Topological order (blockers before the nodes they block)
+2. Cycle reports (strongly connected components)
+3. Transitive blocker sets of a node
+4. The critical path, weighted by `estimate` where present
+5. The longest dependency chain inside each repository section
+
+Usable as a library (DependencyGraph) or from the command line:
+    python dependencies.py order MASTER_PLAN.md
+    python dependencies.py critical-path MASTER_PLAN.md --json
+"""
+
+import re
+import sys
+import json
+import argparse
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    from .md_parser import MarkdownParser, Node
+except ImportError:
+    from md_parser import MarkdownParser, Node
+
+# Working-time conversion for estimates like "4h", "3d", "1.5w"
+ESTIMATE_HOURS = {'h': 1.0, 'd': 8.0, 'w': 40.0}
+ESTIMATE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([hdw])\s*$', re.IGNORECASE)
+
+# Metadata type that marks a repository section in the master plan
+REPOSITORY_TYPE = 'repository'
+
+
+def parse_estimate(value) -> Optional[float]:
+    """Convert an estimate such as '4h', '3d' or '1w' to hours; None if it is not one."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = ESTIMATE_PATTERN.match(value)
+    if not match:
+        return None
+    return float(match.group(1)) * ESTIMATE_HOURS[match.group(2).lower()]
+
+
+def _blocker_refs(value) -> List[str]:
+    # blocked_by is normally a parsed list; tolerate a bare "a" or "a, b" string
+    if isinstance(value, str):
+        value = value.strip('[]').split(',')
+    if not isinstance(value, list):
+        return []
+    return [ref.strip() for ref in value if isinstance(ref, str) and ref.strip()]
+
+
+class DependencyGraph:
+    """
+    blocked_by graph of a plan in compressed adjacency form.
+
+    Vertices are the nodes that have a metadata id, numbered in document
+    order. An edge u -> v means v is blocked by u. References to unknown
+    ids are collected in `missing`; repeated ids keep their first node and
+    are listed in `duplicates`.
+    """
+
+    def __init__(self, root: Node):
+        self.ids: List[str] = []
+        self.nodes: List[Node] = []
+        self.vertex: Dict[str, int] = {}
+        # Repository title of each vertex (None outside repository sections)
+        self.repository: List[Optional[str]] = []
+        self.estimate_hours: List[Optional[float]] = []
+        self.missing: List[Tuple[str, str]] = []
+        self.duplicates: List[str] = []
+
+        refs = []
+        estimates = {}  # the same few estimate strings repeat across a plan
+        stack = [(root, None)]
+        while stack:
+            node, repository = stack.pop()
+            metadata = node.metadata
+            if metadata:
+                if metadata.get('type') == REPOSITORY_TYPE:
+                    repository = node.title
+                node_id = metadata.get('id')
+                if isinstance(node_id, str) and node_id:
+                    if node_id in self.vertex:
+                        self.duplicates.append(node_id)
+                    else:
+                        self.vertex[node_id] = len(self.ids)
+                        self.ids.append(node_id)
+                        self.nodes.append(node)
+                        self.repository.append(repository)
+                        estimate = metadata.get('estimate')
+                        if isinstance(estimate, str):
+                            if estimate not in estimates:
+                                estimates[estimate] = parse_estimate(estimate)
+                            self.estimate_hours.append(estimates[estimate])
+                        else:
+                            self.estimate_hours.append(parse_estimate(estimate))
+                        blocked_by = metadata.get('blocked_by')
+                        refs.append(_blocker_refs(blocked_by) if blocked_by else ())
+            if node.children:
+                stack.extend((child, repository) for child in reversed(node.children))
+
+        # Predecessor lists (blockers) straight from blocked_by, deduplicated
+        count = len(self.ids)
+        vertex = self.vertex
+        pred = []
+        pred_offsets = [0]
+        succ_lists = [[] for _ in range(count)]
+        for v, node_refs in enumerate(refs):
+            seen = set()
+            for ref in node_refs:
+                u = vertex.get(ref)
+                if u is None:
+                    self.missing.append((self.ids[v], ref))
+                elif u not in seen:
+                    seen.add(u)
+                    pred.append(u)
+                    succ_lists[u].append(v)
+            pred_offsets.append(len(pred))
+        self.pred = array('i', pred)
+        self.pred_offsets = array('i', pred_offsets)
+
+        # Successor lists (nodes each vertex blocks), flattened the same way
+        succ_offsets = [0]
+        total = 0
+        for successors in succ_lists:
+            total += len(successors)
+            succ_offsets.append(total)
+        self.succ = array('i', [v for successors in succ_lists for v in successors])
+        self.succ_offsets = array('i', succ_offsets)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_file(cls, file_path: str, parser: Optional[MarkdownParser] = None) -> "DependencyGraph":
+        # Only titles and metadata are used; content stays unparsed
+        parser = parser or MarkdownParser()
+        return cls(parser.parse_file(file_path, lazy_content=True))
+
+    def blockers_of(self, v: int) -> array:
+        """Direct blockers of vertex v."""
+        return self.pred[self.pred_offsets[v]:self.pred_offsets[v + 1]]
+
+    def blocked_by_of(self, v: int) -> array:
+        """Vertices directly blocked by vertex v."""
+        return self.succ[self.succ_offsets[v]:self.succ_offsets[v + 1]]
+
+    # --- Analyses ---
+
+    def _topological_vertices(self) -> List[int]:
+        # Kahn's algorithm; ties are broken by document order
+        in_degree = [self.pred_offsets[v + 1] - self.pred_offsets[v] for v in range(len(self.ids))]
+        ready = deque(v for v, degree in enumerate(in_degree) if degree == 0)
+        succ, succ_offsets = self.succ, self.succ_offsets
+        order = []
+        while ready:
+            u = ready.popleft()
+            order.append(u)
+            for i in range(succ_offsets[u], succ_offsets[u + 1]):
+                v = succ[i]
+                in_degree[v] -= 1
+                if in_degree[v] == 0:
+                    ready.append(v)
+        return order
+
+    def topological_order(self) -> List[str]:
+        """
+        Ids ordered so that every node comes after all of its blockers.
+
+        Nodes on a cycle, and everything they (transitively) block, cannot be
+        ordered and are left out; see cycles().
+        """
+        return [self.ids[v] for v in self._topological_vertices()]
+
+    def cycles(self) -> List[List[str]]:
+        """Dependency cycles as lists of ids (strongly connected components, Tarjan)."""
+        count = len(self.ids)
+        succ, succ_offsets = self.succ, self.succ_offsets
+        order = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack = []
+        counter = 0
+        components = []
+
+        for start in range(count):
+            if order[start] != -1:
+                continue
+            order[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack[start] = True
+            # Explicit DFS stack of (vertex, next successor position)
+            work = [(start, succ_offsets[start])]
+            while work:
+                v, position = work[-1]
+                if position < succ_offsets[v + 1]:
+                    work[-1] = (v, position + 1)
+                    w = succ[position]
+                    if order[w] == -1:
+                        order[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, succ_offsets[w]))
+                    elif on_stack[w] and order[w] < low[v]:
+                        low[v] = order[w]
+                    continue
+
+                work.pop()
+                if work and low[v] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[v]
+                if low[v] == order[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    if len(component) > 1 or v in self.blockers_of(v):
+                        components.append(sorted(component))
+
+        components.sort()
+        return [[self.ids[v] for v in component] for component in components]
+
+    def blockers(self, node_id: str) -> Set[str]:
+        """All ids that node_id transitively waits for (itself excluded unless on a cycle)."""
+        start = self.vertex[node_id]
+        pred, pred_offsets = self.pred, self.pred_offsets
+        seen = set()
+        pending = [start]
+        while pending:
+            v = pending.pop()
+            for i in range(pred_offsets[v], pred_offsets[v + 1]):
+                u = pred[i]
+                if u not in seen:
+                    seen.add(u)
+                    pending.append(u)
+        return {self.ids[v] for v in seen}
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """
+        Heaviest blocker chain: the ids on it (first blocker first) and its total estimate in hours.
+
+        Nodes without a parseable estimate weigh 0 hours; among chains with the
+        same total the longer one wins. Cyclic parts of the graph are skipped.
+        """
+        weights = [hours or 0.0 for hours in self.estimate_hours]
+        return self._longest_path(self._topological_vertices(), weights)
+
+    def longest_chains(self) -> Dict[Optional[str], List[str]]:
+        """
+        Longest blocker chain (by node count) inside each repository section.
+
+        Only dependencies between nodes of the same repository count. Nodes
+        outside any repository section are grouped under None.
+        """
+        order = self._topological_vertices()
+        count = len(self.ids)
+        length = [1] * count
+        previous = [-1] * count
+        pred, pred_offsets, repository = self.pred, self.pred_offsets, self.repository
+        best: Dict[Optional[str], int] = {}
+        for v in order:
+            for i in range(pred_offsets[v], pred_offsets[v + 1]):
+                u = pred[i]
+                if repository[u] == repository[v] and length[u] + 1 > length[v]:
+                    length[v] = length[u] + 1
+                    previous[v] = u
+            current = best.get(repository[v])
+            if current is None or length[v] > length[current]:
+                best[repository[v]] = v
+        return {name: self._chain(end, previous) for name, end in best.items()}
+
+    def _longest_path(self, order, weights) -> Tuple[List[str], float]:
+        total = [0.0] * len(self.ids)
+        length = [0] * len(self.ids)
+        previous = [-1] * len(self.ids)
+        pred, pred_offsets = self.pred, self.pred_offsets
+        end = -1
+        for v in order:
+            best_total, best_length = 0.0, 0
+            for i in range(pred_offsets[v], pred_offsets[v + 1]):
+                u = pred[i]
+                if (total[u], length[u]) > (best_total, best_length):
+                    best_total, best_length = total[u], length[u]
+                    previous[v] = u
+            total[v] = best_total + weights[v]
+            length[v] = best_length + 1
+            if end == -1 or (total[v], length[v]) > (total[end], length[end]):
+                end = v
+        if end == -1:
+            return [], 0.0
+        return self._chain(end, previous), total[end]
+
+    def _chain(self, end: int, previous: List[int]) -> List[str]:
+        chain = []
+        while end != -1:
+            chain.append(self.ids[end])
+            end = previous[end]
+        chain.reverse()
+        return chain
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse blocked_by dependencies of a plan.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    commands = {
+        'order': 'Print ids in topological order (blockers first).',
+        'cycles': 'Report dependency cycles; exit 1 if there are any.',
+        'blockers': 'Print every id that NODE_ID transitively waits for.',
+        'critical-path': 'Print the heaviest chain, weighted by estimate.',
+        'chains': 'Print the longest chain inside each repository section.',
+        'check': 'Report cycles, unknown blocked_by references and duplicate ids; exit 1 on any.',
+    }
+    for name, help_text in commands.items():
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        sub.add_argument('file', help='Markdown plan file')
+        if name == 'blockers':
+            sub.add_argument('node_id', help='Metadata id of the node')
+        sub.add_argument('--json', action='store_true', help='Print the result as JSON.')
+
+    args = parser.parse_args()
+
+    try:
+        graph = DependencyGraph.from_file(args.file)
+        failed = False
+
+        if args.command == 'order':
+            result = graph.topological_order()
+            text = "\n".join(result)
+        elif args.command == 'cycles':
+            result = graph.cycles()
+            failed = bool(result)
+            text = "\n".join(", ".join(cycle) for cycle in result) or "No cycles."
+        elif args.command == 'blockers':
+            if args.node_id not in graph.vertex:
+                print(f"Error: Unknown id '{args.node_id}'", file=sys.stderr)
+                sys.exit(1)
+            result = sorted(graph.blockers(args.node_id))
+            text = "\n".join(result)
+        elif args.command == 'critical-path':
+            chain, hours = graph.critical_path()
+            result = {"path": chain, "estimate_hours": hours}
+            text = "\n".join(chain + [f"Total estimate: {hours:g}h"])
+        elif args.command == 'chains':
+            chains = graph.longest_chains()
+            result = {name or "(no repository)": chain for name, chain in chains.items()}
+            text = "\n".join(f"{name}: {' -> '.join(chain)}" for name, chain in result.items())
+        else:
+            result = {
+                "cycles": graph.cycles(),
+                "missing": [{"id": node_id, "blocked_by": ref} for node_id, ref in graph.missing],
+                "duplicates": graph.duplicates,
+            }
+            failed = any(result.values())
+            lines = [f"Cycle: {', '.join(cycle)}" for cycle in result["cycles"]]
+            lines += [f"Unknown blocked_by '{ref}' in '{node_id}'" for node_id, ref in graph.missing]
+            lines += [f"Duplicate id '{node_id}'" for node_id in graph.duplicates]
+            text = "\n".join(lines) or "No dependency problems."
+
+        print(json.dumps(result, indent=2) if args.json else text)
+        sys.exit(1 if failed else 0)
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,354 @@
+"""
+Diff Module - Structural diff between two versions of a plan.
+
+Nodes of the two trees are paired instead of lines, so sections that
+update_master_plan rebuilt in a different order do not show up as noise:
+
+1. Nodes with the same metadata id are paired (ids that occur once per version)
+2. Remaining nodes are paired by title under an already paired parent
+   (the n-th sibling with a title pairs with the n-th one in the other version)
+3. Unpaired nodes are reported as added or removed; paired nodes as moved
+   (different parent), renamed, metadata-changed or content-changed
+
+Matching uses dictionaries only, so a diff costs O(n) on top of parsing
+(plus the string comparisons of node contents).
+
+Usable as a library (diff_trees, diff_files, diff_git) or from the command line:
+    python diff.py OLD.md NEW.md
+    python diff.py --git HEAD~1 MASTER_PLAN.md          # HEAD~1 against the working tree
+    python diff.py --git v1 v2 MASTER_PLAN.md --json
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .md_parser import MarkdownParser, Node
+except ImportError:
+    from md_parser import MarkdownParser, Node
+
+# Change kinds, in the order they are reported for one node
+ADDED = 'added'
+REMOVED = 'removed'
+MOVED = 'moved'
+RENAMED = 'renamed'
+METADATA = 'metadata'
+CONTENT = 'content'
+
+# Separator of titles in displayed paths
+PATH_SEPARATOR = ' > '
+
+_MARKERS = {ADDED: '+', REMOVED: '-', MOVED: '>', RENAMED: '~', METADATA: '*', CONTENT: '*'}
+
+
+class NodeChange:
+    """One difference of one node; a paired node can have several (e.g. moved and metadata)."""
+    __slots__ = ('kind', 'old', 'new', 'path', 'details')
+
+    def __init__(self, kind: str, old: Optional[Node], new: Optional[Node], path: str, details=None):
+        self.kind = kind
+        self.old = old
+        self.new = new
+        self.path = path
+        self.details = details
+
+    @property
+    def node(self) -> Node:
+        """The node in the newer version, or in the older one if it was removed."""
+        return self.new if self.new is not None else self.old
+
+    def to_dict(self) -> dict:
+        node = self.node
+        return {
+            "kind": self.kind,
+            "id": node.metadata.get('id'),
+            "title": node.title,
+            "path": self.path,
+            "old_line": None if self.old is None else self.old.header_line,
+            "new_line": None if self.new is None else self.new.header_line,
+            "details": self.details,
+        }
+
+    def __str__(self) -> str:
+        node = self.node
+        line = node.header_line
+        where = f" (line {line + 1})" if line is not None else ""
+        text = f"{_MARKERS[self.kind]} {self.kind} {self.path}{where}"
+        details = self.details
+        if self.kind == MOVED or self.kind == RENAMED:
+            text += f": {details['from']} -> {details['to']}"
+        elif self.kind == METADATA:
+            text += ": " + ", ".join(f"{key} {_format_value(old)} -> {_format_value(new)}"
+                                     for key, (old, new) in details.items())
+        elif self.kind == CONTENT:
+            text += f": {details['old_lines']} -> {details['new_lines']} lines"
+        return text
+
+    def __repr__(self) -> str:
+        return f"NodeChange({self.kind!r}, {self.path!r})"
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return "(unset)"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _top_level(root: Node) -> List[Node]:
+    # A single top-level header is returned unwrapped by the parser; compare
+    # both versions as lists of top-level nodes so either shape pairs up
+    return root.children if root.level == 0 else [root]
+
+
+class _Version:
+    """Flattened view of one tree: nodes in document order, parents, unique ids."""
+
+    def __init__(self, root: Node):
+        self.nodes: List[Node] = []
+        self.parent: Dict[int, Optional[Node]] = {}
+        by_id: Dict[str, Node] = {}
+        repeated = set()
+        stack = [(node, None) for node in reversed(_top_level(root))]
+        while stack:
+            node, parent = stack.pop()
+            self.nodes.append(node)
+            self.parent[id(node)] = parent
+            node_id = node.metadata.get('id')
+            if isinstance(node_id, str):
+                if node_id in by_id:
+                    repeated.add(node_id)
+                else:
+                    by_id[node_id] = node
+            if node.children:
+                stack.extend((child, node) for child in reversed(node.children))
+        for node_id in repeated:
+            del by_id[node_id]
+        self.by_id = by_id
+
+    def path(self, node: Optional[Node]) -> str:
+        titles = []
+        while node is not None:
+            titles.append(node.title)
+            node = self.parent[id(node)]
+        titles.reverse()
+        return PATH_SEPARATOR.join(titles) if titles else "(top level)"
+
+
+def _title_slots(children: List[Node]) -> Dict[Tuple[str, int], Node]:
+    """(title, occurrence) -> child, so repeated titles under one parent pair in order."""
+    slots = {}
+    seen: Dict[str, int] = {}
+    for child in children:
+        occurrence = seen.get(child.title, 0)
+        seen[child.title] = occurrence + 1
+        slots[(child.title, occurrence)] = child
+    return slots
+
+
+def _metadata_changes(old: dict, new: dict) -> dict:
+    changes = {}
+    for key, value in old.items():
+        if key not in new:
+            changes[key] = (value, None)
+        elif new[key] != value:
+            changes[key] = (value, new[key])
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = (None, value)
+    return changes
+
+
+def _line_count(content: str) -> int:
+    return content.count('\n') + 1 if content else 0
+
+
+def diff_trees(old_root: Node, new_root: Node) -> List[NodeChange]:
+    """
+    Structural differences between two parsed versions of a plan.
+
+    Args:
+        old_root: Tree of the older version
+        new_root: Tree of the newer version
+
+    Returns:
+        Changes of removed nodes in old document order, followed by the
+        changes of added and paired nodes in new document order.
+    """
+    old = _Version(old_root)
+    new = _Version(new_root)
+    old_top = _top_level(old_root)
+
+    # id(new node) -> paired old node; ids first, titles under paired parents second
+    partner: Dict[int, Node] = {}
+    paired_old = set()
+    for node_id, node in new.by_id.items():
+        match = old.by_id.get(node_id)
+        if match is not None:
+            partner[id(node)] = match
+            paired_old.add(id(match))
+
+    # Parents come before their children in document order
+    slots_of: Dict[Optional[int], Dict[Tuple[str, int], Node]] = {}
+    seen_titles: Dict[Optional[int], Dict[str, int]] = {}
+    for node in new.nodes:
+        parent = new.parent[id(node)]
+        key = None if parent is None else id(parent)
+        seen = seen_titles.get(key)
+        if seen is None:
+            seen = seen_titles[key] = {}
+        occurrence = seen.get(node.title, 0)
+        seen[node.title] = occurrence + 1
+        if id(node) in partner:
+            continue
+        if parent is None:
+            old_parent = None
+        else:
+            old_parent = partner.get(id(parent))
+            if old_parent is None:
+                continue
+        old_key = None if old_parent is None else id(old_parent)
+        slots = slots_of.get(old_key)
+        if slots is None:
+            slots = slots_of[old_key] = _title_slots(old_top if old_parent is None else old_parent.children)
+        match = slots.get((node.title, occurrence))
+        if match is not None and id(match) not in paired_old:
+            partner[id(node)] = match
+            paired_old.add(id(match))
+
+    changes: List[NodeChange] = []
+    for node in old.nodes:
+        if id(node) not in paired_old:
+            changes.append(NodeChange(REMOVED, node, None, old.path(node)))
+
+    for node in new.nodes:
+        match = partner.get(id(node))
+        if match is None:
+            changes.append(NodeChange(ADDED, None, node, new.path(node)))
+            continue
+        path = None
+        parent = new.parent[id(node)]
+        old_parent = old.parent[id(match)]
+        expected = None if parent is None else partner.get(id(parent))
+        if expected is not old_parent or (parent is None) != (old_parent is None):
+            path = new.path(node)
+            changes.append(NodeChange(MOVED, match, node, path,
+                                      {"from": old.path(old_parent), "to": new.path(parent)}))
+        if match.title != node.title:
+            path = path or new.path(node)
+            changes.append(NodeChange(RENAMED, match, node, path, {"from": match.title, "to": node.title}))
+        if match.metadata != node.metadata:
+            path = path or new.path(node)
+            changes.append(NodeChange(METADATA, match, node, path,
+                                      _metadata_changes(match.metadata, node.metadata)))
+        if match.content != node.content:
+            path = path or new.path(node)
+            changes.append(NodeChange(CONTENT, match, node, path, {
+                "old_lines": _line_count(match.content),
+                "new_lines": _line_count(node.content),
+            }))
+    return changes
+
+
+def diff_texts(old_text: str, new_text: str, parser: Optional[MarkdownParser] = None) -> List[NodeChange]:
+    """diff_trees over two markdown documents."""
+    parser = parser or MarkdownParser()
+    return diff_trees(parser.parse_lines(old_text.splitlines(keepends=True)),
+                      parser.parse_lines(new_text.splitlines(keepends=True)))
+
+
+def diff_files(old_path: str, new_path: str, parser: Optional[MarkdownParser] = None) -> List[NodeChange]:
+    """diff_trees over two markdown files."""
+    parser = parser or MarkdownParser()
+    return diff_trees(parser.parse_file(old_path), parser.parse_file(new_path))
+
+
+def read_git_revision(file_path: str, revision: str) -> str:
+    """
+    Contents of file_path as of a git revision.
+
+    Raises:
+        ValueError: If git cannot show the file at that revision
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    result = subprocess.run(
+        ['git', 'show', f'{revision}:./{name}'],
+        cwd=directory, capture_output=True,
+    )
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', 'replace').strip()
+        raise ValueError(f"Cannot read {name} at {revision}: {message}")
+    return result.stdout.decode('utf-8')
+
+
+def diff_git(file_path: str, old_revision: str, new_revision: Optional[str] = None,
+             parser: Optional[MarkdownParser] = None) -> List[NodeChange]:
+    """
+    diff_trees between two git revisions of a file.
+
+    Args:
+        file_path: Path of the plan inside a git work tree
+        old_revision: Older revision (any name git accepts, e.g. HEAD~1)
+        new_revision: Newer revision; None compares against the working tree
+    """
+    old_text = read_git_revision(file_path, old_revision)
+    if new_revision is None:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            new_text = f.read()
+    else:
+        new_text = read_git_revision(file_path, new_revision)
+    return diff_texts(old_text, new_text, parser)
+
+
+def summarize(changes: List[NodeChange]) -> Dict[str, int]:
+    """Number of changes per kind (every kind present, zeros included)."""
+    counts = {kind: 0 for kind in _MARKERS}
+    for change in changes:
+        counts[change.kind] += 1
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Structural diff of two plan versions (nodes paired by id, then by title).")
+    parser.add_argument('paths', nargs='+',
+                        help='OLD NEW files; with --git: [NEW_REVISION] FILE')
+    parser.add_argument('--git', metavar='REVISION',
+                        help='Compare FILE at REVISION with NEW_REVISION (default: the working tree).')
+    parser.add_argument('--json', action='store_true', help='Print the changes as JSON.')
+    parser.add_argument('--summary', action='store_true', help='Print only the number of changes per kind.')
+    parser.add_argument('--exit-code', action='store_true', help='Exit with 1 if there are differences.')
+
+    args = parser.parse_args()
+
+    try:
+        if args.git:
+            if len(args.paths) > 2:
+                parser.error("--git takes [NEW_REVISION] FILE")
+            new_revision = args.paths[0] if len(args.paths) == 2 else None
+            changes = diff_git(args.paths[-1], args.git, new_revision)
+        else:
+            if len(args.paths) != 2:
+                parser.error("expected OLD and NEW files")
+            changes = diff_files(args.paths[0], args.paths[1])
+
+        if args.summary:
+            counts = summarize(changes)
+            print(json.dumps(counts, indent=2) if args.json
+                  else "\n".join(f"{kind}: {count}" for kind, count in counts.items()))
+        elif args.json:
+            print(json.dumps([change.to_dict() for change in changes], indent=2))
+        elif changes:
+            print("\n".join(str(change) for change in changes))
+        else:
+            print("No structural changes.")
+        sys.exit(1 if args.exit_code and changes else 0)
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2 if args.exit_code else 1)
@@ -0,0 +1,208 @@
+"""
+Document Buffer Module - Resident plans with write-behind flushing.
+
+1. DocumentBuffer: an IndexCache whose commits stay in memory; the edited
+   lines, tree and NodeIndex of a file are the current version until flushed
+2. Write-behind: a background thread writes a file once its oldest pending
+   edit is flush_interval seconds old, or once flush_every edits are pending
+3. flush() writes pending edits on demand (e.g. before a git operation),
+   close() stops the thread and flushes everything (shutdown)
+
+An edit then costs the incremental update of the resident document, not a
+rewrite of the file. Readers that go through the buffer (get_query_engine,
+search_file with index_cache=buffer) see pending edits; readers of the file
+on disk see the version of the last flush.
+
+Usage:
+    buffer = DocumentBuffer(flush_interval=2.0, flush_every=50)
+    editor = FileEditor(index_cache=buffer)
+    editor.apply_edits(...)   # in memory
+    buffer.flush()            # on disk
+    buffer.close()
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from .md_parser import MarkdownParser
+    from .file_lock import file_lock
+    from .index_cache import Document, IndexCache, fingerprint
+except ImportError:
+    from md_parser import MarkdownParser
+    from file_lock import file_lock
+    from index_cache import Document, IndexCache, fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 2.0
+DEFAULT_FLUSH_EVERY = 50
+
+
+class DocumentBuffer(IndexCache):
+    """IndexCache that keeps committed documents in memory and writes them behind."""
+
+    def __init__(self, max_entries: int = 16, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 flush_every: int = DEFAULT_FLUSH_EVERY,
+                 on_flush: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            max_entries: Number of clean files kept in memory (files with
+                pending edits are always kept).
+            flush_interval: Seconds an edit may stay unwritten.
+            flush_every: Number of pending edits of one file that triggers a flush.
+            on_flush: Called with the file path after each write.
+        """
+        super().__init__(max_entries)
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.on_flush = on_flush
+        # resolved path -> [document, pending edits, time.monotonic() it is due, file path]
+        self._dirty: Dict[str, List] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.flushes = 0
+
+    def get(self, file_path: str, parser: Optional[MarkdownParser] = None) -> Document:
+        """The buffered document while edits are pending, else as IndexCache.get."""
+        with self._lock:
+            entry = self._dirty.get(self.key(file_path))
+        if entry is not None:
+            return entry[0]
+        return super().get(file_path, parser)
+
+    def commit(self, file_path: str, document: Document) -> None:
+        """Keep document as the current version of file_path; it is written later."""
+        key = self.key(file_path)
+        with self._lock:
+            if self._closed:
+                write_through = True
+            else:
+                write_through = False
+                entry = self._dirty.get(key)
+                if entry is None:
+                    entry = self._dirty[key] = [document, 0, time.monotonic() + self.flush_interval, file_path]
+                entry[0] = document
+                entry[1] += 1
+                document.version += 1
+                if entry[1] == self.flush_every:
+                    entry[2] = time.monotonic()
+                self._put(key, document)
+                wake = entry[1] == 1 or entry[1] == self.flush_every
+                self._start()
+        if write_through:
+            super().commit(file_path, document)
+        elif wake:
+            self._wake.set()
+
+    def invalidate(self, file_path: str) -> None:
+        """Drop the cached document of file_path, pending edits included."""
+        with self._lock:
+            self._dirty.pop(self.key(file_path), None)
+        super().invalidate(file_path)
+
+    def clear(self) -> None:
+        """Drop all cached documents, pending edits included."""
+        with self._lock:
+            self._dirty.clear()
+        super().clear()
+
+    def pending(self, file_path: Optional[str] = None) -> int:
+        """Number of unwritten edits (of file_path, or of all files)."""
+        with self._lock:
+            if file_path is None:
+                return sum(entry[1] for entry in self._dirty.values())
+            entry = self._dirty.get(self.key(file_path))
+            return entry[1] if entry else 0
+
+    def flush(self, file_path: Optional[str] = None) -> int:
+        """
+        Write pending edits now.
+
+        Args:
+            file_path: File to flush; None flushes every file
+
+        Returns:
+            Number of files written
+
+        Raises:
+            OSError: If a write fails; its edits stay pending
+        """
+        with self._lock:
+            if file_path is None:
+                keys = list(self._dirty)
+            else:
+                keys = [key for key in (self.key(file_path),) if key in self._dirty]
+        return sum(1 for key in keys if self._flush_key(key))
+
+    def close(self) -> None:
+        """Stop the flush thread and write everything; later commits write through."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _flush_key(self, key: str) -> bool:
+        with file_lock(key):
+            with self._lock:
+                entry = self._dirty.get(key)
+            if entry is None:
+                return False  # flushed meanwhile
+            document, file_path = entry[0], entry[3]
+            try:
+                changed = fingerprint(os.stat(key)) != document.fingerprint
+            except OSError:
+                changed = False
+            if changed:
+                logger.warning("file changed on disk while edits were buffered; overwriting it",
+                               extra={"file_path": file_path, "pending_edits": entry[1]})
+            try:
+                self._write(file_path, document)
+            except BaseException:
+                # _write dropped the document; keep the edits
+                # pending and retry after another interval
+                with self._lock:
+                    entry[2] = time.monotonic() + self.flush_interval
+                    self._dirty[key] = entry
+                raise
+            with self._lock:
+                self._dirty.pop(key, None)
+                self.flushes += 1
+        if self.on_flush is not None:
+            self.on_flush(file_path)
+        return True
+
+    def _start(self) -> None:
+        # Caller holds self._lock
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="document-buffer-flush", daemon=True)
+            self._thread.start()
+
+    def _next_flush(self) -> Optional[float]:
+        """Seconds until the next file is due, or None if nothing is pending."""
+        with self._lock:
+            if not self._dirty:
+                return None
+            return max(0.0, min(entry[2] for entry in self._dirty.values()) - time.monotonic())
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self._next_flush())
+            self._wake.clear()
+            with self._lock:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                due = [key for key, entry in self._dirty.items() if entry[2] <= now]
+            for key in due:
+                try:
+                    self._flush_key(key)
+                except Exception:
+                    logger.exception("write-behind flush failed", extra={"file_path": key})
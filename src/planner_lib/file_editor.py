@@ -5,12 +5,27 @@ This module provides functionality to:
 1. Apply metadata edits (replace specific metadata lines)
 2. Apply content edits (replace content blocks)
 3. Validate edits before application
-4. Handle errors gracefully
+4. Apply a batch of edits to many nodes of one file in a single write
+5. Serialize concurrent edits per file and replace files atomically
+6. Detect edits based on an outdated node (per-node version tokens)
+7. Address nodes by id alone; line numbers are resolved from the current file
+8. Handle errors gracefully
 """
 
 import os
 import json
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    from .md_parser import MarkdownParser
+    from .node_index import NodeIndex
+    from .file_lock import atomic_write, file_lock
+    from .index_cache import IndexCache
+except ImportError:
+    from md_parser import MarkdownParser
+    from node_index import NodeIndex
+    from file_lock import atomic_write, file_lock
+    from index_cache import IndexCache
 
 
 class EditValidationError(Exception):
@@ -18,8 +33,66 @@ class EditValidationError(Exception):
     pass
 
 
+class EditConflictError(EditValidationError):
+    """
+    Raised when the edited node changed since the client loaded it.
+
+    `current` holds the node's current state (see node_state), or None if
+    the node no longer exists.
+    """
+
+    def __init__(self, message: str, current: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.current = current
+
+
+def node_state(node) -> Dict[str, Any]:
+    """
+    What a client needs to keep editing a node: its to_dict fields (without
+    children) and the version token to send back with the next edit.
+    """
+    return {
+        "id": node.metadata.get('id'),
+        "level": node.level,
+        "title": node.title,
+        "metadata": node.metadata,
+        "content": node.content,
+        "header_line": node.header_line,
+        "metadata_location": node.metadata_location,
+        "content_location_start": node.content_location_start,
+        "content_location_end": node.content_location_end,
+        "node_hash": node.node_hash,
+    }
+
+
 class FileEditor:
-    """Handles applying edits to markdown files with line number tracking."""
+    """
+    Handles applying edits to markdown files with line number tracking.
+
+    Each read-modify-write cycle holds the file's lock (see file_lock), so
+    concurrent edits to one file cannot overwrite each other, and the new
+    version replaces the file atomically.
+
+    An edit may carry the node's version token ("version": the node_hash the
+    client loaded). If the node still has that hash, the edit is applied at
+    the node's current lines, wherever other edits have moved it; if not,
+    the edit is refused as a conflict: `conflict` is set and `last_conflict`
+    holds the node's current state (None if it no longer exists). With require_version=True edits without a token are
+    refused. After a successful call `updated_nodes` holds the new state of
+    each edited node, so a client can continue without reloading.
+
+    Line numbers are optional: an edit that leaves them out is applied at the
+    current lines of the node named by its node_identifier. With an
+    index_cache the file's lines and NodeIndex are kept between calls and
+    updated incrementally, so an edit does not reparse the whole file.
+    """
+
+    def __init__(self, require_version: bool = False, index_cache: Optional[IndexCache] = None):
+        self.require_version = require_version
+        self.index_cache = index_cache
+        self.conflict = False
+        self.last_conflict: Optional[Dict[str, Any]] = None
+        self.updated_nodes: List[Optional[Dict[str, Any]]] = []
 
     def apply_edits(self, edits: Dict[str, Any]) -> Tuple[bool, str]:
         """
@@ -29,52 +102,286 @@ class FileEditor:
             edits: Dictionary containing:
                 - file_path: Path to the file to edit
                 - node_identifier: {id: <id>, title: <title>} for identifying the node
+                - version: node_hash of the node the edit is based on (optional
+                  unless require_version)
                 - metadata_edits: {key: {value: <val>, line_number: <num>}}
                 - content_edit: {value: <text>, start_line: <num>, end_line: <num>}
+                  (line_number, start_line and end_line are optional)
 
         Returns:
             Tuple of (success: bool, message: str)
         """
+        self.conflict = False
+        self.last_conflict = None
+        self.updated_nodes = []
         try:
             # 1. Validate edits
             self._validate_edits(edits)
 
             file_path = edits['file_path']
+            self._edit_file(file_path, [edits], numbered=False)
 
-            # 2. Read file as lines
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            return True, f"Successfully applied edits to {os.path.basename(file_path)}"
+
+        except EditConflictError as e:
+            self.conflict = True
+            self.last_conflict = e.current
+            return False, f"Conflict: {str(e)}"
+        except EditValidationError as e:
+            return False, f"Validation error: {str(e)}"
+        except FileNotFoundError:
+            return False, f"File not found: {edits.get('file_path', 'unknown')}"
+        except PermissionError:
+            return False, f"Permission denied: {edits.get('file_path', 'unknown')}"
+        except Exception as e:
+            return False, f"Unexpected error: {str(e)}"
 
-            # 3. Collect all edits with line numbers
-            all_edits = self._collect_all_edits(edits, len(lines))
+    def apply_edits_batch(self, batch: Dict[str, Any]) -> Tuple[bool, str]:
+        """
+        Apply edits to many nodes of one markdown file, all or nothing.
 
-            # 4. Sort by line number DESCENDING (bottom to top)
-            all_edits.sort(key=lambda x: x[0], reverse=True)
+        The file is read and indexed once, every edit is validated against
+        it, and the file is written once. If any edit is invalid, or two
+        edits touch the same lines, nothing is written.
 
-            # 5. Apply edits
-            for line_num, edit_type, edit_data in all_edits:
-                if edit_type == 'metadata':
-                    key, value = edit_data
-                    lines = self._apply_metadata_edit(lines, line_num, key, value)
-                elif edit_type == 'content':
-                    start, end, value = edit_data
-                    lines = self._apply_content_edit(lines, start, end, value)
+        Args:
+            batch: Dictionary containing:
+                - file_path: Path to the file to edit
+                - edits: List of edits in the apply_edits format (node_identifier,
+                  metadata_edits, content_edit); their file_path may be omitted
 
-            # 6. Write back to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        self.conflict = False
+        self.last_conflict = None
+        self.updated_nodes = []
+        try:
+            file_path, edit_list = self._validate_batch(batch)
+            self._edit_file(file_path, edit_list, numbered=True)
 
-            return True, f"Successfully applied edits to {os.path.basename(file_path)}"
+            return True, f"Successfully applied {len(edit_list)} edits to {os.path.basename(file_path)}"
 
+        except EditConflictError as e:
+            self.conflict = True
+            self.last_conflict = e.current
+            return False, f"Conflict: {str(e)}"
         except EditValidationError as e:
             return False, f"Validation error: {str(e)}"
         except FileNotFoundError:
-            return False, f"File not found: {edits.get('file_path', 'unknown')}"
+            return False, f"File not found: {batch.get('file_path', 'unknown')}"
         except PermissionError:
-            return False, f"Permission denied: {edits.get('file_path', 'unknown')}"
+            return False, f"Permission denied: {batch.get('file_path', 'unknown')}"
         except Exception as e:
             return False, f"Unexpected error: {str(e)}"
 
+    def _edit_file(self, file_path: str, edit_list: List[Dict[str, Any]], numbered: bool) -> None:
+        """
+        Read, check, edit and rewrite one file under its lock.
+
+        Args:
+            numbered: Prefix errors with the 1-based number of the edit (batches)
+
+        Raises:
+            EditValidationError: If an edit is invalid; nothing is written
+        """
+        with file_lock(file_path):
+            if self.index_cache is not None:
+                document = self.index_cache.get(file_path)
+                lines, index = document.lines, document.index
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+                index = NodeIndex()
+                MarkdownParser().parse_lines(lines, index)
+
+            all_edits = []
+            targets = []
+            for number, edits in enumerate(edit_list, 1):
+                try:
+                    edits, node = self._resolve_edits(edits, lines, index)
+                    all_edits.extend(self._collect_all_edits(edits, len(lines)))
+                except EditConflictError as e:
+                    if not numbered:
+                        raise
+                    current = dict(e.current, edit=number) if e.current else None
+                    raise EditConflictError(f"Edit {number}: {e}", current) from None
+                except EditValidationError as e:
+                    if not numbered:
+                        raise
+                    raise EditValidationError(f"Edit {number}: {e}") from None
+                targets.append(None if node is None else node.header_line)
+
+            if self.index_cache is None:
+                # Apply edits bottom to top, then write (temp file + rename)
+                lines = self._apply_collected_edits(lines, all_edits)
+                with atomic_write(file_path) as f:
+                    f.writelines(lines)
+                index = None
+            else:
+                self._edit_document(file_path, document, all_edits)
+
+            # Still under the lock: a cached document is shared with other edits
+            self.updated_nodes = self._updated_states(lines, all_edits, targets, index)
+
+    def _edit_document(self, file_path: str, document, all_edits: List[Tuple[int, str, Any]]) -> None:
+        """Apply edits to a cached document (updating its tree and index) and commit it."""
+        spans = self._edit_spans(all_edits)
+        parser = MarkdownParser()
+        saved = document.lines[:]
+        try:
+            for start, end, edit_type, edit_data in spans:
+                document.root = parser.reparse_range(
+                    document.root, document.lines, start, end,
+                    self._replacement(edit_type, edit_data), document.index)
+        except BaseException:
+            self._restore_document(file_path, document, saved)
+            raise
+        self.index_cache.commit(file_path, document)
+
+    def _restore_document(self, file_path: str, document, lines: List[str]) -> None:
+        """
+        Put a cached document back to its lines before a failed edit.
+
+        It is reparsed rather than dropped: with a DocumentBuffer it may hold
+        earlier edits that were acknowledged but are not on disk yet.
+        """
+        document.lines[:] = lines
+        try:
+            index = NodeIndex()
+            document.root = MarkdownParser().parse_lines(document.lines, index)
+            document.index = index
+        except BaseException:
+            self.index_cache.invalidate(file_path)
+            raise
+        document.version += 1
+
+    def _resolve_edits(self, edits: Dict[str, Any], lines: List[str],
+                       index: NodeIndex) -> Tuple[Dict[str, Any], Any]:
+        """
+        Check an edit against the current file and find the node it edits.
+
+        With a version token the edit is moved to the node's current lines;
+        without one its line numbers must still belong to the node.
+
+        Returns:
+            (edits with current line numbers, edited node or None if unknown)
+
+        Raises:
+            EditConflictError: If the node changed or disappeared since the
+                version the edit is based on
+            EditValidationError: For other invalid edits
+        """
+        version = edits.get('version')
+        if version is None:
+            if self.require_version:
+                raise EditValidationError("Missing required field: version (node_hash of the edited node)")
+            if self._has_line_numbers(edits):
+                return edits, self._check_node_lines(edits, lines, index)
+            candidates = self._find_candidates(edits, index)
+            if not candidates:
+                raise EditValidationError(f"Node '{self._identifier_name(edits)}' not found")
+            if len(candidates) > 1:
+                raise EditValidationError(
+                    f"{len(candidates)} nodes match '{self._identifier_name(edits)}'; "
+                    "address the node by a unique id or send its line numbers")
+            return self._rebase_edits(edits, candidates[0]), candidates[0]
+
+        candidates = self._find_candidates(edits, index)
+        if not candidates:
+            raise EditConflictError(f"Node '{self._identifier_name(edits)}' no longer exists; reload and retry")
+
+        same_version = [node for node in candidates if node.node_hash == version]
+        if not same_version:
+            current = self._node_at_lines(candidates, edits) or candidates[0]
+            raise EditConflictError(
+                f"Node '{current.title}' was changed since it was loaded; review its current state and retry",
+                node_state(current))
+        node = self._node_at_lines(same_version, edits) or same_version[0]
+        return self._rebase_edits(edits, node), node
+
+    def _rebase_edits(self, edits: Dict[str, Any], node) -> Dict[str, Any]:
+        """Copy of edits with the line numbers of node as it is now."""
+        rebased = dict(edits)
+        if edits.get('metadata_edits'):
+            rebased['metadata_edits'] = {}
+            for key, edit_info in edits['metadata_edits'].items():
+                line_num = node.metadata_location.get(key)
+                if line_num is None:
+                    raise EditValidationError(f"Node '{node.title}' has no metadata line for '{key}'")
+                rebased['metadata_edits'][key] = dict(edit_info, line_number=line_num)
+        if edits.get('content_edit'):
+            if node.content_location_start is None:
+                raise EditValidationError(f"Node '{node.title}' has no content block")
+            rebased['content_edit'] = dict(edits['content_edit'],
+                                           start_line=node.content_location_start,
+                                           end_line=node.content_location_end)
+        return rebased
+
+    def _updated_states(self, lines: List[str], all_edits: List[Tuple[int, str, Any]],
+                        targets: List[Optional[int]],
+                        index: Optional[NodeIndex] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        node_state of every edited node in the new lines.
+
+        Args:
+            targets: Header line of each edited node before the edits (None
+                where the node was unknown)
+            index: NodeIndex of the new lines, if the caller kept one up to date
+        """
+        if index is None:
+            index = NodeIndex()
+            MarkdownParser().parse_lines(lines, index)
+        states = []
+        for line in targets:
+            if line is None:
+                states.append(None)
+                continue
+            # Lines added or removed above the node moved its header
+            for start, edit_type, edit_data in all_edits:
+                if edit_type == 'content' and edit_data[1] <= line:
+                    line += len(self._content_lines(edit_data[2])) - (edit_data[1] - start)
+            updated = index.at_line(line)
+            states.append(node_state(updated) if updated is not None else None)
+        return states
+
+    def _validate_batch(self, batch: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Validate a batch and every edit in it.
+
+        Returns:
+            (file_path, edits), each edit completed with the batch's file_path
+
+        Raises:
+            EditValidationError: If validation fails
+        """
+        if not isinstance(batch, dict):
+            raise EditValidationError("Batch must be a dictionary")
+        if 'file_path' not in batch:
+            raise EditValidationError("Missing required field: file_path")
+        edit_list = batch.get('edits')
+        if not isinstance(edit_list, list) or not edit_list:
+            raise EditValidationError("edits must be a non-empty list")
+
+        file_path = batch['file_path']
+        if not os.path.exists(file_path):
+            raise EditValidationError(f"File does not exist: {file_path}")
+
+        completed = []
+        for number, edits in enumerate(edit_list, 1):
+            if not isinstance(edits, dict):
+                raise EditValidationError(f"Edit {number}: must be a dictionary")
+            own_path = edits.get('file_path')
+            if own_path is not None and os.path.abspath(own_path) != os.path.abspath(file_path):
+                raise EditValidationError(f"Edit {number}: file_path differs from the batch file_path")
+            edits = dict(edits, file_path=file_path)
+            try:
+                self._validate_edits(edits)
+            except EditValidationError as e:
+                raise EditValidationError(f"Edit {number}: {e}") from None
+            completed.append(edits)
+        return file_path, completed
+
     def _validate_edits(self, edits: Dict[str, Any]) -> None:
         """
         Validate edit structure and content.
@@ -105,8 +412,8 @@ class FileEditor:
                     raise EditValidationError(f"Invalid metadata edit format for key '{key}'")
                 if 'value' not in edit_info:
                     raise EditValidationError(f"Missing 'value' in metadata edit for key '{key}'")
-                if 'line_number' not in edit_info:
-                    raise EditValidationError(f"Missing 'line_number' in metadata edit for key '{key}'")
+                if edit_info.get('line_number') is None:
+                    continue  # resolved from node_identifier
                 if not isinstance(edit_info['line_number'], int) or edit_info['line_number'] < 0:
                     raise EditValidationError(f"Invalid line_number for key '{key}': must be non-negative integer")
 
@@ -117,20 +424,20 @@ class FileEditor:
                 raise EditValidationError("content_edit must be a dictionary")
             if 'value' not in content_edit:
                 raise EditValidationError("Missing 'value' in content_edit")
-            if 'start_line' not in content_edit:
-                raise EditValidationError("Missing 'start_line' in content_edit")
-            if 'end_line' not in content_edit:
-                raise EditValidationError("Missing 'end_line' in content_edit")
 
-            start = content_edit['start_line']
-            end = content_edit['end_line']
+            start = content_edit.get('start_line')
+            end = content_edit.get('end_line')
 
-            if not isinstance(start, int) or start < 0:
-                raise EditValidationError("start_line must be non-negative integer")
-            if not isinstance(end, int) or end < 0:
-                raise EditValidationError("end_line must be non-negative integer")
-            if start > end:
-                raise EditValidationError(f"start_line ({start}) must be <= end_line ({end})")
+            # Both or neither: without them the node's content block is edited
+            if (start is None) != (end is None):
+                raise EditValidationError("content_edit needs both start_line and end_line, or neither")
+            if start is not None:
+                if not isinstance(start, int) or start < 0:
+                    raise EditValidationError("start_line must be non-negative integer")
+                if not isinstance(end, int) or end < 0:
+                    raise EditValidationError("end_line must be non-negative integer")
+                if start > end:
+                    raise EditValidationError(f"start_line ({start}) must be <= end_line ({end})")
 
         # Must have at least one type of edit
         if 'metadata_edits' not in edits and 'content_edit' not in edits:
@@ -180,6 +487,121 @@ class FileEditor:
 
         return all_edits
 
+    def _apply_collected_edits(self, lines: List[str], all_edits: List[Tuple[int, str, Any]]) -> List[str]:
+        """
+        Apply collected edits bottom to top, so earlier line numbers stay valid.
+
+        Raises:
+            EditValidationError: If two edits touch the same lines
+        """
+        for start, end, edit_type, edit_data in self._edit_spans(all_edits):
+            if edit_type == 'metadata':
+                key, value = edit_data
+                lines = self._apply_metadata_edit(lines, start, key, value)
+            elif edit_type == 'content':
+                _, _, value = edit_data
+                lines = self._apply_content_edit(lines, start, end, value)
+        return lines
+
+    def _edit_spans(self, all_edits: List[Tuple[int, str, Any]]) -> List[Tuple[int, int, str, Any]]:
+        """
+        (start, end, edit_type, edit_data) of every edit, bottom to top.
+
+        Raises:
+            EditValidationError: If two edits touch the same lines
+        """
+        spans = []
+        for line_num, edit_type, edit_data in all_edits:
+            end = edit_data[1] if edit_type == 'content' else line_num + 1
+            spans.append((line_num, end, edit_type, edit_data))
+
+        # Sort by line number DESCENDING (bottom to top)
+        spans.sort(key=lambda span: (span[0], span[1]), reverse=True)
+        for (start, end, _, _), (below_start, _, _, _) in zip(spans[1:], spans):
+            if end > below_start or start == below_start:
+                raise EditValidationError(f"Edits overlap at line {below_start}")
+        return spans
+
+    def _replacement(self, edit_type: str, edit_data: Any) -> List[str]:
+        """The lines that replace the span of one collected edit."""
+        if edit_type == 'metadata':
+            key, value = edit_data
+            return [self._metadata_line(key, value)]
+        return self._content_lines(edit_data[2])
+
+    def _check_node_lines(self, edits: Dict[str, Any], lines: List[str],
+                          index: Optional[NodeIndex] = None):
+        """
+        Check that the client's line numbers still belong to the identified node.
+
+        The node is looked up by id (or by title if it has no id) in an index of
+        the current file. Edits for nodes that cannot be found keep relying on
+        their line numbers alone.
+
+        Args:
+            index: NodeIndex of lines, if the caller already built one
+
+        Returns:
+            The matched node, or None if the identifier matches no node
+
+        Raises:
+            EditValidationError: If the line numbers point outside that node,
+                e.g. because the file changed since the client loaded it
+        """
+        if index is None:
+            index = NodeIndex()
+            MarkdownParser().parse_lines(lines, index)
+
+        candidates = self._find_candidates(edits, index)
+        if not candidates:
+            return None
+
+        node = self._node_at_lines(candidates, edits)
+        if node is not None:
+            return node
+
+        raise EditValidationError(
+            f"Line numbers do not match node '{candidates[0].title}'; the file has changed, reload it and retry"
+        )
+
+    def _has_line_numbers(self, edits: Dict[str, Any]) -> bool:
+        """Whether the edit gives the line numbers of everything it changes."""
+        if any(edit_info.get('line_number') is None
+               for edit_info in (edits.get('metadata_edits') or {}).values()):
+            return False
+        content_edit = edits.get('content_edit')
+        return not content_edit or (content_edit.get('start_line') is not None
+                                    and content_edit.get('end_line') is not None)
+
+    def _identifier_name(self, edits: Dict[str, Any]) -> Optional[str]:
+        identifier = edits.get('node_identifier') or {}
+        return identifier.get('id') or identifier.get('title')
+
+    def _find_candidates(self, edits: Dict[str, Any], index: NodeIndex) -> List:
+        """Nodes matching the edit's node_identifier: by id, or by title if it has none."""
+        identifier = edits.get('node_identifier') or {}
+        if identifier.get('id'):
+            return index.find_id(identifier['id'])
+        if identifier.get('title'):
+            return index.find_title(identifier['title'])
+        return []
+
+    def _node_at_lines(self, candidates: List, edits: Dict[str, Any]):
+        """The first candidate that owns every line number the edit gives, or None."""
+        metadata_edits = edits.get('metadata_edits') or {}
+        content_edit = edits.get('content_edit')
+        for node in candidates:
+            if any(edit_info.get('line_number') is not None
+                   and node.metadata_location.get(key) != edit_info['line_number']
+                   for key, edit_info in metadata_edits.items()):
+                continue
+            if content_edit and content_edit.get('start_line') is not None and \
+                    (content_edit['start_line'], content_edit.get('end_line')) != \
+                    (node.content_location_start, node.content_location_end):
+                continue
+            return node
+        return None
+
     def _apply_metadata_edit(self, lines: List[str], line_num: int, key: str, value: Any) -> List[str]:
         """
         Apply a metadata edit to a specific line.
@@ -193,6 +615,12 @@ class FileEditor:
         Returns:
             Updated list of lines
         """
+        # Replace the line
+        lines[line_num] = self._metadata_line(key, value)
+        return lines
+
+    def _metadata_line(self, key: str, value: Any) -> str:
+        """The metadata line written for key and value."""
         # Parse the value to determine formatting
         parsed_value = self._parse_metadata_value(value)
 
@@ -204,9 +632,7 @@ class FileEditor:
         else:
             value_str = str(parsed_value)
 
-        # Replace the line
-        lines[line_num] = f"- {key}: {value_str}\n"
-        return lines
+        return f"- {key}: {value_str}\n"
 
     def _parse_metadata_value(self, value: Any) -> Any:
         """
@@ -245,19 +671,8 @@ class FileEditor:
 
         return value
 
-    def _apply_content_edit(self, lines: List[str], start_line: int, end_line: int, new_content: str) -> List[str]:
-        """
-        Apply a content edit by replacing a range of lines.
-
-        Args:
-            lines: List of file lines
-            start_line: Start of content block (inclusive)
-            end_line: End of content block (exclusive)
-            new_content: New content to insert
-
-        Returns:
-            Updated list of lines
-        """
+    def _content_lines(self, new_content: str) -> List[str]:
+        """The lines a content edit writes for new_content."""
         # Trim trailing whitespace and newlines from user's edit
         new_content = new_content.rstrip()
 
@@ -271,9 +686,27 @@ class FileEditor:
 
             # Add 1 blank lines after the content
             new_lines.append('\n')
+        return new_lines
 
-        # Replace the range
-        return lines[:start_line] + new_lines + lines[end_line:]
+    def _apply_content_edit(self, lines: List[str], start_line: int, end_line: int, new_content: str) -> List[str]:
+        """
+        Apply a content edit by replacing a range of lines.
+
+        Args:
+            lines: List of file lines
+            start_line: Start of content block (inclusive)
+            end_line: End of content block (exclusive)
+            new_content: New content to insert
+
+        Returns:
+            Updated list of lines
+        """
+        new_lines = self._content_lines(new_content)
+
+        # Replace the range in place; with edits applied bottom to top the
+        # lines below it have already been edited and only move
+        lines[start_line:end_line] = new_lines
+        return lines
 
 
 def apply_edits_to_file(edits: Dict[str, Any]) -> Tuple[bool, str]:
@@ -288,3 +721,17 @@ def apply_edits_to_file(edits: Dict[str, Any]) -> Tuple[bool, str]:
     """
     editor = FileEditor()
     return editor.apply_edits(edits)
+
+
+def apply_batch_to_file(batch: Dict[str, Any]) -> Tuple[bool, str]:
+    """
+    Convenience function to apply a batch of edits to one file.
+
+    Args:
+        batch: {"file_path": ..., "edits": [...]} (see FileEditor.apply_edits_batch)
+
+    Returns:
+        Tuple of (success: bool, message: str)
+    """
+    editor = FileEditor()
+    return editor.apply_edits_batch(batch)
@@ -0,0 +1,145 @@
+"""
+File Lock Module - Per-file locks and crash-safe writes for concurrent edits.
+
+1. FileLockManager: one lock per file, so read-modify-write cycles on the
+   same file are serialized while edits to different files run in parallel
+2. atomic_write: write a new version to a temporary file next to the target,
+   fsync it and rename it over the target, so readers and crashes only ever
+   see the old or the new file, never a truncated one
+
+Locks coordinate the threads of one process (e.g. a multi-threaded API
+server); they are not visible to other processes.
+
+Usage:
+    with file_lock(path):
+        lines = read(path)
+        ...
+        with atomic_write(path) as f:
+            f.writelines(lines)
+"""
+
+import os
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO
+
+
+class FileLockManager:
+    """
+    Re-entrant locks keyed by file path.
+
+    Paths are resolved (symlinks, relative paths) so every spelling of a file
+    shares one lock. A lock is dropped again once nobody holds or waits for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # resolved path -> [lock, number of threads holding or waiting for it]
+        self._entries: Dict[str, List] = {}
+
+    @staticmethod
+    def key(file_path: str) -> str:
+        return os.path.realpath(file_path)
+
+    @contextmanager
+    def lock(self, file_path: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Hold the lock of file_path for the duration of the with-block.
+
+        Args:
+            file_path: File to lock
+            timeout: Seconds to wait at most; None waits indefinitely
+
+        Raises:
+            TimeoutError: If the lock was not acquired within timeout
+        """
+        key = self.key(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            if not entry[0].acquire(timeout=-1 if timeout is None else timeout):
+                raise TimeoutError(f"Timed out waiting for the lock on {file_path}")
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._entries[key]
+
+    def __len__(self) -> int:
+        """Number of files currently locked or waited for."""
+        with self._lock:
+            return len(self._entries)
+
+
+_default_manager: Optional[FileLockManager] = None
+_default_manager_lock = threading.Lock()
+
+
+def get_default_lock_manager() -> FileLockManager:
+    """Process-wide FileLockManager shared by FileEditor and the API server."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = FileLockManager()
+        return _default_manager
+
+
+def file_lock(file_path: str, timeout: Optional[float] = None):
+    """Lock file_path in the default FileLockManager (a context manager)."""
+    return get_default_lock_manager().lock(file_path, timeout)
+
+
+def _fsync_directory(directory: str) -> None:
+    # Makes the rename itself durable; not every platform can open a directory
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(file_path: str, encoding: str = 'utf-8') -> Iterator[TextIO]:
+    """
+    Open a text file that replaces file_path only when the with-block succeeds.
+
+    The data goes to a temporary file in the same directory, which is flushed,
+    fsync'ed and renamed over file_path (following a symlink to its target).
+    The original permission bits are kept (new files get 0644). If the block
+    raises, file_path is left untouched and the temporary file is removed.
+    """
+    target = os.path.realpath(file_path)
+    directory, name = os.path.split(target)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(target).st_mode))
+        except FileNotFoundError:
+            # New file: mkstemp's 0600 would hide it from other users
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
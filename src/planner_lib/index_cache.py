@@ -0,0 +1,238 @@
+"""
+Index Cache Module - Keep parsed documents in memory between edits.
+
+1. IndexCache: per file, the lines, tree and NodeIndex of the version last
+   read or written, checked against a fingerprint of the file (inode, size,
+   mtime_ns) before every use
+2. Editors update a cached document incrementally (reparse_range) and
+   commit it (write + store), so a series of edits parses a file once
+3. Readers build their own indexes over the cached tree (query engine,
+   search index) and keep them in document.views, tagged with the
+   document's version, instead of parsing the file themselves
+
+A file changed by someone else (git pull, an editor) gets a new fingerprint;
+on its next use only the lines between the common prefix and suffix of the
+old and new version are reparsed, in place. Documents are shared, so callers
+must hold the file's lock (see file_lock) while they use or change one.
+
+Usage:
+    with file_lock(path):
+        document = cache.get(path)
+        ...  # resolve edits via document.index, apply them to document.lines
+        cache.commit(path, document)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .md_parser import MarkdownParser
+    from .node_index import NodeIndex
+    from .file_lock import atomic_write
+except ImportError:
+    from md_parser import MarkdownParser
+    from node_index import NodeIndex
+    from file_lock import atomic_write
+
+
+def fingerprint(stat: os.stat_result) -> Tuple[int, int, int]:
+    """What identifies a version of a file without reading it."""
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class Document:
+    """
+    The parsed current version of a file: its lines, tree and index.
+
+    version counts the changes made to the tree (commits, reparses of an
+    outside change); views holds indexes derived from the tree by name,
+    each as (version it was built for, index).
+    """
+    __slots__ = ('lines', 'root', 'index', 'options', 'fingerprint', 'version', 'views')
+
+    def __init__(self, lines: List[str], root, index: NodeIndex, options: str,
+                 fingerprint: Optional[Tuple[int, int, int]] = None):
+        self.lines = lines
+        self.root = root
+        self.index = index
+        self.options = options
+        self.fingerprint = fingerprint
+        self.version = 0
+        self.views: Dict[str, Tuple[int, Any]] = {}
+
+
+class IndexCache:
+    """LRU of parsed documents keyed by resolved file path."""
+
+    def __init__(self, max_entries: int = 16):
+        """
+        Args:
+            max_entries: Number of files kept in memory.
+        """
+        self.max_entries = max_entries
+        self._documents: "OrderedDict[str, Document]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(file_path: str) -> str:
+        return os.path.realpath(file_path)
+
+    def get(self, file_path: str, parser: Optional[MarkdownParser] = None) -> Document:
+        """
+        Document of file_path as it is on disk now; parsed only if the file changed.
+
+        The returned document is the cached one; changes to it must be followed
+        by commit() or invalidate(). The caller holds the file's lock: a file
+        changed on disk is applied to the cached document in place.
+        """
+        parser = parser or MarkdownParser()
+        key = self.key(file_path)
+        options = f"fenced{int(parser.fenced_code)}"
+
+        stat = os.stat(key)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None and document.options != options:
+                document = None
+            if document is not None and document.fingerprint == fingerprint(stat):
+                self._documents.move_to_end(key)
+                self.hits += 1
+                return document
+
+        # Same decoding as parse_file: utf-8 with universal newlines
+        with open(key, 'r', encoding='utf-8') as f:
+            stat = os.fstat(f.fileno())
+            lines = f.readlines()
+        if document is None or not self._update(document, lines, parser):
+            index = NodeIndex()
+            root = parser.parse_lines(lines, index)
+            document = Document(lines, root, index, options)
+        document.fingerprint = fingerprint(stat)
+
+        with self._lock:
+            self.misses += 1
+            self._put(key, document)
+        return document
+
+    @staticmethod
+    def _update(document: Document, lines: List[str], parser: MarkdownParser) -> bool:
+        """
+        Reparse only the changed span of document: everything between the
+        common prefix and the common suffix of its lines and the new lines.
+
+        Returns:
+            False if the update failed; the document must then be replaced
+        """
+        old = document.lines
+        shortest = min(len(old), len(lines))
+        start = _common_prefix(old, lines, shortest)
+        tail = _common_suffix(old, lines, shortest - start)
+        if start == len(old) and start == len(lines):
+            return True  # Touched, not changed
+        try:
+            document.root = parser.reparse_range(
+                document.root, old, start, len(old) - tail,
+                lines[start:len(lines) - tail], document.index)
+        except Exception:
+            # Half-applied
+            return False
+        document.version += 1
+        return True
+
+    def commit(self, file_path: str, document: Document) -> None:
+        """
+        Make document.lines the content of file_path: write it (temp file +
+        rename) and store it. The caller holds the file's lock.
+
+        Raises:
+            OSError: If the write fails; the document is then dropped
+        """
+        document.version += 1
+        self._write(file_path, document)
+
+    def _write(self, file_path: str, document: Document) -> None:
+        try:
+            with atomic_write(file_path) as f:
+                f.writelines(document.lines)
+        except BaseException:
+            self.invalidate(file_path)
+            raise
+        self.store(file_path, document)
+
+    def store(self, file_path: str, document: Document) -> None:
+        """Record that document.lines is now the content of file_path (call right after writing)."""
+        key = self.key(file_path)
+        try:
+            document.fingerprint = fingerprint(os.stat(key))
+        except OSError:
+            self.invalidate(file_path)
+            return
+        with self._lock:
+            self._put(key, document)
+
+    def invalidate(self, file_path: str) -> None:
+        """Drop the cached document of file_path."""
+        with self._lock:
+            self._documents.pop(self.key(file_path), None)
+
+    def clear(self) -> None:
+        """Drop all cached documents."""
+        with self._lock:
+            self._documents.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._documents)
+
+    def _put(self, key: str, document: Document) -> None:
+        self._documents[key] = document
+        self._documents.move_to_end(key)
+        while len(self._documents) > self.max_entries:
+            self._documents.popitem(last=False)
+
+
+# Lines compared per slice when looking for the changed span
+_COMPARE_BLOCK = 1024
+
+
+def _common_prefix(a: List[str], b: List[str], limit: int) -> int:
+    """Number of equal leading lines of a and b, at most limit."""
+    size = 0
+    while size < limit:
+        end = min(size + _COMPARE_BLOCK, limit)
+        if a[size:end] != b[size:end]:
+            break
+        size = end
+    while size < limit and a[size] == b[size]:
+        size += 1
+    return size
+
+
+def _common_suffix(a: List[str], b: List[str], limit: int) -> int:
+    """Number of equal trailing lines of a and b, at most limit."""
+    size = 0
+    while size < limit:
+        end = min(size + _COMPARE_BLOCK, limit)
+        if a[len(a) - end:len(a) - size] != b[len(b) - end:len(b) - size]:
+            break
+        size = end
+    while size < limit and a[len(a) - 1 - size] == b[len(b) - 1 - size]:
+        size += 1
+    return size
+
+
+_default_cache: Optional[IndexCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_index_cache() -> IndexCache:
+    """Process-wide IndexCache shared by the API server's editors, queries and searches."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = IndexCache()
+        return _default_cache
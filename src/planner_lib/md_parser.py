@@ -1,7 +1,10 @@
 import re
 import sys
+import bisect
 import os
 import json
+import hashlib
+import io
 import argparse
 # Add current directory to sys.path to ensure we can import cli_utils if running directly
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,13 +14,22 @@ if current_dir not in sys.path:
 try:
     # Try relative import first (for package usage)
     from . import cli_utils
-    from .cli_utils import add_standard_arguments, validate_and_get_pairs
+    from .cli_utils import add_standard_arguments, validate_and_get_pairs, expand_input_patterns
+    from .node_index import NodeIndex
 except ImportError:
     # Fallback for direct execution
     import cli_utils
-    from cli_utils import add_standard_arguments, validate_and_get_pairs
+    from cli_utils import add_standard_arguments, validate_and_get_pairs, expand_input_patterns
+    from node_index import NodeIndex
 
 class Node:
+    # No per-instance __dict__: large merged plans hold tens of thousands of nodes
+    __slots__ = (
+        'level', 'title', 'metadata', 'content', 'children',
+        'header_line', 'metadata_location', 'content_location_start', 'content_location_end',
+        '_hash', '_subtree_hash',
+    )
+
     def __init__(self, level, title, metadata=None, content=""):
         self.level = level
         self.title = title
@@ -29,41 +41,111 @@ class Node:
         self.metadata_location = {}  # {key: line_number}
         self.content_location_start = None
         self.content_location_end = None
+        # Cached digests, see node_hash / subtree_hash
+        self._hash = None
+        self._subtree_hash = None
+
+    @property
+    def node_hash(self):
+        """
+        Hex digest of this node alone: level, title, metadata (in order) and content.
+
+        Line numbers are not part of it, so edits elsewhere in the file that
+        only shift this node keep its hash. Computed on first use and cached;
+        reparse_range keeps the cache current, other in-place changes to a
+        node must be followed by invalidate_hashes(root, node).
+        """
+        digest = self._hash
+        if digest is None:
+            digest = self._hash = _node_digest(self)
+        return digest.hex()
+
+    @property
+    def subtree_hash(self):
+        """
+        Merkle hash of the subtree: the hash of this node's hash followed by
+        the subtree hashes of its children, in order (node_hash for a leaf).
+        Equal subtree hashes mean equal subtrees; after an edit only the
+        ancestors of the changed node get new ones.
+        """
+        return _subtree_digest(self).hex()
 
     def to_dict(self):
         """Convert Node tree to JSON-serializable dictionary."""
-        return {
-            "level": self.level,
-            "title": self.title,
-            "metadata": self.metadata,
-            "content": self.content,
-            "children": [child.to_dict() for child in self.children],
-            "header_line": self.header_line,
-            "metadata_location": self.metadata_location,
-            "content_location_start": self.content_location_start,
-            "content_location_end": self.content_location_end
-        }
+        if isinstance(self, Node):
+            # One post-order pass fills every subtree hash the loop reads below
+            _subtree_digest(self)
+            digests = None
+        else:
+            digests = iter(_tree_digests(self))
+        result = []
+        # Explicit stack of (node, list its dict is appended to); deep trees
+        # do not hit the recursion limit
+        stack = [(self, result)]
+        while stack:
+            node, siblings = stack.pop()
+            children = []
+            if digests is None:
+                node_hash, subtree_hash = node.node_hash, node.subtree_hash
+            else:
+                own, subtree = next(digests)
+                node_hash, subtree_hash = own.hex(), subtree.hex()
+            siblings.append({
+                "level": node.level,
+                "title": node.title,
+                "metadata": node.metadata,
+                "content": node.content,
+                "children": children,
+                "header_line": node.header_line,
+                "metadata_location": node.metadata_location,
+                "content_location_start": node.content_location_start,
+                "content_location_end": node.content_location_end,
+                "node_hash": node_hash,
+                "subtree_hash": subtree_hash,
+            })
+            if node.children:
+                stack.extend((child, children) for child in reversed(node.children))
+        return result[0]
 
     @classmethod
     def from_dict(cls, data):
         """Create Node tree from JSON-serializable dictionary (inverse of to_dict)."""
-        node = cls(
-            level=data.get("level", 0),
-            title=data.get("title", ""),
-            metadata=data.get("metadata", {}),
-            content=data.get("content", "")
-        )
-        # Restore line tracking information
-        node.header_line = data.get("header_line")
-        node.metadata_location = data.get("metadata_location", {})
-        node.content_location_start = data.get("content_location_start")
-        node.content_location_end = data.get("content_location_end")
+        result = []
+        stack = [(data, result)]
+        while stack:
+            node_data, siblings = stack.pop()
+            node = cls(
+                level=node_data.get("level", 0),
+                title=node_data.get("title", ""),
+                metadata=node_data.get("metadata", {}),
+                content=node_data.get("content", "")
+            )
+            # Restore line tracking information
+            node.header_line = node_data.get("header_line")
+            node.metadata_location = node_data.get("metadata_location", {})
+            node.content_location_start = node_data.get("content_location_start")
+            node.content_location_end = node_data.get("content_location_end")
+            siblings.append(node)
 
-        for child_data in data.get("children", []):
-            node.children.append(cls.from_dict(child_data))
-        return node
+            children = node_data.get("children")
+            if children:
+                stack.extend((child, node.children) for child in reversed(children))
+        return result[0]
 
     def to_markdown(self):
+        # Nested "\n".join()s with the same separator flatten into one join over
+        # the nodes' own lines in document order.
+        lines = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            lines.extend(node._markdown_lines())
+            if node.children:
+                stack.extend(reversed(node.children))
+        return "\n".join(lines)
+
+    def _markdown_lines(self):
+        """Markdown lines for this node alone (header, metadata, content), without children."""
         md_lines = []
         if self.level > 0:
             md_lines.append(f"{'#' * self.level} {self.title}")
@@ -88,159 +170,1107 @@ class Node:
              # If no content but valid node, ensure at least one newline separator for clarity
              md_lines.append("")
 
-        for child in self.children:
-            md_lines.append(child.to_markdown())
-            
-        return "\n".join(md_lines)
+        if not md_lines and not self.children:
+            # An empty leaf still renders as one (empty) line in its parent
+            md_lines.append("")
+        return md_lines
+
+
+def walk(node, get_children=None):
+    """
+    Iterate over a tree in pre-order (document order), starting with node itself.
+
+    Uses an explicit stack, so depth is not limited by the recursion limit.
+    get_children(n) defaults to n.children; pass another accessor to walk
+    other tree shapes (e.g. to_dict output).
+    """
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        children = current.children if get_children is None else get_children(current)
+        if children:
+            stack.extend(reversed(children))
+
+
+def write_markdown(node, fileobj):
+    """
+    Stream the markdown of a tree to a text file object.
+
+    Writes exactly node.to_markdown(), but one node at a time: extra memory
+    does not grow with the size of the tree and every line is copied once.
+
+    Args:
+        node: Root of the tree to serialize
+        fileobj: Any object with a write(str) method (file, socket makefile, StringIO)
+    """
+    write = fileobj.write
+    separator = ""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        lines = current._markdown_lines()
+        if lines:
+            write(separator + "\n".join(lines))
+            separator = "\n"
+        if current.children:
+            stack.extend(reversed(current.children))
+
+
+def iter_ndjson_records(node):
+    """
+    Yield one flat record per node, in document (pre-order) order.
+
+    Records carry the to_dict fields except children; the tree shape is kept
+    in "id" (pre-order index, root is 0) and "parent" (id of the parent, None
+    for the root). A parent always comes before its children.
+    """
+    if isinstance(node, Node):
+        _subtree_digest(node)
+        digests = None
+    else:
+        digests = iter(_tree_digests(node))
+    next_id = 0
+    stack = [(node, None)]
+    while stack:
+        current, parent_id = stack.pop()
+        node_id = next_id
+        next_id += 1
+        if digests is None:
+            node_hash, subtree_hash = current.node_hash, current.subtree_hash
+        else:
+            own, subtree = next(digests)
+            node_hash, subtree_hash = own.hex(), subtree.hex()
+        yield {
+            "id": node_id,
+            "parent": parent_id,
+            "level": current.level,
+            "title": current.title,
+            "metadata": current.metadata,
+            "content": current.content,
+            "header_line": current.header_line,
+            "metadata_location": current.metadata_location,
+            "content_location_start": current.content_location_start,
+            "content_location_end": current.content_location_end,
+            "node_hash": node_hash,
+            "subtree_hash": subtree_hash,
+        }
+        if current.children:
+            stack.extend((child, node_id) for child in reversed(current.children))
+
+
+def write_ndjson(node, fileobj):
+    """Stream a tree to fileobj as NDJSON: one iter_ndjson_records() record per line."""
+    write = fileobj.write
+    dumps = json.dumps
+    for record in iter_ndjson_records(node):
+        write(dumps(record) + "\n")
+
+
+def iter_ndjson(fileobj):
+    """Yield the node records of an NDJSON export one at a time (blank lines are skipped)."""
+    for line_number, line in enumerate(fileobj, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: invalid NDJSON record: {e}")
+
+
+def read_ndjson(fileobj):
+    """
+    Rebuild a Node tree from write_ndjson output (inverse of write_ndjson).
+
+    Args:
+        fileobj: Iterable of NDJSON lines (open file, list of strings, ...)
+
+    Returns:
+        The root Node
+    """
+    nodes = {}
+    root = None
+    for record in iter_ndjson(fileobj):
+        node = Node(
+            level=record.get("level", 0),
+            title=record.get("title", ""),
+            metadata=record.get("metadata", {}),
+            content=record.get("content", "")
+        )
+        node.header_line = record.get("header_line")
+        node.metadata_location = record.get("metadata_location", {})
+        node.content_location_start = record.get("content_location_start")
+        node.content_location_end = record.get("content_location_end")
+
+        parent_id = record.get("parent")
+        if parent_id is None:
+            if root is not None:
+                raise ValueError(f"Node {record.get('id')}: second root record")
+            root = node
+        else:
+            parent = nodes.get(parent_id)
+            if parent is None:
+                raise ValueError(f"Node {record.get('id')}: parent {parent_id} not found before it")
+            parent.children.append(node)
+        nodes[record.get("id")] = node
+
+    if root is None:
+        raise ValueError("No root record found")
+    return root
+
+
+def walk_postorder(node, get_children=None):
+    """Iterate over a tree in post-order (children before their parent), non-recursively."""
+    stack = [(node, False)]
+    while stack:
+        current, expanded = stack.pop()
+        if expanded:
+            yield current
+            continue
+        stack.append((current, True))
+        children = current.children if get_children is None else get_children(current)
+        if children:
+            stack.extend((child, False) for child in reversed(children))
+
+
+# Bytes of node / subtree digests (BLAKE2b); hex strings are twice as long
+HASH_SIZE = 16
+
+
+def _node_digest(node):
+    # repr() of the metadata is several times cheaper than json.dumps and the
+    # same for parsed, frozen and JSON-loaded values; key order counts, as it
+    # does in the markdown
+    return hashlib.blake2b(
+        f"{node.level}\0{node.title}\0{node.metadata!r}\0{node.content or ''}".encode('utf-8'),
+        digest_size=HASH_SIZE).digest()
+
+
+def _combine_digests(own, child_digests):
+    digest = hashlib.blake2b(own, digest_size=HASH_SIZE)
+    for child in child_digests:
+        digest.update(child)
+    return digest.digest()
+
+
+def _tree_digests(root):
+    """
+    (node digest, subtree digest) of every node in pre-order, without caching.
+
+    For Node-compatible views (e.g. SnapshotNode) that borrow Node's
+    serializers but have no hash cache.
+    """
+    order = []
+    child_counts = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        children = node.children
+        order.append(node)
+        child_counts.append(len(children))
+        if children:
+            stack.extend(reversed(children))
+    digests = [None] * len(order)
+    # Reverse pre-order: a node's children are done and on top of `done`,
+    # first child on top
+    done = []
+    for position in range(len(order) - 1, -1, -1):
+        own = _node_digest(order[position])
+        count = child_counts[position]
+        if count:
+            subtree = _combine_digests(own, [done.pop() for _ in range(count)])
+        else:
+            subtree = own
+        done.append(subtree)
+        digests[position] = (own, subtree)
+    return digests
+
+
+def _uncached_children(node):
+    return [child for child in node.children if child._subtree_hash is None]
+
+
+def _subtree_digest(node):
+    """Subtree digest of node, (re)computing only the subtrees whose cache was cleared."""
+    if node._subtree_hash is not None:
+        return node._subtree_hash
+    # Post-order: every child's subtree digest is known before its parent's
+    for current in walk_postorder(node, _uncached_children):
+        own = current._hash
+        if own is None:
+            own = current._hash = _node_digest(current)
+        children = current.children
+        if not children:
+            # A leaf's subtree is the node itself
+            current._subtree_hash = own
+            continue
+        current._subtree_hash = _combine_digests(own, [child._subtree_hash for child in children])
+    return node._subtree_hash
+
+
+def _header_line_key(node):
+    return node.header_line
+
+
+def _ancestors(root, node):
+    """Nodes from root down to node's parent, found by header line; None if node is not in the tree."""
+    chain = []
+    current = root
+    line = node.header_line
+    if line is not None:
+        # Children are in document order, so their header lines are sorted
+        while current is not node:
+            chain.append(current)
+            children = current.children
+            position = bisect.bisect_right(children, line, key=_header_line_key) - 1
+            if position < 0:
+                break
+            current = children[position]
+        if current is node:
+            return chain
+    # No usable line numbers (e.g. a tree built by from_dict): search the tree
+    stack = [(root, [])]
+    while stack:
+        current, path = stack.pop()
+        if current is node:
+            return path
+        path = path + [current]
+        stack.extend((child, path) for child in current.children)
+    return None
+
+
+def invalidate_hashes(root, node):
+    """
+    Forget the cached hashes of node and the subtree hashes of its ancestors.
+
+    Call after changing a node's level, title, metadata, content or children
+    in place; the next node_hash / subtree_hash access rehashes only that
+    node and its ancestor chain.
+    """
+    node._hash = None
+    node._subtree_hash = None
+    ancestors = _ancestors(root, node)
+    if ancestors is None:
+        raise ValueError(f"Node '{node.title}' is not part of the tree")
+    for ancestor in ancestors:
+        ancestor._subtree_hash = None
+
+
+class LazyContentNode(Node):
+    """
+    Node whose content is cut out of the file's text on first access.
+
+    Produced by MarkdownParser.parse_file(..., lazy_content=True). Everything
+    except content is parsed eagerly; a node only records where its content
+    block lies in the file's text, and the block is copied and stripped when
+    node.content is first used.
+    """
+    __slots__ = ('_source', '_content_span')
+
+    @property
+    def content(self):
+        if self._source is not None:
+            start, end = self._content_span
+            Node.content.__set__(self, self._source[start:end].strip())
+            self._source = None
+        return Node.content.__get__(self)
+
+    @content.setter
+    def content(self, value):
+        Node.content.__set__(self, value)
+        self._source = None
+
+    def __getstate__(self):
+        # Cut out the content before pickling/copying instead of the whole text
+        return None, {name: getattr(self, name) for name in Node.__slots__}
+
 
 # Separator constant - used to distinguish metadata from content
 CONTENT_SEPARATOR = "<!-- content -->"
 CONTENT_SEPARATOR_PATTERN = re.compile(r'^\s*<!--\s*content\s*-->\s*$')
 
+# Streaming parse events (see MarkdownParser.iter_events)
+EVENT_START = "start"
+EVENT_METADATA = "metadata"
+EVENT_CONTENT = "content"
+EVENT_END = "end"
+
+# Scanner states for iter_events
+_OUTSIDE = 0   # before the first header
+_METADATA = 1  # in the metadata block right after a header
+_CONTENT = 2   # in the content block of the current node
+
+# Metadata-block line kinds returned by MarkdownParser._metadata_line
+_SEPARATOR = object()
+_BLANK = object()
+
+# Raw metadata values longer than this are parsed per node instead of being
+# looked up in the parser's shared-value table; long free text rarely repeats.
+MAX_SHARED_VALUE_LENGTH = 256
+# Entries in one parser's shared-value table before it is reset
+MAX_SHARED_VALUES = 50_000
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(
+        f"{type(self).__name__} metadata values are shared between nodes; "
+        f"assign a new value instead of changing this one in place")
+
+
+class FrozenList(list):
+    """
+    Read-only list used for parsed list metadata values ([a, b]).
+
+    Nodes whose metadata lines are identical share one FrozenList, so in-place
+    changes are refused: assign a new list to node.metadata[key] instead.
+    """
+    __slots__ = ()
+
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class FrozenDict(dict):
+    """Read-only dict used for parsed JSON object metadata values; see FrozenList."""
+    __slots__ = ()
+
+    pop = popitem = clear = update = setdefault = _read_only
+    __setitem__ = __delitem__ = __ior__ = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _freeze(value):
+    """Deep read-only copy of a parsed metadata value (lists and dicts only)."""
+    kind = type(value)
+    if kind is list:
+        return FrozenList([_freeze(item) for item in value])
+    if kind is dict:
+        return FrozenDict({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+def _thaw(value):
+    """
+    Inverse of _freeze: plain lists and dicts (for marshal, which rejects subclasses).
+
+    Matches any list or dict subclass, not just this module's FrozenList and
+    FrozenDict: run as a script, md_parser is imported a second time under its
+    own name, and nodes may carry the other copy's classes.
+    """
+    if isinstance(value, list):
+        return [_thaw(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+# Whole-text form of header_pattern + metadata block for iter_metadata_events,
+# run over "\n" + text so that every line starts with "\n". [^\S\n] is
+# whitespace within a line: no part may run into the next line.
+_HEADER_BLOCK_SCAN = re.compile(
+    r'\n(#+)(?=\s)(.*)'                                   # header line
+    r'((?:\n[^\S\n]*(?=\n|\Z))*)'                          # blank lines before metadata
+    r'((?:\n[^\S\n]*-[^\S\n]*[a-zA-Z0-9_]+:.*)*)')          # metadata lines
+_METADATA_SCAN = re.compile(r'\n[^\S\n]*-[^\S\n]*([a-zA-Z0-9_]+):(.*)')
+
+
+def _set_lazy_content(node, text, start, end, end_line):
+    """Give a LazyContentNode the content block text[start:end], ending before line end_line."""
+    node.content_location_end = end_line
+    if start < end:
+        node._source = text
+        node._content_span = (start, end)
+
+
+def _link_nodes(root, nodes, index=None):
+    """Attach document-ordered nodes under root according to their header levels."""
+    node_stack = [root] # Stack to track hierarchy
+    for node in nodes:
+        # Pop until we find a parent with level < node.level
+        while node_stack[-1].level >= node.level:
+            node_stack.pop()
+        node_stack[-1].children.append(node)
+        if index is not None:
+            index.add(node, node_stack[-1])
+        node_stack.append(node)
+
+
+def _unwrap_root(root):
+    # If there is exactly one top-level child, and the Root node itself has no content or metadata,
+    # return the child directly.
+    if len(root.children) == 1 and not root.content and not root.metadata:
+        return root.children[0]
+    return root
+
+
+def _iter_preorder(root):
+    """Yield the parsed nodes under root (root included unless synthetic) in document order."""
+    nodes = walk(root)
+    if root.level == 0:
+        next(nodes)
+    return nodes
+
+
+def _shift_node(node, delta):
+    if not delta:
+        return
+    node.header_line += delta
+    node.metadata_location = {key: line + delta for key, line in node.metadata_location.items()}
+    node.content_location_start += delta
+    node.content_location_end += delta
+
+
+def _update_nodes(root, old_nodes, new_nodes, index=None):
+    """Copy reparsed nodes onto the nodes they replace (same header structure)."""
+    for old, new in zip(old_nodes, new_nodes):
+        # Key order is part of node_hash, dict equality ignores it
+        changed = (old.title != new.title or old.content != new.content
+                   or list(old.metadata.items()) != list(new.metadata.items()))
+        old.title = new.title
+        old.metadata = new.metadata
+        old.content = new.content
+        old.header_line = new.header_line
+        old.metadata_location = new.metadata_location
+        old.content_location_start = new.content_location_start
+        old.content_location_end = new.content_location_end
+        if changed:
+            invalidate_hashes(root, old)
+        if index is not None:
+            index.update(old)
+
+
+def _join_content(content_lines, with_content):
+    if not with_content:
+        return None
+    return "".join(content_lines).strip()
+
 class MarkdownParser:
-    def __init__(self):
+    def __init__(self, fenced_code=False):
+        # When True, '#' lines inside ``` / ~~~ fenced code blocks are content, not headers.
+        # Off by default: existing documents rely on the historical behaviour.
+        self.fenced_code = fenced_code
         # Regex for headers: # Title
         self.header_pattern = re.compile(r'^(#+)\s+(.*)')
         # Regex for metadata lines: - key: value
         self.metadata_pattern = re.compile(r'^\s*-\s*([a-zA-Z0-9_]+):\s*(.*)')
         # Regex for content separator: <!-- content -->
         self.separator_pattern = CONTENT_SEPARATOR_PATTERN
+        # raw value string -> parsed value, so identical metadata values
+        # (statuses, types, the default context_dependencies blob) are one object
+        self._shared_values = {}
+
+    def _shared_value(self, value_str):
+        """
+        parse_value(value_str), returning the same object for repeated raw values.
+
+        Keys and values of metadata are shared between nodes: strings are
+        reused as-is and list/dict values come back as FrozenList/FrozenDict.
+        """
+        value = self._shared_values.get(value_str)
+        if value is not None:
+            return value
+        value = _freeze(self.parse_value(value_str))
+        if len(value_str) <= MAX_SHARED_VALUE_LENGTH:
+            if len(self._shared_values) >= MAX_SHARED_VALUES:
+                self._shared_values.clear()
+            self._shared_values[value_str] = value
+        return value
+
+    def parse_file(self, file_path, index=None, lazy_content=False):
+        """
+        Parse a markdown file into a Node tree.
+
+        Pass a NodeIndex as index to have it filled with the new tree.
+
+        With lazy_content=True headers and metadata are found with whole-text
+        regexes (as in iter_metadata_events) and content is not split into
+        lines: each node's content is cut out of the file's text the first
+        time it is read (see LazyContentNode). Meant for callers that only
+        need the hierarchy and metadata, e.g. dependency analysis.
+        """
+        if lazy_content and not self.fenced_code:
+            return self._parse_lazy(file_path, index)
 
-    def parse_file(self, file_path):
         with open(file_path, 'r', encoding='utf-8') as f:
             lines = f.readlines()
         
-        return self.parse_lines(lines)
+        return self.parse_lines(lines, index)
+
+    def parse_value(self, value_str):
+        """Parse a raw metadata value string into a list, dict or plain string."""
+        # Basic list parsing: [a, b, c]
+        if value_str.startswith('[') and value_str.endswith(']'):
+            inner = value_str[1:-1]
+            if inner.strip():
+                return [x.strip() for x in inner.split(',')]
+            return []
+        if value_str.startswith('{') and value_str.endswith('}'):
+            try:
+                return json.loads(value_str)
+            except json.JSONDecodeError:
+                # If invalid JSON, treat as string
+                return value_str
+        return value_str
+
+    def _metadata_line(self, line):
+        """
+        Classify a line in the metadata block right after a header.
+
+        Returns _SEPARATOR, _BLANK, a (key, value) tuple for a metadata line,
+        or None for anything else (which starts the content block).
+        """
+        # Dispatch on the first non-space character so most lines skip the regexes
+        stripped = line.lstrip()
+        first = stripped[:1]
+        if first == '<' and self.separator_pattern.match(line):
+            return _SEPARATOR
+        if first == '-':
+            meta_match = self.metadata_pattern.match(line)
+            if meta_match:
+                key = sys.intern(meta_match.group(1).strip())
+                return key, self._shared_value(meta_match.group(2).strip())
+        if not stripped:
+            return _BLANK
+        return None
+
+    def iter_file_events(self, file_path, with_content=True):
+        """Stream parse events from a file without holding its lines in memory."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from self.iter_events(f, with_content=with_content)
+
+    def iter_metadata_events(self, text):
+        """
+        Only the START and METADATA events of a document, found with whole-text regexes.
+
+        Yields the same START and METADATA events as iter_events over the
+        same text, but content is never looked at line by line, so the cost
+        depends on the number of headers and metadata lines only. Meant for
+        tools that need just metadata and line numbers (schema validation).
+        """
+        if self.fenced_code:
+            # Fences change header detection; take the line-by-line route
+            for event in self.iter_events(io.StringIO(text), with_content=False):
+                if event[0] == EVENT_START or event[0] == EVENT_METADATA:
+                    yield event
+            return
+
+        shared_value = self._shared_value
+        intern = sys.intern
+        scan = "\n" + text
+        line_no = position = 0
+        for match in _HEADER_BLOCK_SCAN.finditer(scan):
+            line_no += scan.count('\n', position, match.start())
+            position = match.start()
+            yield (EVENT_START, len(match.group(1)), match.group(2).strip(), line_no)
+            block = match.group(4)
+            if block:
+                meta_line = line_no + 1 + match.group(3).count('\n')
+                for meta_line, (key, value) in enumerate(_METADATA_SCAN.findall(block), meta_line):
+                    yield (EVENT_METADATA, intern(key), shared_value(value.strip()), meta_line)
+
+    def iter_file_metadata_events(self, file_path):
+        """iter_metadata_events over a file (read in text mode, so line endings match iter_file_events)."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        return self.iter_metadata_events(text)
+
+    def _parse_lazy(self, file_path, index=None):
+        """parse_file(..., lazy_content=True): header blocks found by _HEADER_BLOCK_SCAN, content left in the text."""
+        # Text mode, so line endings (and thus line numbers) match parse_file
+        with open(file_path, 'r', encoding='utf-8') as f:
+            scan = "\n" + f.read()
+        size = len(scan)
+        separator_match_fn = self.separator_pattern.match
+        shared_value = self._shared_value
+        intern = sys.intern
+        nodes = []
+        content_start = 0  # offset in scan of the last node's content block
+        line_no = position = 0
+        for match in _HEADER_BLOCK_SCAN.finditer(scan):
+            start = match.start()
+            line_no += scan.count('\n', position, start)
+            position = start
+            if nodes:
+                _set_lazy_content(nodes[-1], scan, content_start, start, line_no)
+
+            node = LazyContentNode(len(match.group(1)), match.group(2).strip())
+            node.header_line = line_no
+            nodes.append(node)
+            next_line = line_no + 1 + match.group(3).count('\n')
+            block = match.group(4)
+            if block:
+                metadata, locations = node.metadata, node.metadata_location
+                for next_line, (key, value) in enumerate(_METADATA_SCAN.findall(block), next_line):
+                    key = intern(key)
+                    metadata[key] = shared_value(value.strip())
+                    locations[key] = next_line
+                next_line += 1
+
+            # Content starts at the line after the metadata block, unless that
+            # line is the separator (or, after metadata, the blank line) ending it
+            content_start = match.end() + 1
+            if content_start < size:
+                newline = scan.find('\n', content_start)
+                line_end = size if newline == -1 else newline + 1
+                line = scan[content_start:line_end]
+                if separator_match_fn(line) or (block and not line.strip()):
+                    content_start = line_end
+                    next_line += 1
+            node.content_location_start = next_line
+
+        if nodes:
+            end = line_no + scan.count('\n', position) - (1 if scan.endswith('\n') else 0)
+            node = nodes[-1]
+            if content_start >= size:
+                # The metadata block runs to the end of the file
+                node.content_location_start = end
+            _set_lazy_content(node, scan, content_start, size, end)
 
-    def parse_lines(self, lines):
         root = Node(0, "Root")
-        node_stack = [root] # Stack to track hierarchy
+        if index is not None:
+            index.clear()
+        _link_nodes(root, nodes, index)
+        return _unwrap_root(root)
+
+    def iter_events(self, lines, with_content=True):
+        """
+        Stream the document as parse events instead of building a Node tree.
+
+        Accepts any iterable of lines (a list, an open file, sys.stdin) and
+        reads it exactly once. Events are 4-tuples:
+
+            (EVENT_START, level, title, header_line)
+            (EVENT_METADATA, key, value, line_number)
+            (EVENT_CONTENT, content, content_location_start, content_location_end)
+            (EVENT_END, level, title, end_line)
+
+        Every START is followed by its METADATA events and exactly one CONTENT
+        event; END is emitted once the node's subtree is closed (by a header of
+        the same or a higher level, or at end of input). With
+        with_content=False content lines are not buffered and the CONTENT
+        event carries None, so memory stays constant regardless of file size.
+        """
+        open_nodes = []  # (level, title) of nodes whose subtree is still open
+        state = _OUTSIDE
+        has_metadata = False
+        content_lines = []
+        content_start = 0
+        fence = None  # opening marker of the fenced code block we are in, if any
+        fenced_code = self.fenced_code
+        header_match_fn = self.header_pattern.match
+        i = -1
+
+        for i, line in enumerate(lines):
+            # Line classification: dispatch on the first (non-space) character and
+            # only run a regex when that character makes a match possible.
+            # Headers must start at column 0; metadata lines start with '-',
+            # the content separator with '<'.
+            if state == _METADATA:
+                # Look ahead for metadata (immediately following header)
+                kind = self._metadata_line(line)
+                if kind is _SEPARATOR:
+                    # Content separator definitively ends the metadata block
+                    state = _CONTENT
+                    content_start = i + 1
+                    continue
+
+                if kind is _BLANK:
+                    # Blank line handling for backward compatibility:
+                    # If we've found metadata, blank line ends the block (old separator)
+                    # If no metadata yet, skip blank line and continue looking
+                    if has_metadata:
+                        state = _CONTENT
+                        content_start = i + 1
+                    continue
+
+                if kind is not None:
+                    has_metadata = True
+                    yield (EVENT_METADATA, kind[0], kind[1], i)
+                    continue
+
+                # Non-metadata line: content starts here
+                state = _CONTENT
+                content_start = i
 
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            header_match = self.header_pattern.match(line)
+            if fenced_code:
+                stripped = line.lstrip()
+                if fence is not None:
+                    if stripped.startswith(fence):
+                        fence = None
+                    if state == _CONTENT and with_content:
+                        content_lines.append(line)
+                    continue
+                if stripped[:3] in ('```', '~~~') and state != _OUTSIDE:
+                    fence = stripped[:3]
+                    if with_content:
+                        content_lines.append(line)
+                    continue
 
+            header_match = header_match_fn(line) if line[:1] == '#' else None
             if header_match:
+                if state != _OUTSIDE:
+                    yield (EVENT_CONTENT, _join_content(content_lines, with_content), content_start, i)
+                    content_lines = []
+
                 level = len(header_match.group(1))
                 title = header_match.group(2).strip()
-                new_node = Node(level, title)
-                new_node.header_line = i  # Track header line number
 
-                # Look ahead for metadata (immediately following header)
-                i += 1
-                while i < len(lines):
-                    meta_line = lines[i]
-                    # Check for content separator - this definitively ends metadata block
-                    if self.separator_pattern.match(meta_line):
-                        i += 1  # Skip the separator line
-                        break
-                    
-                    # Check for metadata line
-                    meta_match = self.metadata_pattern.match(meta_line)
-
-                    if meta_match:
-                        key = meta_match.group(1).strip()
-                        value_str = meta_match.group(2).strip()
-
-                        # Basic list parsing: [a, b, c]
-                        if value_str.startswith('[') and value_str.endswith(']'):
-                            inner = value_str[1:-1]
-                            if inner.strip():
-                                value = [x.strip() for x in inner.split(',')]
-                            else:
-                                value = []
-                        elif value_str.startswith('{') and value_str.endswith('}'):
-                            try:
-                                value = json.loads(value_str)
-                            except json.JSONDecodeError:
-                                # If invalid JSON, treat as string
-                                value = value_str
-                        else:
-                            value = value_str
-
-                        new_node.metadata[key] = value
-                        new_node.metadata_location[key] = i  # Track metadata line number
-                        i += 1
-                    elif meta_line.strip() == "":
-                        # Blank line handling for backward compatibility:
-                        # If we've found metadata, blank line ends the block (old separator)
-                        # If no metadata yet, skip blank line and continue looking
-                        if new_node.metadata:
-                            i += 1  # Skip the blank line
-                            break   # End metadata block
-                        else:
-                            i += 1
-                            continue
-                    else:
-                        # Non-metadata line, stop looking for metadata
-                        break
-
-                # Capture content until next header
-                content_lines = []
-                new_node.content_location_start = i  # Track content start
-                while i < len(lines):
-                    if self.header_pattern.match(lines[i]):
-                        break # Next header found
-                    content_lines.append(lines[i])
-                    i += 1
-
-                new_node.content_location_end = i  # Track content end
-                new_node.content = "".join(content_lines).strip()
-
-                # Place node in hierarchy
-                # Pop until we find a parent with level < new_node.level
-                while node_stack[-1].level >= level:
-                    node_stack.pop()
-                
-                node_stack[-1].children.append(new_node)
-                node_stack.append(new_node)
-            else:
-                # Content before first header?
-                # For now just ignore or append to root content if needed
-                i += 1
-        
-        # Check if we should unwrap the root
-        # If there is exactly one top-level child, and the Root node itself has no content or metadata,
-        # return the child directly.
-        if len(root.children) == 1 and not root.content and not root.metadata:
-             return root.children[0]
-             
-        return root
+                # Close every open node that cannot be an ancestor of this one
+                while open_nodes and open_nodes[-1][0] >= level:
+                    closed_level, closed_title = open_nodes.pop()
+                    yield (EVENT_END, closed_level, closed_title, i)
+
+                open_nodes.append((level, title))
+                yield (EVENT_START, level, title, i)
+                state = _METADATA
+                has_metadata = False
+            elif state == _CONTENT and with_content:
+                content_lines.append(line)
+
+        end = i + 1
+        if state == _METADATA:
+            content_start = end
+        if state != _OUTSIDE:
+            yield (EVENT_CONTENT, _join_content(content_lines, with_content), content_start, end)
+        while open_nodes:
+            closed_level, closed_title = open_nodes.pop()
+            yield (EVENT_END, closed_level, closed_title, end)
+
+    def parse_lines(self, lines, index=None):
+        root = Node(0, "Root")
+        if index is not None:
+            index.clear()
+        _link_nodes(root, self._build_nodes(self.iter_events(lines)), index)
+        return _unwrap_root(root)
+
+    def reparse_range(self, root, lines, start, end, replacement, index=None):
+        """
+        Apply a line edit and update a previously parsed tree incrementally.
+
+        Args:
+            root: Tree returned by parse_lines/parse_file for `lines`.
+            lines: The document lines the tree was parsed from. Updated in place
+                (lines[start:end] = replacement).
+            start, end: Edited line range [start, end) in the current document.
+            replacement: New lines (newline-terminated) for that range.
+            index: Optional NodeIndex of root; kept consistent with the result.
+
+        Only the nodes whose header-to-next-header span touches the edit are
+        reparsed; the line tracking of every following node is shifted. Node
+        objects outside the edit keep their identity. If the edit adds or
+        removes headers the hierarchy is relinked from node levels, which
+        may change the returned root (e.g. a second top-level header
+        appears), so always use the return value.
+
+        With a NodeIndex, an edit that keeps the line count and the header
+        structure costs only the reparse of its region (no tree walk).
+        """
+        replacement = list(replacement)
+        if self.fenced_code:
+            # An edit that opens or closes a fence changes the meaning of every
+            # line after it, so a local reparse is not safe.
+            lines[start:end] = replacement
+            return self.parse_lines(lines, index)
+
+        # Other indexes (e.g. search.TrigramIndex) cannot look up headers by line
+        if isinstance(index, NodeIndex) and len(replacement) == end - start and \
+                self._reparse_in_place(root, lines, start, end, replacement, index):
+            return root
+
+        flat = list(_iter_preorder(root))
+        header_lines = [node.header_line for node in flat]
+
+        # Region to reparse: from the last header before the edit (the edit
+        # may merge into that node) up to the first header after it. Both
+        # boundary headers are untouched, so the scanner state resets there.
+        first = bisect.bisect_left(header_lines, start)
+        region_start = header_lines[first - 1] if first > 0 else 0
+        if first > 0:
+            first -= 1
+        last = bisect.bisect_left(header_lines, end)
+        region_end = header_lines[last] if last < len(flat) else len(lines)
+
+        delta = len(replacement) - (end - start)
+        lines[start:end] = replacement
+        region = lines[region_start:region_end + delta]
+        new_nodes = self._build_nodes(self.iter_events(region), offset=region_start)
+
+        old_nodes = flat[first:last]
+        for node in flat[last:]:
+            _shift_node(node, delta)
+            if index is not None and delta:
+                index.update_line(node)
+
+        if [n.level for n in new_nodes] == [n.level for n in old_nodes]:
+            # Same header structure: update the existing nodes in place
+            _update_nodes(root, old_nodes, new_nodes, index)
+            return root
+
+        flat[first:last] = new_nodes
+        new_root = root if root.level == 0 else Node(0, "Root")
+        previous_children = [node.children for node in flat]
+        previous_root_children = new_root.children
+        for node in flat:
+            node.children = []
+        new_root.children = []
+        if index is not None:
+            index.clear()
+        _link_nodes(new_root, flat, index)
+        result = _unwrap_root(new_root)
+
+        # Subtree hashes change only above new nodes and nodes whose children
+        # changed; nodes that merely got a new parent keep theirs
+        changed = [node for node, before in zip(flat, previous_children) if node.children != before]
+        if new_root.children != previous_root_children:
+            new_root._subtree_hash = None
+        for node in changed + new_nodes:
+            node._subtree_hash = None
+            for ancestor in _ancestors(result, node) or ():
+                ancestor._subtree_hash = None
+        return result
+
+    def _reparse_in_place(self, root, lines, start, end, replacement, index):
+        """
+        reparse_range for an edit that keeps the line count, with the region
+        found through index.at_line instead of a walk of the tree.
+
+        Returns:
+            False (lines untouched) if the edit changes the header structure
+        """
+        # Same region as reparse_range: last header before the edit up to the
+        # first header at or after its end
+        region_start = start - 1
+        while region_start > 0 and index.at_line(region_start) is None:
+            region_start -= 1
+        region_start = max(region_start, 0)
+        region_end = end
+        while region_end < len(lines) and index.at_line(region_end) is None:
+            region_end += 1
+
+        old_nodes = [node for node in map(index.at_line, range(region_start, region_end)) if node is not None]
+        region = lines[region_start:start] + replacement + lines[end:region_end]
+        new_nodes = self._build_nodes(self.iter_events(region), offset=region_start)
+        if [n.level for n in new_nodes] != [n.level for n in old_nodes]:
+            return False
+        lines[start:end] = replacement
+        _update_nodes(root, old_nodes, new_nodes, index)
+        return True
+
+    def _build_nodes(self, events, offset=0):
+        """Turn a parse event stream into a flat, document-ordered list of unlinked Nodes."""
+        nodes = []
+        current = None
+        for event in events:
+            kind = event[0]
+            if kind == EVENT_METADATA:
+                _, key, value, line_number = event
+                current.metadata[key] = value
+                current.metadata_location[key] = line_number + offset  # Track metadata line number
+            elif kind == EVENT_START:
+                _, level, title, header_line = event
+                current = Node(level, title)
+                current.header_line = header_line + offset  # Track header line number
+                nodes.append(current)
+            elif kind == EVENT_CONTENT:
+                _, content, start, end = event
+                current.content = content
+                current.content_location_start = start + offset  # Track content start
+                current.content_location_end = end + offset  # Track content end
+        return nodes
 
     def validate(self, node):
-        errors = []
-        # Example validation: check if status is valid enum if present
-        if 'status' in node.metadata:
-            valid_statuses = ['todo', 'in-progress', 'done', 'blocked', 'proposed', 'active', 'draft', 'pending'] # Expanded list based on usage
-            if node.metadata['status'] not in valid_statuses:
-                errors.append(f"Invalid status '{node.metadata['status']}' in node '{node.title}' (Allowed: {valid_statuses})")
-        
-        if 'type' in node.metadata:
-            valid_types = ['plan', 'task', 'recurring', 'agent_skill', 'protocol', 'guideline', 'log', 'context']
-            if node.metadata['type'] not in valid_types:
-                errors.append(f"Invalid type '{node.metadata['type']}' in node '{node.title}' (Allowed: {valid_types})")
+        """
+        Check a tree's metadata against the MD_CONVENTIONS.md schema.
+
+        Besides status and type values this checks value types, id and
+        last_checked formats, extended key names and duplicate ids, so the
+        command line exits with 1 for files the old enum-only check passed.
+
+        Returns a list of error messages, each with its (1-based) line number.
+        """
+        schema = _schema_module().get_default_schema()
+        return [str(error) for error in schema.validate_tree(node)]
+
+def _schema_module():
+    # Imported lazily: schema itself imports this module
+    try:
+        from . import schema
+    except ImportError:
+        import schema
+    return schema
+
+def _parse_cache_module():
+    # Imported lazily: parse_cache itself imports this module
+    try:
+        from . import parse_cache
+    except ImportError:
+        import parse_cache
+    return parse_cache
+
+
+def _parse_worker(task):
+    """Process-pool task: parse one file and ship it back as a compact payload."""
+    index, path, fenced_code, cache_dir = task
+    try:
+        parse_cache = _parse_cache_module()
+        parser = MarkdownParser(fenced_code=fenced_code)
+        if cache_dir:
+            # Only the disk store can hit here; leave the process's default cache alone
+            root = parse_cache.ParseCache(cache_dir).parse_file(path, parser)
+        else:
+            root = parser.parse_file(path)
+        return index, parse_cache.dump_tree(root), None
+    except Exception as e:
+        return index, None, f"{type(e).__name__}: {e}"
+
+
+def iter_parse_many(paths, workers=None, fenced_code=False, use_cache=False):
+    """
+    Parse many files in parallel, yielding results as each file finishes.
+
+    Yields (index, path, tree, error) tuples in completion order; exactly one of
+    tree and error is None. Parsing runs in a process pool of `workers`
+    processes (default: CPU count); workers=1 parses in-process. With
+    use_cache, workers reuse trees from the parse cache's disk store (the
+    default cache's, else parse_cache.CLI_CACHE_DIR): pool processes are new
+    for every call, so an in-memory cache could not hit.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    parse_cache = _parse_cache_module()
+    cache_dir = (parse_cache.get_default_cache().cache_dir or parse_cache.CLI_CACHE_DIR) if use_cache else None
+    paths = list(paths)
+    tasks = [(index, path, fenced_code, cache_dir) for index, path in enumerate(paths)]
+    load_tree = parse_cache.load_tree
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        results = map(_parse_worker, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+        results = (future.result() for future in as_completed([executor.submit(_parse_worker, task) for task in tasks]))
+
+    try:
+        for index, payload, error in results:
+            tree = load_tree(payload) if payload is not None else None
+            yield index, paths[index], tree, error
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def parse_many(paths, workers=None, fenced_code=False, use_cache=False):
+    """
+    Parse many files in parallel.
+
+    Returns a list of (path, tree, error) tuples in input order; a file that
+    failed to parse has tree None and an error message instead.
+    """
+    paths = list(paths)
+    results = [None] * len(paths)
+    for index, path, tree, error in iter_parse_many(paths, workers, fenced_code, use_cache):
+        results[index] = (path, tree, error)
+    return results
 
-        for child in node.children:
-            errors.extend(self.validate(child))
-        return errors
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Parse and validate Markdown files with Metadata.")
     add_standard_arguments(parser, multi_file=False)
     # Also add positional args which are handled by validat_and_get_pairs
     parser.add_argument('args', nargs='*', help='Input file (and optional output file)')
+    parser.add_argument('--events', action='store_true',
+                        help='Stream parse events as JSON lines instead of building the tree. Use "-" as input to read stdin.')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='Output the tree as NDJSON (one node per line) instead of one nested JSON document.')
+    parser.add_argument('--fenced-code', action='store_true',
+                        help='Treat header-like lines inside ``` / ~~~ fenced code blocks as content.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always parse from scratch instead of reusing the on-disk parse cache (PLANNER_CACHE_DIR, default ~/.cache/planner).')
+    parser.add_argument('--batch', action='store_true',
+                        help='Parse and validate many files or glob patterns in parallel, printing one JSON result per line as each file finishes.')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Worker processes for --batch (default: CPU count).')
+    parser.add_argument('--validate-only', action='store_true',
+                        help='In --batch mode, report validation results without the parsed tree.')
 
     args = parser.parse_args()
     
     try:
+        if args.batch:
+            paths = expand_input_patterns(args.input + args.args)
+            if not paths:
+                print("md_parser.py: Error: No input files matched.", file=sys.stderr)
+                sys.exit(1)
+
+            if args.validate_only:
+                # Workers check metadata only and send back just the errors
+                failed = False
+                for _, input_path, errors, error in _schema_module().iter_validate_many(
+                        paths, workers=args.workers, fenced_code=args.fenced_code):
+                    record = {"path": input_path}
+                    if error:
+                        record["error"] = error
+                        failed = True
+                    else:
+                        record["errors"] = [str(e) for e in errors]
+                        failed = failed or bool(errors)
+                    print(json.dumps(record), flush=True)
+                sys.exit(1 if failed else 0)
+
+            parser_obj = MarkdownParser(fenced_code=args.fenced_code)
+            failed = False
+            for _, input_path, root_node, error in iter_parse_many(
+                    paths, args.workers, fenced_code=args.fenced_code, use_cache=not args.no_cache):
+                record = {"path": input_path}
+                if error:
+                    record["error"] = error
+                    failed = True
+                else:
+                    record["errors"] = parser_obj.validate(root_node)
+                    failed = failed or bool(record["errors"])
+                    record["tree"] = root_node.to_dict()
+                print(json.dumps(record), flush=True)
+            sys.exit(1 if failed else 0)
+
         # allow_single_file_stdio=True because md_parser can print to stdout
         pairs = validate_and_get_pairs(args, args.args, tool_name="md_parser.py", allow_single_file_stdio=True)
         
-        parser_obj = MarkdownParser()
+        parser_obj = MarkdownParser(fenced_code=args.fenced_code)
         
         for input_path, output_path in pairs:
-            root_node = parser_obj.parse_file(input_path)
+            if args.events:
+                out = open(output_path, 'w') if output_path else sys.stdout
+                try:
+                    events = parser_obj.iter_events(sys.stdin) if input_path == '-' else parser_obj.iter_file_events(input_path)
+                    for event in events:
+                        out.write(json.dumps(event) + "\n")
+                finally:
+                    if output_path:
+                        out.close()
+                continue
+
+            if args.no_cache:
+                root_node = parser_obj.parse_file(input_path)
+            else:
+                from parse_cache import enable_disk_cache
+                root_node = enable_disk_cache().parse_file(input_path, parser_obj)
             errors = parser_obj.validate(root_node)
             
             if errors:
@@ -248,6 +1278,12 @@ if __name__ == "__main__":
                 for err in errors:
                     print(f"- {err}", file=sys.stderr)
                 sys.exit(1)
+            elif args.ndjson:
+                if output_path:
+                    with open(output_path, 'w') as f:
+                        write_ndjson(root_node, f)
+                else:
+                    write_ndjson(root_node, sys.stdout)
             else:
                 result = json.dumps(root_node.to_dict(), indent=2)
                 if output_path:
@@ -0,0 +1,232 @@
+"""
+Node Index Module - Constant-time node lookups for parsed plans.
+
+A NodeIndex maps:
+1. Metadata id -> node
+2. Title -> nodes (titles are not unique)
+3. Title path (titles from the top node down) -> node
+4. Header line -> node
+
+MarkdownParser.parse_lines/parse_file fill an index while they link the
+tree (pass index=NodeIndex()); NodeIndex(root) indexes an existing tree.
+When a tree is edited in memory, report the change with add_subtree,
+remove_subtree or update so the lookups stay consistent; reparse_range does
+this itself when given the index.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+PATH_SEPARATOR = "."
+
+
+class NodeIndex:
+    """Lookup tables from id, title, title path and header line to Node."""
+
+    def __init__(self, root=None):
+        # id(node) -> [node, parent, node_id, title, path, header_line]
+        self._entries: Dict[int, list] = {}
+        # Lookup tables; every value is a list of nodes in insertion order
+        self._by_id: Dict[str, list] = {}
+        self._by_title: Dict[str, list] = {}
+        self._by_path: Dict[Tuple[str, ...], list] = {}
+        self._by_line: Dict[int, list] = {}
+        if root is not None:
+            self.build(root)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, node) -> bool:
+        return id(node) in self._entries
+
+    # --- Building and maintenance ---
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_id.clear()
+        self._by_title.clear()
+        self._by_path.clear()
+        self._by_line.clear()
+
+    def build(self, root) -> "NodeIndex":
+        """Replace the index contents with every node of root's tree."""
+        self.clear()
+        if root.level == 0:
+            # The synthetic parse root is not a plan node; index below it
+            for child in root.children:
+                self.add_subtree(child)
+        else:
+            self.add_subtree(root)
+        return self
+
+    def add(self, node, parent=None) -> None:
+        """
+        Index a single node (not its children).
+
+        Args:
+            node: Node to add
+            parent: Its parent; must already be indexed. None (or a synthetic
+                level-0 root) makes node a top-level node.
+        """
+        parent_entry = self._entries.get(id(parent)) if parent is not None else None
+        if parent_entry is None:
+            parent = None
+            path = (node.title,)
+        else:
+            path = parent_entry[4] + (node.title,)
+        entry = [node, parent, _node_id(node), node.title, path, node.header_line]
+        self._entries[id(node)] = entry
+        self._insert(entry)
+
+    def add_subtree(self, node, parent=None) -> None:
+        """Index node and all of its descendants."""
+        stack = [(node, parent)]
+        while stack:
+            current, current_parent = stack.pop()
+            self.add(current, current_parent)
+            stack.extend((child, current) for child in reversed(current.children))
+
+    def remove_subtree(self, node) -> None:
+        """Drop node and all of its descendants from the index."""
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            entry = self._entries.pop(id(current), None)
+            if entry is not None:
+                self._discard(entry)
+            stack.extend(current.children)
+
+    def update(self, node) -> None:
+        """
+        Re-key node after its title, metadata id or header line changed.
+
+        A changed title also changes the paths of all descendants.
+        """
+        entry = self._entries.get(id(node))
+        if entry is None:
+            raise KeyError(f"Node '{node.title}' is not in the index")
+        title_changed = entry[3] != node.title
+        self._discard(entry)
+        parent_entry = self._entries.get(id(entry[1])) if entry[1] is not None else None
+        entry[2] = _node_id(node)
+        entry[3] = node.title
+        entry[4] = (parent_entry[4] if parent_entry else ()) + (node.title,)
+        entry[5] = node.header_line
+        self._insert(entry)
+        if title_changed:
+            stack = list(node.children)
+            while stack:
+                current = stack.pop()
+                child_entry = self._entries.get(id(current))
+                if child_entry is None:
+                    continue
+                _remove_from(self._by_path, child_entry[4], current)
+                child_entry[4] = self._entries[id(child_entry[1])][4] + (current.title,)
+                self._by_path.setdefault(child_entry[4], []).append(current)
+                stack.extend(current.children)
+
+    def update_line(self, node) -> None:
+        """Re-key node after only its header line moved (cheaper than update)."""
+        entry = self._entries.get(id(node))
+        if entry is None or entry[5] == node.header_line:
+            return
+        if entry[5] is not None:
+            _remove_from(self._by_line, entry[5], node)
+        entry[5] = node.header_line
+        if entry[5] is not None:
+            self._by_line.setdefault(entry[5], []).append(node)
+
+    def _insert(self, entry) -> None:
+        node, _, node_id, title, path, line = entry
+        if node_id is not None:
+            self._by_id.setdefault(node_id, []).append(node)
+        self._by_title.setdefault(title, []).append(node)
+        self._by_path.setdefault(path, []).append(node)
+        if line is not None:
+            self._by_line.setdefault(line, []).append(node)
+
+    def _discard(self, entry) -> None:
+        node, _, node_id, title, path, line = entry
+        if node_id is not None:
+            _remove_from(self._by_id, node_id, node)
+        _remove_from(self._by_title, title, node)
+        _remove_from(self._by_path, path, node)
+        if line is not None:
+            _remove_from(self._by_line, line, node)
+
+    # --- Lookups ---
+
+    def get(self, node_id: str):
+        """Node with metadata id node_id (the first one if ids repeat), or None."""
+        nodes = self._by_id.get(node_id)
+        return nodes[0] if nodes else None
+
+    def find_id(self, node_id: str) -> List:
+        """All nodes with metadata id node_id (ids should be unique, but may not be)."""
+        return list(self._by_id.get(node_id, ()))
+
+    def find_title(self, title: str) -> List:
+        """All nodes with this title."""
+        return list(self._by_title.get(title, ()))
+
+    def get_path(self, path: Union[str, Sequence[str]]):
+        """
+        Node at a title path, or None.
+
+        Args:
+            path: Titles from the top node down, as a sequence or joined with
+                PATH_SEPARATOR (use a sequence when titles contain dots)
+        """
+        if isinstance(path, str):
+            path = path.split(PATH_SEPARATOR)
+        nodes = self._by_path.get(tuple(path))
+        return nodes[0] if nodes else None
+
+    def find_path(self, path: Union[str, Sequence[str]]) -> List:
+        """All nodes at a title path (sibling titles may repeat)."""
+        if isinstance(path, str):
+            path = path.split(PATH_SEPARATOR)
+        return list(self._by_path.get(tuple(path), ()))
+
+    def find_child(self, parent, title: str):
+        """First child of an indexed parent with this title, or None."""
+        parent_path = self.path_of(parent)
+        if parent_path is None:
+            return None
+        for node in self._by_path.get(parent_path + (title,), ()):
+            # Same-titled parents share a path; keep parent's own child
+            if self.parent_of(node) is parent:
+                return node
+        return None
+
+    def at_line(self, line: int):
+        """Node whose header is on this (0-based) line, or None."""
+        nodes = self._by_line.get(line)
+        return nodes[0] if nodes else None
+
+    def parent_of(self, node):
+        """Indexed parent of node (None for top-level nodes)."""
+        entry = self._entries.get(id(node))
+        return entry[1] if entry else None
+
+    def path_of(self, node) -> Optional[Tuple[str, ...]]:
+        """Title path of node, or None if it is not indexed."""
+        entry = self._entries.get(id(node))
+        return entry[4] if entry else None
+
+
+def _node_id(node) -> Optional[str]:
+    node_id = node.metadata.get('id') if node.metadata else None
+    return node_id if isinstance(node_id, str) else None
+
+
+def _remove_from(table: dict, key, node) -> None:
+    nodes = table.get(key)
+    if not nodes:
+        return
+    for position, candidate in enumerate(nodes):
+        if candidate is node:
+            del nodes[position]
+            break
+    if not nodes:
+        del table[key]
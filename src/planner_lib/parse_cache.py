@@ -0,0 +1,331 @@
+"""
+Parse Cache Module - Reuse parsed trees for markdown files that have not changed.
+
+Two layers sit in front of MarkdownParser.parse_file:
+1. An in-memory LRU of serialized trees, bounded by entry count
+2. An on-disk store of the same payloads, bounded by total size
+
+Entries are keyed by (absolute path, inode, size, mtime_ns, content hash) plus
+the parser options. A matching (inode, size, mtime_ns) in memory is trusted
+without re-reading the file (the inode catches files replaced by rename within
+the mtime granularity); otherwise the file is read once, hashed, and the hash
+decides between a cache hit and a fresh parse. A parsed tree does not depend
+on where the file lives, so the disk store is addressed by content hash alone:
+identical files (e.g. a fresh clone of an unchanged repository) share entries.
+The default cache of a long-running process (Streamlit) uses the disk store
+only if PLANNER_CACHE_DIR is set: on Cloud Run the file system is
+memory-backed and counts against the instance's memory limit. One-shot
+command-line runs (md_parser.py, update_master_plan.py, parse_many workers)
+can only hit across processes, so enable_disk_cache() gives them the disk
+store, by default under the user's cache directory (~/.cache/planner).
+
+Every call returns a freshly built Node tree, so callers may mutate it freely.
+"""
+
+import hashlib
+import io
+import marshal
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    from .md_parser import MarkdownParser, Node, _freeze, _iter_preorder, _thaw
+except ImportError:
+    from md_parser import MarkdownParser, Node, _freeze, _iter_preorder, _thaw
+
+# Bump when the payload layout changes; old files are then ignored
+CACHE_FORMAT = 1
+CACHE_SUFFIX = f".v{CACHE_FORMAT}.tree"
+
+# None keeps the default cache in memory only
+DEFAULT_CACHE_DIR = os.environ.get("PLANNER_CACHE_DIR") or None
+# Disk store of command-line runs (see enable_disk_cache)
+CLI_CACHE_DIR = DEFAULT_CACHE_DIR or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "planner")
+
+
+_PLAIN = (list, dict)
+
+
+def _plain_metadata(metadata: dict, memo: dict) -> dict:
+    """
+    metadata with list/dict values thawed into plain copies; shared values stay
+    shared via memo.
+
+    Any list or dict is copied, not only FrozenList/FrozenDict: trees built by
+    another copy of md_parser (e.g. the CLI running as __main__) carry that
+    copy's classes, which marshal rejects just the same.
+    """
+    for value in metadata.values():
+        if isinstance(value, _PLAIN):
+            break
+    else:
+        return metadata
+    plain = {}
+    for key, value in metadata.items():
+        if isinstance(value, _PLAIN):
+            thawed = memo.get(id(value))
+            if thawed is None:
+                thawed = memo[id(value)] = _thaw(value)
+            value = thawed
+        plain[key] = value
+    return plain
+
+
+def _frozen_metadata(metadata: dict, memo: dict) -> dict:
+    """Inverse of _plain_metadata, in place; marshal kept the sharing, memo keeps it frozen."""
+    for key, value in metadata.items():
+        if type(value) in _PLAIN:
+            frozen = memo.get(id(value))
+            if frozen is None:
+                frozen = memo[id(value)] = _freeze(value)
+            metadata[key] = frozen
+    return metadata
+
+
+def dump_tree(root: Node) -> bytes:
+    """Serialize a Node tree into a compact marshal payload (pre-order rows)."""
+    rows = []
+    memo = {}
+    # A synthetic root is stored in the header; an unwrapped root is the first row
+    for node in _iter_preorder(root):
+        rows.append((
+            node.level, node.title, _plain_metadata(node.metadata, memo), node.content, node.header_line,
+            node.metadata_location, node.content_location_start, node.content_location_end,
+            len(node.children),
+        ))
+    has_root = root.level == 0
+    header = (CACHE_FORMAT, has_root,
+              (root.title, _plain_metadata(root.metadata, memo), root.content) if has_root else None)
+    return marshal.dumps((header, rows))
+
+
+def load_tree(payload: bytes) -> Node:
+    """Rebuild a Node tree from dump_tree output."""
+    (version, has_root, root_fields), rows = marshal.loads(payload)
+    if version != CACHE_FORMAT:
+        raise ValueError(f"Unsupported parse cache format {version}")
+
+    new = Node.__new__
+    # Values that were shared when dumped are one object again (marshal refs);
+    # memo maps each to its single frozen copy
+    memo = {}
+    if has_root:
+        root = Node(0, root_fields[0], _frozen_metadata(root_fields[1], memo), root_fields[2])
+    else:
+        root = Node(0, "Root")
+
+    # (node, children still to attach)
+    stack = [[root, -1]]
+    for level, title, metadata, content, header_line, metadata_location, start, end, child_count in rows:
+        node = new(Node)
+        node.level = level
+        node.title = title
+        node.metadata = _frozen_metadata(metadata, memo) if metadata else metadata
+        node.content = content
+        node.children = []
+        node.header_line = header_line
+        node.metadata_location = metadata_location
+        node.content_location_start = start
+        node.content_location_end = end
+        node._hash = None
+        node._subtree_hash = None
+
+        parent = stack[-1]
+        parent[0].children.append(node)
+        parent[1] -= 1
+        if parent[1] == 0:
+            stack.pop()
+        if child_count:
+            stack.append([node, child_count])
+
+    if has_root:
+        return root
+    return root.children[0]
+
+
+class ParseCache:
+    """Two-level (memory LRU + disk) cache of parsed markdown trees."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 16,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory for the on-disk store; None keeps the cache in memory only.
+            max_entries: Number of files kept in the in-memory LRU.
+            max_disk_bytes: Upper bound for the on-disk store; oldest entries are evicted first.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        # path -> (inode, size, mtime_ns, digest, options, payload)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def parse_file(self, file_path: str, parser: Optional[MarkdownParser] = None) -> Node:
+        """Return the parsed tree for file_path, parsing only if the file changed."""
+        parser = parser or MarkdownParser()
+        path = os.path.abspath(file_path)
+        options = f"fenced{int(parser.fenced_code)}"
+
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._memory.get(path)
+            if entry and entry[:3] == (stat.st_ino, stat.st_size, stat.st_mtime_ns) and entry[4] == options:
+                self._memory.move_to_end(path)
+                self.hits += 1
+                return load_tree(entry[5])
+
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+        root = None
+        payload = None
+        if entry and entry[3] == digest and entry[4] == options:
+            payload = entry[5]  # touched but unchanged
+        if payload is None:
+            payload = self._read_disk(digest, options)
+        if payload is not None:
+            try:
+                root = load_tree(payload)
+                self.hits += 1
+            except Exception:
+                # Truncated, corrupt or foreign cache file: fall through to a fresh parse
+                root = None
+        if root is None:
+            self.misses += 1
+            # Same decoding as parse_file: utf-8 with universal newlines
+            lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8').readlines()
+            root = parser.parse_lines(lines)
+            payload = dump_tree(root)
+            self._write_disk(digest, options, payload)
+
+        with self._lock:
+            self._memory[path] = (stat.st_ino, stat.st_size, stat.st_mtime_ns, digest, options, payload)
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return root
+
+    # --- Invalidation hooks ---
+
+    def invalidate(self, file_path: str) -> None:
+        """Drop the cached tree of file_path (memory entry and its disk payload)."""
+        path = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._memory.pop(path, None)
+        if entry and self.cache_dir:
+            self._remove(self._disk_path(entry[3], entry[4]))
+
+    def clear(self) -> None:
+        """Drop all cached trees."""
+        with self._lock:
+            self._memory.clear()
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    # --- Disk store ---
+
+    def _disk_path(self, digest: str, options: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}-{options}{CACHE_SUFFIX}")
+
+    def _read_disk(self, digest: str, options: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        disk_path = self._disk_path(digest, options)
+        try:
+            with open(disk_path, 'rb') as f:
+                payload = f.read()
+            os.utime(disk_path)  # keep recently used entries out of eviction
+            return payload
+        except OSError:
+            return None
+
+    def _write_disk(self, digest: str, options: str, payload: bytes) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, self._disk_path(digest, options))
+            except OSError:
+                self._remove(tmp_path)
+                raise
+            self._evict_disk()
+        except OSError:
+            # The cache is an optimization; never fail a parse because of it
+            pass
+
+    def _evict_disk(self) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            full_path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, full_path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, full_path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(full_path)
+            total -= size
+
+    @staticmethod
+    def _remove(full_path: str) -> None:
+        try:
+            os.remove(full_path)
+        except OSError:
+            pass
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> ParseCache:
+    """Process-wide cache; also stored on disk under PLANNER_CACHE_DIR if that is set."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ParseCache(DEFAULT_CACHE_DIR)
+        return _default_cache
+
+
+def enable_disk_cache(cache_dir: Optional[str] = None) -> ParseCache:
+    """
+    Give the default cache a disk store, for command-line tools: every run is
+    a new process, so its memory LRU never hits.
+
+    Args:
+        cache_dir: Directory of the store (default: CLI_CACHE_DIR); ignored
+            if the default cache already has one
+    """
+    cache = get_default_cache()
+    with _default_cache_lock:
+        if cache.cache_dir is None:
+            cache.cache_dir = cache_dir or CLI_CACHE_DIR
+    return cache
+
+
+def parse_file_cached(file_path: str, parser: Optional[MarkdownParser] = None) -> Node:
+    """Convenience function: parse file_path through the default cache."""
+    return get_default_cache().parse_file(file_path, parser)
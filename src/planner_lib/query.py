@@ -0,0 +1,403 @@
+"""
+Query Module - Metadata queries over a parsed plan.
+
+A QueryEngine indexes a tree once:
+1. Pre-order numbering: node i's subtree is the interval (i, subtree_end[i])
+2. Inverted indexes: metadata key -> value -> node numbers
+   (list values are indexed per item)
+
+and then answers filter expressions with bitmask operations (bit i = node i)
+instead of tree walks:
+
+    status=todo AND owner=dev-1 AND priority IN (high, critical) AND UNDER repo-x
+    NOT status=done AND HAS estimate
+    (type=task OR type=recurring) AND blocked_by=setup.env
+
+Operators:
+    key=value, key!=value   value match (!= only matches nodes that have key)
+    key IN (v1, v2, ...)    any of the values
+    HAS key                 key present
+    UNDER target            descendants of the node(s) whose id (or else title) is target
+    NOT, AND, OR, ( )       usual precedence: NOT > AND > OR
+Values are bare words or "quoted strings"; keywords are case-insensitive.
+
+Usable as a library (QueryEngine, query_file), from the command line
+(python query.py FILE "EXPRESSION") and through /api/query.
+"""
+
+import re
+import sys
+import json
+import argparse
+import threading
+from itertools import compress, islice
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .md_parser import MarkdownParser, Node
+    from .file_lock import file_lock
+    from .index_cache import IndexCache, get_default_index_cache
+except ImportError:
+    from md_parser import MarkdownParser, Node
+    from file_lock import file_lock
+    from index_cache import IndexCache, get_default_index_cache
+
+KEYWORDS = {'and', 'or', 'not', 'in', 'has', 'under'}
+
+_TOKEN_PATTERN = re.compile(r'''
+    \s*(?:
+        (?P<op>!=|=|\(|\)|,)
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<word>[^\s=!(),"']+)
+    )''', re.VERBOSE)
+
+
+class QuerySyntaxError(ValueError):
+    """Raised when a filter expression cannot be parsed."""
+    pass
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str, int]]:
+    """Split an expression into (kind, text, position) tokens; kind is op, value or keyword."""
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN_PATTERN.match(expression, position)
+        if not match:
+            raise QuerySyntaxError(f"Unexpected character at position {position}: {expression[position:position + 10]!r}")
+        start = match.start(match.lastgroup)
+        if match.group('op'):
+            tokens.append(('op', match.group('op'), start))
+        elif match.group('string'):
+            text = match.group('string')
+            tokens.append(('value', re.sub(r'\\(.)', r'\1', text[1:-1]), start))
+        else:
+            word = match.group('word')
+            if word.lower() in KEYWORDS:
+                tokens.append(('keyword', word.lower(), start))
+            else:
+                tokens.append(('value', word, start))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing a tuple AST."""
+
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise QuerySyntaxError("Empty query")
+        tree = self._or()
+        if self.position < len(self.tokens):
+            _, text, offset = self.tokens[self.position]
+            raise QuerySyntaxError(f"Unexpected {text!r} at position {offset}")
+        return tree
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None, -1)
+
+    def _accept(self, kind, text=None):
+        token_kind, token_text, _ = self._peek()
+        if token_kind == kind and (text is None or token_text == text):
+            self.position += 1
+            return token_text
+        return None
+
+    def _expect(self, kind, text=None, what=None):
+        value = self._accept(kind, text)
+        if value is None:
+            _, found, offset = self._peek()
+            where = f"{found!r} at position {offset}" if found is not None else "end of query"
+            raise QuerySyntaxError(f"Expected {what or text or kind}, found {where}")
+        return value
+
+    def _or(self):
+        terms = [self._and()]
+        while self._accept('keyword', 'or'):
+            terms.append(self._and())
+        return terms[0] if len(terms) == 1 else ('or', terms)
+
+    def _and(self):
+        terms = [self._not()]
+        while self._accept('keyword', 'and'):
+            terms.append(self._not())
+        return terms[0] if len(terms) == 1 else ('and', terms)
+
+    def _not(self):
+        if self._accept('keyword', 'not'):
+            return ('not', self._not())
+        return self._atom()
+
+    def _atom(self):
+        if self._accept('op', '('):
+            tree = self._or()
+            self._expect('op', ')')
+            return tree
+        if self._accept('keyword', 'has'):
+            return ('has', self._expect('value', what='metadata key'))
+        if self._accept('keyword', 'under'):
+            return ('under', self._expect('value', what='node id or title'))
+
+        key = self._expect('value', what='metadata key, HAS, UNDER, NOT or (')
+        if self._accept('op', '='):
+            return ('eq', key, self._expect('value', what='value'))
+        if self._accept('op', '!='):
+            return ('ne', key, self._expect('value', what='value'))
+        if self._accept('keyword', 'in'):
+            self._expect('op', '(')
+            values = [self._expect('value', what='value')]
+            while self._accept('op', ','):
+                values.append(self._expect('value', what='value'))
+            self._expect('op', ')')
+            return ('in', key, values)
+        raise QuerySyntaxError(f"Expected =, != or IN after {key!r}")
+
+
+def parse_query(expression: str):
+    """Parse a filter expression into its AST (nested tuples); raises QuerySyntaxError."""
+    return _Parser(expression).parse()
+
+
+def _index_value(value) -> List[str]:
+    # Lists match per item; other values match by their string form
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    if isinstance(value, dict):
+        return [json.dumps(value, sort_keys=True)]
+    return [str(value)]
+
+
+# Maps the digits of bin(mask) to false/true bytes for itertools.compress
+_BIT_FLAGS = bytes.maketrans(b'01', b'\x00\x01')
+# Set bit positions of every byte value, for sparse masks
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+_NONZERO_BYTE = re.compile(rb'[^\x00]')
+
+# Postings at least this long keep a cached bitmask; shorter ones are built per query
+_CACHED_MASK_SIZE = 64
+
+
+def _mask_of(numbers) -> int:
+    if len(numbers) < _CACHED_MASK_SIZE:
+        mask = 0
+        for number in numbers:
+            mask |= 1 << number
+        return mask
+    buffer = bytearray(numbers[-1] // 8 + 1)
+    for number in numbers:
+        buffer[number >> 3] |= 1 << (number & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _numbers_of(mask: int, limit: Optional[int] = None) -> List[int]:
+    """Set bit positions of mask in increasing order (at most limit of them)."""
+    if mask.bit_count() * 64 < mask.bit_length():
+        # Sparse: let the regex engine skip the zero bytes
+        numbers = []
+        data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+        for match in _NONZERO_BYTE.finditer(data):
+            base = match.start() << 3
+            numbers.extend(base + bit for bit in _BYTE_BITS[data[base >> 3]])
+            if limit is not None and len(numbers) >= limit:
+                break
+        return numbers[:limit]
+    # Dense: lowest bit first, both steps run in C
+    flags = bin(mask)[:1:-1].encode('ascii').translate(_BIT_FLAGS)
+    return list(islice(compress(range(len(flags)), flags), limit))
+
+
+class QueryEngine:
+    """Inverted metadata indexes plus subtree intervals for one parsed tree."""
+
+    def __init__(self, root: Node):
+        self.nodes: List[Node] = []
+        self.subtree_end: List[int] = []
+        # key -> value -> sorted node numbers; key -> node numbers having the key
+        self.postings: Dict[str, Dict[str, List[int]]] = {}
+        self.has_key: Dict[str, List[int]] = {}
+        self.by_id: Dict[str, List[int]] = {}
+        self.by_title: Dict[str, List[int]] = {}
+        # Bitmasks (bit i = node i) of long postings, built on first use
+        self._masks: Dict[tuple, int] = {}
+        self._masks_lock = threading.Lock()
+
+        parents = []
+        stack = [(root, -1)]
+        while stack:
+            node, parent = stack.pop()
+            number = len(self.nodes)
+            self.nodes.append(node)
+            self.subtree_end.append(number + 1)
+            parents.append(parent)
+            self.by_title.setdefault(node.title, []).append(number)
+            for key, value in node.metadata.items():
+                self.has_key.setdefault(key, []).append(number)
+                values = self.postings.setdefault(key, {})
+                if isinstance(value, str):
+                    values.setdefault(value, []).append(number)
+                    if key == 'id':
+                        self.by_id.setdefault(value, []).append(number)
+                else:
+                    for item in set(_index_value(value)):
+                        values.setdefault(item, []).append(number)
+            if node.children:
+                stack.extend((child, number) for child in reversed(node.children))
+
+        # Pre-order numbers: a subtree ends where the next non-descendant starts
+        for number in range(len(self.nodes) - 1, 0, -1):
+            parent = parents[number]
+            if self.subtree_end[number] > self.subtree_end[parent]:
+                self.subtree_end[parent] = self.subtree_end[number]
+
+        # The synthetic parse root is not a plan node
+        first = 1 if root.level == 0 else 0
+        self.universe = ((1 << len(self.nodes)) - 1) ^ ((1 << first) - 1)
+
+    def __len__(self) -> int:
+        return self.universe.bit_count()
+
+    def query(self, expression: str, limit: Optional[int] = None) -> List[Node]:
+        """Nodes matching expression, in document order (the first limit of them)."""
+        return [self.nodes[number] for number in self.query_numbers(expression, limit)]
+
+    def query_numbers(self, expression: str, limit: Optional[int] = None) -> List[int]:
+        """Pre-order numbers of the matching nodes, sorted."""
+        return _numbers_of(self.evaluate(parse_query(expression)), limit)
+
+    def count(self, expression: str) -> int:
+        """Number of matching nodes."""
+        return self.evaluate(parse_query(expression)).bit_count()
+
+    def search(self, expression: str, limit: Optional[int] = None) -> Tuple[int, List[Node]]:
+        """Total number of matches and the first limit matching nodes, in one evaluation."""
+        mask = self.evaluate(parse_query(expression))
+        return mask.bit_count(), [self.nodes[number] for number in _numbers_of(mask, limit)]
+
+    # --- Evaluation ---
+
+    def evaluate(self, tree) -> int:
+        """Bitmask (bit i = pre-order node i) of the nodes matching a parse_query AST."""
+        kind = tree[0]
+        if kind == 'eq':
+            return self._posting_mask(tree[1], tree[2])
+        if kind == 'ne':
+            return self._posting_mask(tree[1], None) & ~self._posting_mask(tree[1], tree[2])
+        if kind == 'in':
+            result = 0
+            for value in tree[2]:
+                result |= self._posting_mask(tree[1], value)
+            return result
+        if kind == 'has':
+            return self._posting_mask(tree[1], None)
+        if kind == 'under':
+            result = 0
+            for start, end in self._intervals(tree[1]):
+                result |= ((1 << end) - 1) ^ ((1 << start) - 1)
+            return result
+        if kind == 'not':
+            return self.universe & ~self.evaluate(tree[1])
+        if kind == 'or':
+            result = 0
+            for term in tree[1]:
+                result |= self.evaluate(term)
+            return result
+        result = self.universe
+        for term in tree[1]:
+            result &= self.evaluate(term)
+            if not result:
+                break
+        return result
+
+    def _posting_mask(self, key: str, value: Optional[str]) -> int:
+        # value None stands for "has key"
+        numbers = self.has_key.get(key) if value is None else self.postings.get(key, {}).get(value)
+        if not numbers:
+            return 0
+        if len(numbers) < _CACHED_MASK_SIZE:
+            return _mask_of(numbers)
+        cache_key = (key, value)
+        mask = self._masks.get(cache_key)
+        if mask is None:
+            mask = _mask_of(numbers)
+            with self._masks_lock:
+                self._masks[cache_key] = mask
+        return mask
+
+    def _intervals(self, target: str) -> List[Tuple[int, int]]:
+        """Descendant intervals [start, end) of the nodes with id (or else title) target."""
+        numbers = self.by_id.get(target) or self.by_title.get(target, [])
+        return [(number + 1, self.subtree_end[number]) for number in numbers
+                if number + 1 < self.subtree_end[number]]
+
+
+def get_query_engine(file_path: str, parser: Optional[MarkdownParser] = None,
+                     index_cache: Optional[IndexCache] = None) -> QueryEngine:
+    """
+    QueryEngine over a file's cached document, rebuilt only when the document changes.
+
+    The engine indexes the document's own tree (no second parse or copy of
+    the file) and is kept with it. Its nodes are shared with editors of the
+    file, so long-lived callers hold the file's lock while they use results.
+
+    Args:
+        index_cache: Where the document comes from (default: the process-wide
+            IndexCache; api_server passes its editors' cache)
+    """
+    cache = index_cache if index_cache is not None else get_default_index_cache()
+    with file_lock(file_path):
+        document = cache.get(file_path, parser)
+        entry = document.views.get('query')
+        if entry is None or entry[0] != document.version:
+            entry = document.views['query'] = (document.version, QueryEngine(document.root))
+        return entry[1]
+
+
+def query_file(file_path: str, expression: str) -> List[Node]:
+    """Convenience function: run a query against a file through the document cache."""
+    return get_query_engine(file_path).query(expression)
+
+
+def node_summary(node: Node) -> Dict:
+    """JSON-friendly description of a query result."""
+    return {
+        "id": node.metadata.get('id'),
+        "title": node.title,
+        "level": node.level,
+        "header_line": node.header_line,
+        "metadata": node.metadata,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Query plan nodes by metadata, e.g. 'status=todo AND priority IN (high, critical) AND UNDER repo-x'.")
+    parser.add_argument('file', help='Markdown plan file')
+    parser.add_argument('expression', help='Filter expression')
+    parser.add_argument('--json', action='store_true', help='Print matching nodes as JSON.')
+    parser.add_argument('--count', action='store_true', help='Only print the number of matches.')
+
+    args = parser.parse_args()
+
+    try:
+        engine = get_query_engine(args.file)
+        if args.count:
+            print(engine.count(args.expression))
+            sys.exit(0)
+        results = engine.query(args.expression)
+        if args.json:
+            print(json.dumps([node_summary(node) for node in results], indent=2))
+        else:
+            for node in results:
+                node_id = node.metadata.get('id', '')
+                print(f"{node.header_line}\t{node_id}\t{node.title}")
+    except QuerySyntaxError as e:
+        print(f"Query error: {e}", file=sys.stderr)
+        sys.exit(2)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
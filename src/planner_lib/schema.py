@@ -0,0 +1,377 @@
+"""
+Schema Module - Compiled metadata validation for the Markdown-JSON schema.
+
+The field rules of MD_CONVENTIONS.md are compiled once into a Schema:
+1. enum fields (status, type, priority) -> frozensets of allowed values,
+   read from the "Allowed Fields" table and the "Type Definitions" list
+2. list and dict fields (blocked_by, context_dependencies) -> type checks
+3. string fields -> single-value checks, plus format regexes for id and
+   last_checked (ISO-8601)
+4. any other key -> the extended-field key format (lowercase, no spaces)
+
+Ids must also be unique within a file. A Schema validates parse events
+directly (MarkdownParser.iter_metadata_events finds headers and metadata
+without reading content line by line), so checking a file builds no Node
+tree, and every error carries the line it was found on. validate_many
+checks many files in a process pool.
+
+Usable as a library (get_default_schema().validate_file(path)), through
+MarkdownParser.validate, and from the command line:
+
+    python schema.py "repos/**/*.md" -j 8
+"""
+
+import re
+import os
+import sys
+import json
+import logging
+import argparse
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from .md_parser import MarkdownParser, walk, EVENT_START, EVENT_METADATA
+    from .cli_utils import expand_input_patterns
+except ImportError:
+    from md_parser import MarkdownParser, walk, EVENT_START, EVENT_METADATA
+    from cli_utils import expand_input_patterns
+
+logger = logging.getLogger(__name__)
+
+# The repository root's conventions file (the Dockerfile copies it next to src/)
+DEFAULT_CONVENTIONS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "MD_CONVENTIONS.md")
+
+# Used when MD_CONVENTIONS.md is not available; mirrors its Allowed Fields table
+DEFAULT_FIELDS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    'status': ('enum', ('todo', 'in-progress', 'done', 'blocked', 'recurring', 'active')),
+    'type': ('enum', ('plan', 'task', 'recurring', 'agent_skill', 'protocol', 'guideline', 'log', 'context')),
+    'owner': ('string', ()),
+    'estimate': ('string', ()),
+    'blocked_by': ('list', ()),
+    'priority': ('enum', ('draft', 'low', 'medium', 'high', 'critical')),
+    'id': ('string', ()),
+    'context_dependencies': ('dict', ()),
+    'last_checked': ('string', ()),
+}
+
+# Values accepted in addition to the documented ones: statuses existing plans
+# already use, and the type update_master_plan gives repository sections
+EXTRA_VALUES: Dict[str, Tuple[str, ...]] = {
+    'status': ('proposed', 'draft', 'pending'),
+    'type': ('repository',),
+}
+
+FORMATS: Dict[str, str] = {
+    # Dot-separated segments, e.g. project.component.task
+    'id': r'[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)*',
+    # ISO-8601 date with optional time and offset
+    'last_checked': r'\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?',
+}
+
+# Extended fields: lowercase, words separated with dash or underscore
+KEY_PATTERN = re.compile(r'[a-z0-9]+([_-][a-z0-9]+)*')
+
+_KINDS = {'enum': str, 'string': str, 'list': list, 'dict': dict}
+_TABLE_ROW = re.compile(r'^\|\s*`([^`]+)`\s*\|\s*`([^`]+)`\s*\|(.*)\|\s*$')
+_TYPE_DEFINITION = re.compile(r'^\s*-\s*\*\*`([^`]+)`\*\*')
+_HEADER = re.compile(r'^(#+)\s+(.*?)\s*$')
+
+
+class SchemaError:
+    """One validation problem; line is 0-based like the parser's line tracking."""
+
+    __slots__ = ('path', 'line', 'title', 'key', 'message')
+
+    def __init__(self, path: Optional[str], line: Optional[int], title: str, key: Optional[str], message: str):
+        self.path = path
+        self.line = line
+        self.title = title
+        self.key = key
+        self.message = message
+
+    def __str__(self):
+        # 1-based "path:line: message", as editors and compilers print it
+        line = f"{self.line + 1}" if self.line is not None else ""
+        if self.path:
+            return f"{self.path}:{line}: {self.message}" if line else f"{self.path}: {self.message}"
+        return f"Line {line}: {self.message}" if line else self.message
+
+    def __repr__(self):
+        return f"SchemaError({str(self)!r})"
+
+    def to_dict(self) -> Dict:
+        return {"path": self.path, "line": self.line, "title": self.title,
+                "key": self.key, "message": self.message}
+
+
+class Schema:
+    """Metadata rules compiled into set and regex checks."""
+
+    def __init__(self, fields: Dict[str, Tuple[str, Iterable[str]]],
+                 formats: Optional[Dict[str, str]] = None, extra_values: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            fields: key -> (kind, enum values); kind is enum, string, list or dict
+            formats: key -> regex the whole (string) value must match
+            extra_values: key -> enum values accepted on top of fields'
+        """
+        formats = formats or {}
+        extra_values = extra_values or {}
+        # key -> (python type, allowed values or None, compiled format or None)
+        self.rules: Dict[str, Tuple[type, Optional[frozenset], Optional[re.Pattern]]] = {}
+        self.allowed: Dict[str, Tuple[str, ...]] = {}
+        for key, (kind, values) in fields.items():
+            if kind not in _KINDS:
+                raise ValueError(f"Unknown field kind '{kind}' for '{key}'")
+            allowed = None
+            if kind == 'enum':
+                ordered = tuple(dict.fromkeys(list(values) + list(extra_values.get(key, ()))))
+                self.allowed[key] = ordered
+                allowed = frozenset(ordered)
+            pattern = re.compile(formats[key]) if key in formats else None
+            self.rules[key] = (_KINDS[kind], allowed, pattern)
+
+    @classmethod
+    def from_conventions(cls, path: str = DEFAULT_CONVENTIONS_PATH) -> "Schema":
+        """Compile the Allowed Fields table and Type Definitions of a conventions file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+        fields: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        for line in _section(lines, "Allowed Fields"):
+            match = _TABLE_ROW.match(line)
+            if match:
+                key, kind, description = match.groups()
+                values = tuple(re.findall(r'`([^`]+)`', description)) if kind == 'enum' else ()
+                fields[key] = (kind, values)
+        if not fields:
+            raise ValueError(f"No Allowed Fields table found in {path}")
+
+        defined_types = tuple(match.group(1) for match in map(_TYPE_DEFINITION.match, _section(lines, "Type Definitions"))
+                              if match)
+        if defined_types and 'type' in fields:
+            fields['type'] = ('enum', tuple(dict.fromkeys(fields['type'][1] + defined_types)))
+        return cls(fields, FORMATS, EXTRA_VALUES)
+
+    # --- Checks ---
+
+    def check(self, key: str, value, where: str = "") -> Optional[str]:
+        """
+        Problem with one metadata entry, or None if it is valid.
+
+        Args:
+            key, value: The metadata entry
+            where: Inserted after the subject of the message, e.g. " in node 'X'"
+        """
+        rule = self.rules.get(key)
+        if rule is None:
+            if not KEY_PATTERN.fullmatch(key):
+                return f"Metadata key '{key}'{where} should be lowercase with words separated by '-' or '_'"
+            return None
+        kind, allowed, pattern = rule
+        if not isinstance(value, kind):
+            if kind is list:
+                return f"'{key}'{where} must be a list, e.g. [a, b]"
+            if kind is dict:
+                return f"'{key}'{where} must be a JSON object, e.g. {{\"alias\": \"FILE.md\"}}"
+            return f"'{key}'{where} must be a single value, not {json.dumps(value)}"
+        if allowed is not None and value not in allowed:
+            return f"Invalid {key} '{value}'{where} (allowed: {', '.join(self.allowed[key])})"
+        if pattern is not None and not pattern.fullmatch(value):
+            return f"Invalid {key} format '{value}'{where}"
+        return None
+
+    def validate_events(self, events: Iterable[tuple], path: Optional[str] = None) -> List[SchemaError]:
+        """Validate a MarkdownParser event stream (only START and METADATA events are used)."""
+        errors = []
+        seen_ids: Dict[str, int] = {}
+        rules = self.rules
+        title = ""
+        for event in events:
+            kind = event[0]
+            if kind == EVENT_METADATA:
+                _, key, value, line = event
+                # Fast path: the common case is a valid enum/string value
+                rule = rules.get(key)
+                if rule is not None and rule[0] is str and type(value) is str and rule[2] is None \
+                        and (rule[1] is None or value in rule[1]):
+                    continue
+                problem = self.check(key, value, f" in node '{title}'")
+                if problem:
+                    errors.append(SchemaError(path, line, title, key, problem))
+                elif key == 'id':
+                    if value in seen_ids:
+                        first = seen_ids[value]
+                        where = f" (first used on line {first + 1})" if first is not None else ""
+                        errors.append(SchemaError(path, line, title, key, f"Duplicate id '{value}' in node '{title}'{where}"))
+                    else:
+                        seen_ids[value] = line
+            elif kind == EVENT_START:
+                title = event[2]
+        return errors
+
+    def validate_text(self, text: str, path: Optional[str] = None,
+                      parser: Optional[MarkdownParser] = None) -> List[SchemaError]:
+        parser = parser or MarkdownParser()
+        return self.validate_events(parser.iter_metadata_events(text), path)
+
+    def validate_file(self, file_path: str, parser: Optional[MarkdownParser] = None) -> List[SchemaError]:
+        parser = parser or MarkdownParser()
+        return self.validate_events(parser.iter_file_metadata_events(file_path), file_path)
+
+    def validate_tree(self, node, path: Optional[str] = None) -> List[SchemaError]:
+        """Validate an already parsed tree (synthetic level-0 roots are skipped)."""
+        events = []
+        for current in walk(node):
+            if current.level == 0:
+                continue
+            events.append((EVENT_START, current.level, current.title, current.header_line))
+            for key, value in current.metadata.items():
+                events.append((EVENT_METADATA, key, value, current.metadata_location.get(key)))
+        return self.validate_events(events, path)
+
+
+def _section(lines: List[str], title: str) -> List[str]:
+    """Lines below the first header whose title ends with title, up to the next header."""
+    section = None
+    for line in lines:
+        match = _HEADER.match(line)
+        if match:
+            if section is not None:
+                break
+            if match.group(2).endswith(title):
+                section = []
+        elif section is not None:
+            section.append(line)
+    return section or []
+
+
+_default_schema: Optional[Schema] = None
+
+
+def get_default_schema() -> Schema:
+    """Schema compiled from the project's MD_CONVENTIONS.md (built-in rules if it is missing)."""
+    global _default_schema
+    if _default_schema is None:
+        try:
+            _default_schema = Schema.from_conventions(DEFAULT_CONVENTIONS_PATH)
+        except (OSError, ValueError) as e:
+            logger.warning("MD_CONVENTIONS.md not usable, validating with the built-in field rules",
+                           extra={"path": os.path.normpath(DEFAULT_CONVENTIONS_PATH), "error": str(e)})
+            _default_schema = Schema(DEFAULT_FIELDS, FORMATS, EXTRA_VALUES)
+    return _default_schema
+
+
+# --- Parallel validation ---
+
+# Files per worker task: keeps per-task overhead low for many small files
+CHUNK_SIZE = 16
+# Below this many files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
+
+_worker_schema: Optional[Schema] = None
+_worker_parser: Optional[MarkdownParser] = None
+
+
+def _init_worker(schema: Schema, fenced_code: bool) -> None:
+    global _worker_schema, _worker_parser
+    _worker_schema = schema
+    _worker_parser = MarkdownParser(fenced_code=fenced_code)
+
+
+def _validate_chunk(chunk: List[Tuple[int, str]]) -> List[Tuple[int, List[SchemaError], Optional[str]]]:
+    results = []
+    for index, path in chunk:
+        try:
+            results.append((index, _worker_schema.validate_file(path, _worker_parser), None))
+        except Exception as e:
+            results.append((index, [], f"{type(e).__name__}: {e}"))
+    return results
+
+
+def iter_validate_many(paths: Iterable[str], schema: Optional[Schema] = None, workers: Optional[int] = None,
+                       fenced_code: bool = False) -> Iterator[Tuple[int, str, List[SchemaError], Optional[str]]]:
+    """
+    Validate many files in parallel, yielding results as files finish.
+
+    Yields (index, path, errors, failure) in completion order; failure is a
+    message when the file could not be read, else None. Each worker process
+    receives the compiled schema once and returns only the errors.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    paths = list(paths)
+    schema = schema or get_default_schema()
+    tasks = list(enumerate(paths))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) < PARALLEL_MIN_FILES:
+        _init_worker(schema, fenced_code)
+        results = (_validate_chunk([task]) for task in tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(tasks)),
+                                       initializer=_init_worker, initargs=(schema, fenced_code))
+        chunks = [tasks[start:start + CHUNK_SIZE] for start in range(0, len(tasks), CHUNK_SIZE)]
+        results = (future.result() for future in as_completed([executor.submit(_validate_chunk, chunk) for chunk in chunks]))
+
+    try:
+        for chunk_results in results:
+            for index, errors, failure in chunk_results:
+                yield index, paths[index], errors, failure
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def validate_many(paths: Iterable[str], schema: Optional[Schema] = None, workers: Optional[int] = None,
+                  fenced_code: bool = False) -> List[Tuple[str, List[SchemaError], Optional[str]]]:
+    """
+    Validate many files in parallel.
+
+    Returns (path, errors, failure) tuples in input order.
+    """
+    paths = list(paths)
+    results = [None] * len(paths)
+    for index, path, errors, failure in iter_validate_many(paths, schema, workers, fenced_code):
+        results[index] = (path, errors, failure)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate plan metadata against the MD_CONVENTIONS.md schema.")
+    parser.add_argument('inputs', nargs='+', help='Markdown files or glob patterns (e.g. "repos/**/*.md")')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+    parser.add_argument('--conventions', default=None,
+                        help='Conventions file to compile the rules from (default: the project MD_CONVENTIONS.md).')
+    parser.add_argument('--fenced-code', action='store_true',
+                        help='Treat header-like lines inside ``` / ~~~ fenced code blocks as content.')
+    parser.add_argument('--json', action='store_true', help='Print one JSON result per file.')
+
+    args = parser.parse_args()
+
+    try:
+        schema = Schema.from_conventions(args.conventions) if args.conventions else get_default_schema()
+        paths = expand_input_patterns(args.inputs)
+        if not paths:
+            print("schema.py: Error: No input files matched.", file=sys.stderr)
+            sys.exit(1)
+
+        failed = False
+        for _, path, errors, failure in iter_validate_many(paths, schema, args.workers, args.fenced_code):
+            failed = failed or bool(errors) or failure is not None
+            if args.json:
+                record = {"path": path, "errors": [error.to_dict() for error in errors]}
+                if failure:
+                    record["error"] = failure
+                print(json.dumps(record), flush=True)
+            else:
+                if failure:
+                    print(f"{path}: {failure}")
+                for error in errors:
+                    print(error)
+        sys.exit(1 if failed else 0)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
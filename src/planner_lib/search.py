@@ -0,0 +1,420 @@
+"""
+Search Module - Trigram fuzzy search over plan nodes.
+
+A TrigramIndex keeps two inverted indexes from character trigrams to nodes:
+1. Name: node title and metadata id (what autocomplete and jump-to-node type)
+2. Content: the node's text below its metadata
+
+Text is lowercased and split into alphanumeric words; every word is padded
+("  word ") before taking trigrams, so word starts weigh in and a typo only
+costs the few trigrams around it. The last word of a query is treated as a
+prefix, so "auth" fully matches "authentication".
+
+A node matches when it shares at least MIN_SIMILARITY of the query's
+trigrams. Name matches rank above content matches of the same strength;
+ties go to the shorter name, then to document order.
+
+The index implements NodeIndex's maintenance methods (clear, add, update,
+update_line), so it can be filled while parsing and kept current by
+reparse_range:
+
+    index = TrigramIndex()
+    root = MarkdownParser().parse_lines(lines, index)
+    root = parser.reparse_range(root, lines, start, end, new_lines, index)
+
+search_file(file_path, text) keeps one index per file next to the file's
+cached document (see index_cache), over the document's own tree. When the
+document changes the index re-walks the tree and only recomputes the
+trigrams of nodes whose text changed; refresh_search_index(file_path) does
+that eagerly (api_server calls it after save_edits).
+"""
+
+import re
+import sys
+import json
+import math
+import argparse
+from collections import Counter, defaultdict
+from heapq import nsmallest
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+try:
+    from .md_parser import Node, walk
+    from .file_lock import file_lock
+    from .index_cache import Document, IndexCache, get_default_index_cache
+except ImportError:
+    from md_parser import Node, walk
+    from file_lock import file_lock
+    from index_cache import Document, IndexCache, get_default_index_cache
+
+# Fraction of the query's trigrams a node must share to match
+MIN_SIMILARITY = 0.5
+# Score multiplier for matches found only in content
+CONTENT_WEIGHT = 0.5
+DEFAULT_LIMIT = 20
+
+_WORD_PATTERN = re.compile(r'[^\W_]+')
+_EMPTY = frozenset()
+
+
+# Word -> its trigrams; plan vocabularies are small, so most words hit
+_word_grams: Dict[str, FrozenSet[str]] = {}
+MAX_CACHED_WORDS = 200_000
+
+
+def _grams_of_word(word: str, end: bool = True) -> FrozenSet[str]:
+    padded = f"  {word} " if end else f"  {word}"
+    return frozenset([padded[i:i + 3] for i in range(len(padded) - 2)])
+
+
+def trigrams(text: str, prefix: bool = False) -> Set[str]:
+    """
+    Trigrams of the padded lowercase words of text.
+
+    Args:
+        text: Text to split
+        prefix: Treat the last word as a prefix (drop its end-of-word trigram)
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    grams = set()
+    if not words:
+        return grams
+    unique = set(words)
+    if prefix and words.count(words[-1]) == 1:
+        unique.discard(words[-1])
+        grams.update(_grams_of_word(words[-1], end=False))
+    cache = _word_grams
+    for word in unique:
+        word_grams = cache.get(word)
+        if word_grams is None:
+            word_grams = _grams_of_word(word)
+            if len(cache) < MAX_CACHED_WORDS:
+                cache[word] = word_grams
+        grams |= word_grams
+    return grams
+
+
+def _name_text(node) -> str:
+    node_id = node.metadata.get('id') if node.metadata else None
+    return f"{node.title} {node_id}" if isinstance(node_id, str) else node.title
+
+
+def _count_matches(postings: Dict[str, Set[int]], grams: Set[str], minimum: int) -> Dict[int, int]:
+    """Documents sharing at least minimum of grams, with their shared count."""
+    ordered = sorted((postings.get(gram, _EMPTY) for gram in grams), key=len)
+    # A document with `minimum` of k trigrams has one of the k - minimum + 1
+    # rarest, so only those postings can introduce candidates
+    seeds = len(ordered) - minimum + 1
+    counts = Counter()
+    for posting in ordered[:seeds]:
+        counts.update(posting)
+    if not counts:
+        return {}
+    candidates = counts.keys()
+    for posting in ordered[seeds:]:
+        counts.update(candidates & posting)
+    return {doc: count for doc, count in counts.items() if count >= minimum}
+
+
+class TrigramIndex:
+    """Fuzzy title/id/content search over the nodes of a plan tree."""
+
+    def __init__(self, root=None):
+        # Document number -> node (None for freed slots)
+        self._nodes: List[Optional[Node]] = []
+        self._numbers: Dict[int, int] = {}  # id(node) -> document number
+        self._free: List[int] = []
+        # Entries set aside by clear() until re-added or purged
+        self._stale: Dict[int, int] = {}
+        # Per document: indexed (name, content) text, trigram sets (to
+        # unindex them) and name trigram count (ranking)
+        self._texts: List[Tuple[str, str]] = []
+        self._name_grams: List[Set[str]] = []
+        self._content_grams: List[Set[str]] = []
+        self._name_size: List[int] = []
+        # Trigram -> document numbers
+        self._name_postings: Dict[str, Set[int]] = defaultdict(set)
+        self._content_postings: Dict[str, Set[int]] = defaultdict(set)
+        if root is not None:
+            self.build(root)
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __contains__(self, node) -> bool:
+        return id(node) in self._numbers
+
+    # --- Building and maintenance (same interface as NodeIndex) ---
+
+    def clear(self) -> None:
+        """
+        Empty the index.
+
+        Entries are set aside rather than dropped until the next search:
+        reparse_range relinks every node after an edit that adds or removes
+        headers, and nodes re-added with unchanged text keep their trigrams.
+        """
+        self._stale.update(self._numbers)
+        self._numbers.clear()
+
+    def build(self, root) -> "TrigramIndex":
+        """Replace the index contents with every node of root's tree."""
+        self.clear()
+        if root.level == 0:
+            # The synthetic parse root is not a plan node; index below it
+            for child in root.children:
+                self.add_subtree(child)
+        else:
+            self.add_subtree(root)
+        self._purge()
+        return self
+
+    def add(self, node, parent=None) -> None:
+        """Index a single node (not its children); parent is accepted for NodeIndex compatibility."""
+        key = id(node)
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._stale.pop(key, None)
+            if number is not None and self._nodes[number] is node:
+                self._numbers[key] = number
+                self._index(number, node)
+                return
+        else:
+            self._index(number, node)
+            return
+
+        if self._free:
+            number = self._free.pop()
+            self._nodes[number] = node
+        else:
+            number = len(self._nodes)
+            self._nodes.append(node)
+            self._texts.append(("", ""))
+            self._name_grams.append(_EMPTY)
+            self._content_grams.append(_EMPTY)
+            self._name_size.append(0)
+        self._numbers[key] = number
+        self._index(number, node)
+
+    def add_subtree(self, node, parent=None) -> None:
+        """Index node and all of its descendants."""
+        for current in walk(node):
+            self.add(current)
+
+    def remove(self, node) -> None:
+        """Drop a single node from the index."""
+        number = self._numbers.pop(id(node), None)
+        if number is not None:
+            self._drop(number)
+
+    def remove_subtree(self, node) -> None:
+        """Drop node and all of its descendants from the index."""
+        for current in walk(node):
+            self.remove(current)
+
+    def update(self, node) -> None:
+        """Re-index node after its title, metadata id or content changed."""
+        self.add(node)
+
+    def update_line(self, node) -> None:
+        """Line moves need no work: results read line numbers from the nodes."""
+
+    def _index(self, number: int, node) -> None:
+        """(Re)compute the trigrams of document number if its text changed."""
+        texts = (_name_text(node), node.content or "")
+        if texts == self._texts[number]:
+            return
+        name_grams = trigrams(texts[0])
+        content_grams = trigrams(texts[1]) if texts[1] else _EMPTY
+        _repost(self._name_postings, self._name_grams[number], name_grams, number)
+        _repost(self._content_postings, self._content_grams[number], content_grams, number)
+        self._texts[number] = texts
+        self._name_grams[number] = name_grams
+        self._content_grams[number] = content_grams
+        self._name_size[number] = len(name_grams)
+
+    def _drop(self, number: int) -> None:
+        _unpost(self._name_postings, self._name_grams[number], number)
+        _unpost(self._content_postings, self._content_grams[number], number)
+        self._nodes[number] = None
+        self._texts[number] = ("", "")
+        self._name_grams[number] = self._content_grams[number] = _EMPTY
+        self._name_size[number] = 0
+        self._free.append(number)
+
+    def _purge(self) -> None:
+        """Drop the entries clear() set aside that were not re-added."""
+        if len(self._stale) > len(self._numbers):
+            # Mostly a different tree: rebuilding the postings is cheaper
+            self._stale.clear()
+            self._rebuild_postings()
+            return
+        for number in self._stale.values():
+            self._drop(number)
+        self._stale.clear()
+
+    def _rebuild_postings(self) -> None:
+        live = set(self._numbers.values())
+        self._free = [number for number in range(len(self._nodes)) if number not in live]
+        for number in self._free:
+            self._nodes[number] = None
+            self._texts[number] = ("", "")
+            self._name_grams[number] = self._content_grams[number] = _EMPTY
+            self._name_size[number] = 0
+        self._name_postings.clear()
+        self._content_postings.clear()
+        for number in live:
+            _post(self._name_postings, self._name_grams[number], number)
+            _post(self._content_postings, self._content_grams[number], number)
+
+    # --- Search ---
+
+    def search(self, text: str, limit: int = DEFAULT_LIMIT,
+               min_similarity: float = MIN_SIMILARITY) -> List[Tuple[float, Node, str]]:
+        """
+        Ranked fuzzy matches for text.
+
+        Args:
+            text: Search text (the last word may be incomplete)
+            limit: Maximum number of results
+            min_similarity: Fraction of the query trigrams a node must share
+
+        Returns:
+            List of (score, node, field) with field 'name' or 'content',
+            best first. score is the shared fraction of query trigrams,
+            times CONTENT_WEIGHT for content matches.
+        """
+        if self._stale:
+            self._purge()
+        grams = trigrams(text, prefix=True)
+        if not grams or limit <= 0:
+            return []
+        total = len(grams)
+        minimum = max(1, math.ceil(total * min_similarity))
+        name_size = self._name_size
+
+        name_hits = _count_matches(self._name_postings, grams, minimum)
+        ranked = nsmallest(limit, name_hits.items(),
+                           key=lambda item: (-item[1], name_size[item[0]], item[0]))
+        results = [(count / total, number, 'name') for number, count in ranked]
+
+        # Content matches can only outrank name matches scoring below CONTENT_WEIGHT
+        if len(results) < limit or results[-1][0] < CONTENT_WEIGHT:
+            content_minimum = minimum
+            if len(results) == limit:
+                # Skip content matches that cannot beat the current last result
+                content_minimum = max(minimum, math.ceil(results[-1][0] * total / CONTENT_WEIGHT))
+            if content_minimum <= total:
+                content_hits = _count_matches(self._content_postings, grams, content_minimum)
+                for number in name_hits:
+                    content_hits.pop(number, None)
+                ranked = nsmallest(limit, content_hits.items(),
+                                   key=lambda item: (-item[1], name_size[item[0]], item[0]))
+                results.extend((CONTENT_WEIGHT * count / total, number, 'content') for number, count in ranked)
+                results.sort(key=lambda hit: (-hit[0], hit[2] != 'name', name_size[hit[1]], hit[1]))
+                del results[limit:]
+
+        nodes = self._nodes
+        return [(round(score, 4), nodes[number], field) for score, number, field in results]
+
+
+def _post(postings: Dict[str, Set[int]], grams: Set[str], number: int) -> None:
+    for gram in grams:
+        postings[gram].add(number)
+
+
+def _unpost(postings: Dict[str, Set[int]], grams: Set[str], number: int) -> None:
+    for gram in grams:
+        posting = postings.get(gram)
+        if posting is not None:
+            posting.discard(number)
+            if not posting:
+                del postings[gram]
+
+
+def _repost(postings: Dict[str, Set[int]], old: Set[str], new: Set[str], number: int) -> None:
+    if old is _EMPTY:
+        _post(postings, new, number)
+    elif old != new:
+        _unpost(postings, old - new, number)
+        _post(postings, new - old, number)
+
+
+def hit_summary(score: float, node: Node, field: str) -> Dict:
+    """JSON-friendly description of a search result."""
+    return {
+        "id": node.metadata.get('id'),
+        "title": node.title,
+        "level": node.level,
+        "header_line": node.header_line,
+        "content_start": node.content_location_start,
+        "content_end": node.content_location_end,
+        "score": score,
+        "match": field,
+    }
+
+
+# --- Per-file indexes ---
+
+def _document_index(document: Document) -> TrigramIndex:
+    """The document's search index, brought up to date with its tree (caller holds the file's lock)."""
+    entry = document.views.get('search')
+    if entry is None:
+        index = TrigramIndex(document.root)
+    elif entry[0] != document.version:
+        # Edits and outside changes update the tree in place, so most nodes
+        # are re-added with unchanged text and keep their trigrams
+        index = entry[1].build(document.root)
+    else:
+        return entry[1]
+    document.views['search'] = (document.version, index)
+    return index
+
+
+def refresh_search_index(file_path: str, index_cache: Optional[IndexCache] = None) -> None:
+    """Apply a file's changes to its search index, if it has one (e.g. after save_edits)."""
+    cache = index_cache if index_cache is not None else get_default_index_cache()
+    with file_lock(file_path):
+        document = cache.get(file_path)
+        if 'search' in document.views:
+            _document_index(document)
+
+
+def search_file(file_path: str, text: str, limit: int = DEFAULT_LIMIT,
+                index_cache: Optional[IndexCache] = None) -> List[Tuple[float, Node, str]]:
+    """
+    Fuzzy search a file through its cached document.
+
+    The first search of a file indexes its tree; later searches only
+    re-index what changed since (if anything). The returned nodes are the
+    document's, so long-lived callers hold the file's lock while using them.
+
+    Args:
+        index_cache: Where the document comes from (default: the process-wide
+            IndexCache; api_server passes its editors' cache)
+    """
+    cache = index_cache if index_cache is not None else get_default_index_cache()
+    with file_lock(file_path):
+        return _document_index(cache.get(file_path)).search(text, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fuzzy search plan nodes by title, id and content.")
+    parser.add_argument('file', help='Markdown plan file')
+    parser.add_argument('text', help='Search text')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help='Maximum number of results.')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+
+    args = parser.parse_args()
+
+    try:
+        results = search_file(args.file, args.text, args.limit)
+        if args.json:
+            print(json.dumps([hit_summary(*hit) for hit in results], indent=2))
+        else:
+            for score, node, field in results:
+                node_id = node.metadata.get('id', '')
+                print(f"{score:.2f}\t{field}\t{node.header_line}\t{node_id}\t{node.title}")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
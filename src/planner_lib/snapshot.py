@@ -0,0 +1,388 @@
+"""
+Snapshot Module - Compact binary snapshots of parsed plans.
+
+A snapshot stores a Node tree as:
+1. A fixed-size header (magic, format version, section sizes)
+2. Fixed-width node records in document (pre-order) order
+3. Fixed-width metadata records addressed by per-node offsets
+4. A string table (byte offsets + one UTF-8 blob) shared by titles,
+   content, metadata keys and values
+
+Loading a snapshot needs no markdown or JSON parsing. load_snapshot rebuilds
+a regular, mutable Node tree; open_snapshot memory-maps the file and returns
+read-only views that only decode the records and strings they touch.
+"""
+
+import mmap
+import json
+import struct
+from array import array
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    from .md_parser import Node
+except ImportError:
+    from md_parser import Node
+
+SNAPSHOT_MAGIC = b"PLANSNAP"
+SNAPSHOT_VERSION = 1
+
+# magic, version, reserved, node count, metadata count, list item count, string count, blob size
+_HEADER = struct.Struct('<8sHHIIIII')
+# level, parent, title, content, header_line, content start, content end, first metadata record, subtree end
+_NODE = struct.Struct('<iiIIiiiII')
+# key, value kind, value a, value b, line
+_META = struct.Struct('<IIIIi')
+
+NO_LINE = -1
+NO_STRING = 0xFFFFFFFF
+
+# Metadata value kinds
+_KIND_STRING = 0  # a = string id
+_KIND_LIST = 1    # list of strings: a = first list item, b = item count
+_KIND_JSON = 2    # anything else: a = string id of the JSON text
+
+
+def _line(value: int) -> Optional[int]:
+    return None if value == NO_LINE else value
+
+
+def _store_line(value: Optional[int]) -> int:
+    return NO_LINE if value is None else value
+
+
+class _Writer:
+    """Collects records and interned strings while a tree is dumped."""
+
+    def __init__(self):
+        self.nodes = bytearray()
+        self.metas = bytearray()
+        self.list_items = array('I')
+        self.strings: List[bytes] = []
+        self.string_ids: Dict[str, int] = {}
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = self.string_ids.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.strings.append(value.encode('utf-8'))
+            self.string_ids[value] = index
+        return index
+
+    def add_metadata(self, key: str, value: Any, line: Optional[int]) -> None:
+        if isinstance(value, str):
+            record = (_KIND_STRING, self.intern(value), 0)
+        elif isinstance(value, list) and all(isinstance(item, str) for item in value):
+            record = (_KIND_LIST, len(self.list_items), len(value))
+            self.list_items.extend(self.intern(item) for item in value)
+        else:
+            record = (_KIND_JSON, self.intern(json.dumps(value)), 0)
+        self.metas += _META.pack(self.intern(key), *record, _store_line(line))
+
+
+def dump_snapshot(root: Node) -> bytes:
+    """Serialize a Node tree (or any Node-compatible view) into snapshot bytes."""
+    writer = _Writer()
+    # Node rows as lists so subtree_end can be patched once a subtree is done
+    rows = []
+    meta_count = 0
+    stack = [(root, -1)]
+    while stack:
+        node, parent = stack.pop()
+        index = len(rows)
+        locations = node.metadata_location
+        for key, value in node.metadata.items():
+            writer.add_metadata(key, value, locations.get(key))
+        rows.append([
+            node.level, parent, writer.intern(node.title), writer.intern(node.content),
+            _store_line(node.header_line), _store_line(node.content_location_start),
+            _store_line(node.content_location_end), meta_count, index + 1,
+        ])
+        meta_count += len(node.metadata)
+        stack.extend((child, index) for child in reversed(node.children))
+
+    # Pre-order indices: a subtree ends where the next non-descendant starts
+    for index in range(len(rows) - 1, 0, -1):
+        parent_row = rows[rows[index][1]]
+        if rows[index][8] > parent_row[8]:
+            parent_row[8] = rows[index][8]
+
+    offsets = array('I', [0])
+    total = 0
+    for value in writer.strings:
+        total += len(value)
+        offsets.append(total)
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(rows), meta_count,
+                          len(writer.list_items), len(writer.strings), total)
+    return b"".join([
+        header,
+        b"".join(_NODE.pack(*row) for row in rows),
+        bytes(writer.metas),
+        writer.list_items.tobytes(),
+        offsets.tobytes(),
+        b"".join(writer.strings),
+    ])
+
+
+def save_snapshot(root: Node, file_path: str) -> None:
+    """Write a snapshot of root to file_path."""
+    payload = dump_snapshot(root)
+    with open(file_path, 'wb') as f:
+        f.write(payload)
+
+
+class _Layout:
+    """Section offsets of a snapshot buffer, validated against its header."""
+
+    def __init__(self, buffer):
+        if len(buffer) < _HEADER.size:
+            raise ValueError("Snapshot is truncated")
+        magic, version, _, node_count, meta_count, list_count, string_count, blob_size = \
+            _HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a plan snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}")
+
+        self.node_count = node_count
+        self.meta_count = meta_count
+        self.string_count = string_count
+        self.nodes = _HEADER.size
+        self.metas = self.nodes + node_count * _NODE.size
+        self.list_items = self.metas + meta_count * _META.size
+        self.offsets = self.list_items + list_count * 4
+        self.blob = self.offsets + (string_count + 1) * 4
+        if len(buffer) != self.blob + blob_size:
+            raise ValueError("Snapshot is truncated")
+        if not node_count:
+            raise ValueError("Snapshot has no nodes")
+
+
+def _metadata_value(kind: int, a: int, b: int, string, list_items) -> Any:
+    if kind == _KIND_STRING:
+        return string(a)
+    if kind == _KIND_LIST:
+        return [string(item) for item in list_items[a:a + b]]
+    return json.loads(string(a))
+
+
+def load_snapshot(source: Union[str, bytes]) -> Node:
+    """
+    Rebuild a mutable Node tree from a snapshot.
+
+    Args:
+        source: Snapshot file path, or the bytes returned by dump_snapshot
+
+    Returns:
+        The root Node, exactly as it was passed to dump_snapshot
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            source = f.read()
+    buffer = memoryview(source)
+    layout = _Layout(buffer)
+
+    offsets = buffer[layout.offsets:layout.blob].cast('I')
+    blob = bytes(buffer[layout.blob:])
+    strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(layout.string_count)]
+    list_items = buffer[layout.list_items:layout.offsets].cast('I')
+
+    def string(index):
+        return None if index == NO_STRING else strings[index]
+
+    metadata = []
+    locations = []
+    for key, kind, a, b, line in _META.iter_unpack(buffer[layout.metas:layout.list_items]):
+        if kind == _KIND_STRING:
+            value = strings[a]
+        else:
+            value = _metadata_value(kind, a, b, string, list_items)
+        metadata.append((strings[key], value))
+        locations.append(line)
+
+    new = Node.__new__
+    nodes = []
+    append = nodes.append
+    records = _NODE.iter_unpack(buffer[layout.nodes:layout.metas])
+    meta_ends = _NODE.iter_unpack(buffer[layout.nodes + _NODE.size:layout.metas])
+    for level, parent, title, content, header_line, start, end, meta_start, _ in records:
+        meta_end = next(meta_ends, None)
+        meta_end = layout.meta_count if meta_end is None else meta_end[7]
+        node = new(Node)
+        node.level = level
+        node.title = None if title == NO_STRING else strings[title]
+        node.content = None if content == NO_STRING else strings[content]
+        node.children = []
+        node._hash = None
+        node._subtree_hash = None
+        # Inlined _line(): this loop runs once per node
+        node.header_line = None if header_line == NO_LINE else header_line
+        node.content_location_start = None if start == NO_LINE else start
+        node.content_location_end = None if end == NO_LINE else end
+        if meta_start == meta_end:
+            node.metadata = {}
+            node.metadata_location = {}
+        else:
+            node.metadata = dict(metadata[meta_start:meta_end])
+            node.metadata_location = {
+                metadata[i][0]: locations[i] for i in range(meta_start, meta_end) if locations[i] != NO_LINE
+            }
+        if parent >= 0:
+            nodes[parent].children.append(node)
+        append(node)
+    return nodes[0]
+
+
+class Snapshot:
+    """
+    Memory-mapped, read-only snapshot.
+
+    Records are unpacked and strings decoded on access, so opening a large
+    snapshot costs the same as opening a small one. Use as a context manager
+    (or call close()) to release the mapping.
+    """
+
+    def __init__(self, file_path: str):
+        with open(file_path, 'rb') as f:
+            self._mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._layout = _Layout(self._mapping)
+        except ValueError:
+            self._mapping.close()
+            raise
+        self._offsets = memoryview(self._mapping)[self._layout.offsets:self._layout.blob].cast('I')
+        self._list_items = memoryview(self._mapping)[self._layout.list_items:self._layout.offsets].cast('I')
+        self._strings: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return self._layout.node_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        # Views into the mapping must be released before it can be closed
+        self._offsets.release()
+        self._list_items.release()
+        self._mapping.close()
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        value = self._strings.get(index)
+        if value is None:
+            start = self._layout.blob + self._offsets[index]
+            end = self._layout.blob + self._offsets[index + 1]
+            value = self._mapping[start:end].decode('utf-8')
+            self._strings[index] = value
+        return value
+
+    def record(self, index: int) -> tuple:
+        """Raw node record: (level, parent, title id, content id, header_line, content start, content end, first metadata, subtree end)."""
+        return _NODE.unpack_from(self._mapping, self._layout.nodes + index * _NODE.size)
+
+    def _meta_range(self, index: int) -> range:
+        start = self.record(index)[7]
+        end = self.record(index + 1)[7] if index + 1 < self._layout.node_count else self._layout.meta_count
+        return range(start, end)
+
+    def metadata_of(self, index: int) -> Dict[str, Any]:
+        metadata = {}
+        for i in self._meta_range(index):
+            key, kind, a, b, _ = _META.unpack_from(self._mapping, self._layout.metas + i * _META.size)
+            metadata[self.string(key)] = _metadata_value(kind, a, b, self.string, self._list_items)
+        return metadata
+
+    def metadata_location_of(self, index: int) -> Dict[str, int]:
+        locations = {}
+        for i in self._meta_range(index):
+            key, _, _, _, line = _META.unpack_from(self._mapping, self._layout.metas + i * _META.size)
+            if line != NO_LINE:
+                locations[self.string(key)] = line
+        return locations
+
+    def children_of(self, index: int) -> List[int]:
+        children = []
+        child = index + 1
+        end = self.record(index)[8]
+        while child < end:
+            children.append(child)
+            child = self.record(child)[8]
+        return children
+
+    def root(self) -> "SnapshotNode":
+        return SnapshotNode(self, 0)
+
+    def to_tree(self) -> Node:
+        """Materialize the whole snapshot as a mutable Node tree."""
+        return load_snapshot(bytes(self._mapping))
+
+
+def open_snapshot(file_path: str) -> Snapshot:
+    """Memory-map a snapshot file for lazy, read-only access."""
+    return Snapshot(file_path)
+
+
+class SnapshotNode:
+    """Read-only Node-compatible view of one node record of a Snapshot."""
+
+    __slots__ = ('_snapshot', '_index')
+
+    def __init__(self, snapshot: Snapshot, index: int):
+        self._snapshot = snapshot
+        self._index = index
+
+    def __repr__(self):
+        return f"SnapshotNode({self._index}, {self.title!r})"
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def level(self) -> int:
+        return self._snapshot.record(self._index)[0]
+
+    @property
+    def title(self) -> Optional[str]:
+        return self._snapshot.string(self._snapshot.record(self._index)[2])
+
+    @property
+    def content(self) -> Optional[str]:
+        return self._snapshot.string(self._snapshot.record(self._index)[3])
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self._snapshot.metadata_of(self._index)
+
+    @property
+    def children(self) -> List["SnapshotNode"]:
+        snapshot = self._snapshot
+        return [SnapshotNode(snapshot, child) for child in snapshot.children_of(self._index)]
+
+    @property
+    def header_line(self) -> Optional[int]:
+        return _line(self._snapshot.record(self._index)[4])
+
+    @property
+    def metadata_location(self) -> Dict[str, int]:
+        return self._snapshot.metadata_location_of(self._index)
+
+    @property
+    def content_location_start(self) -> Optional[int]:
+        return _line(self._snapshot.record(self._index)[5])
+
+    @property
+    def content_location_end(self) -> Optional[int]:
+        return _line(self._snapshot.record(self._index)[6])
+
+    # Serialization only reads the attributes above, so Node's own code works as-is
+    to_dict = Node.to_dict
+    to_markdown = Node.to_markdown
+    _markdown_lines = Node._markdown_lines
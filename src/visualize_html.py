@@ -17,7 +17,8 @@ if src_dir not in sys.path:
     sys.path.append(src_dir)
 
 try:
-    from planner_lib.md_parser import MarkdownParser
+    from planner_lib.md_parser import MarkdownParser, walk
+    from planner_lib.parse_cache import parse_file_cached
 except ImportError as e:
     # Do not exit here, just print error. Let main or caller handle failure.
     print(f"Error: Could not import md_parser from {src_dir}/planner_lib. {e}")
@@ -143,11 +144,13 @@ HTML_TEMPLATE = """
 <script>
 // Global Variables - Must be declared before use
 let root, svg, g, zoom, tree;
+let nodeById = new Map();  // metadata.id -> hierarchy node, built once per tree
 let i = 0;
 let duration = 500;
 let parsedData = null;
 let showDependencies = true;
 const editDisabled = __EDIT_DISABLED__;
+let editsPending = __EDITS_PENDING__;  // app.py already shows the pending-push marker
 const rawFileContent = atob("__RAW_FILE_PLACEHOLDER__");
 
 function log(msg) {
@@ -241,6 +244,14 @@ function initViz(fullData) {
         root.x0 = 0;
         root.y0 = 0;
 
+        // Index every node (collapsed ones included) once; update() only checks visibility
+        nodeById = new Map();
+        root.descendants().forEach(d => {
+            if (d.data.metadata && d.data.metadata.id && !nodeById.has(d.data.metadata.id)) {
+                nodeById.set(d.data.metadata.id, d);
+            }
+        });
+
         // Check if root has children
         if (!root.children) {
             log("Warning: Root has no children.");
@@ -267,6 +278,14 @@ function initViz(fullData) {
     }
 }
 
+// A node is drawn when none of its ancestors is collapsed
+function isVisible(d) {
+  for (let p = d.parent; p; p = p.parent) {
+    if (!p.children) return false;
+  }
+  return true;
+}
+
 function collapseRecursive(d) {
   if(d.children) {
     d._children = d.children;
@@ -313,16 +332,6 @@ function update(source) {
   // Swap x and y for horizontal layout
   nodes.forEach(d => { d.y = d.depth * 300; });
 
-  // Node Map for calculating dependencies
-  const nodeMap = new Map();
-  nodes.forEach(d => {
-      // Key can be ID or Node Title (fallback)
-      if (d.data.metadata && d.data.metadata.id) {
-          nodeMap.set(d.data.metadata.id, d);
-      }
-      // Also map by title for redundancy if needed, but ID is preferred
-  });
-
 
   // ****************** Links (Hierarchy) ***************************
   const link = g.selectAll('path.link')
@@ -354,10 +363,10 @@ function update(source) {
   let depLinksData = [];
   if (showDependencies && parsedData.dependencies) {
       parsedData.dependencies.forEach(dep => {
-          const sourceNode = nodeMap.get(dep.source);
-          const targetNode = nodeMap.get(dep.target);
+          const sourceNode = nodeById.get(dep.source);
+          const targetNode = nodeById.get(dep.target);
           
-          if (sourceNode && targetNode) {
+          if (sourceNode && targetNode && isVisible(sourceNode) && isVisible(targetNode)) {
               depLinksData.push({source: sourceNode, target: targetNode});
           }
       });
@@ -597,6 +606,8 @@ function collectEdits() {
             id: currentNodeData.metadata.id || null,
             title: currentNodeData.title
         },
+        // Version token: the server refuses the edit if the node changed since it was loaded
+        version: currentNodeData.node_hash || null,
         metadata_edits: {},
         content_edit: null
     };
@@ -608,15 +619,13 @@ function collectEdits() {
         if (deserializeError) return;
         const key = field.dataset.key;
         const raw = field.value;
-        const lineNumber = currentNodeData.metadata_location[key];
-
-        if (lineNumber !== undefined) {
+        // The server finds the line itself; only keys the node has can be edited
+        if (currentNodeData.metadata_location[key] !== undefined) {
             try {
                 const parsed = deserializeMeta(raw);
                 // Send serialized string to server — Python _parse_metadata_value handles the rest
                 edits.metadata_edits[key] = {
-                    value: serializeMeta(parsed),
-                    line_number: lineNumber
+                    value: serializeMeta(parsed)
                 };
             } catch (e) {
                 console.error('Metadata deserialize error for key "' + key + '":', e);
@@ -632,9 +641,7 @@ function collectEdits() {
     const contentEditor = document.getElementById('content-editor');
     if (contentEditor && currentNodeData.content_location_start !== undefined) {
         edits.content_edit = {
-            value: contentEditor.value,
-            start_line: currentNodeData.content_location_start,
-            end_line: currentNodeData.content_location_end
+            value: contentEditor.value
         };
     }
 
@@ -654,19 +661,11 @@ function validateEdits(edits) {
         if (edit.value === undefined || edit.value === null) {
             errors.push(`Empty value for metadata field: ${key}`);
         }
-        if (edit.line_number === undefined || edit.line_number < 0) {
-            errors.push(`Invalid line number for metadata field: ${key}`);
-        }
     }
 
-    // Validate content edit
-    if (edits.content_edit) {
-        if (edits.content_edit.start_line === undefined || edits.content_edit.start_line < 0) {
-            errors.push("Invalid content start line");
-        }
-        if (edits.content_edit.end_line === undefined || edits.content_edit.end_line < 0) {
-            errors.push("Invalid content end line");
-        }
+    // The server locates the node by id (or title)
+    if (!edits.node_identifier.id && !edits.node_identifier.title) {
+        errors.push("Node has neither an id nor a title");
     }
 
     return {
@@ -717,13 +716,29 @@ async function sendToStreamlit(edits) {
         const result = await response.json();
 
         if (result.success) {
-            // Apply edits to local data
-            applyEditsToLocalData(edits);
+            // Take the node's new state (lines, version) from the server; no reload needed
+            if (result.nodes && result.nodes[0]) {
+                applyNodeState(result.nodes[0]);
+            } else {
+                applyEditsToLocalData(edits);
+            }
             editMode = false;
             renderNodeDetails();
             showError('Success', result.message, 'success');
-            // Reload parent Streamlit page to re-run app.py (re-read file, update markers)
-            setTimeout(() => window.parent.location.reload(), 1500);
+            if (!editsPending) {
+                // First unpushed edit: reload parent Streamlit page to re-run app.py (update markers)
+                editsPending = true;
+                setTimeout(() => window.parent.location.reload(), 1500);
+            }
+        } else if (result.conflict) {
+            // The node changed since it was loaded: show its current state instead
+            if (result.current) {
+                applyNodeState(result.current);
+            }
+            editMode = false;
+            renderNodeDetails();
+            showError('Conflict', (result.error || 'The node was changed by another edit')
+                + '<br>Its current version is shown; re-apply your changes and save again.');
         } else {
             let detail = result.error || 'Unknown error';
             if (result.trace) {
@@ -738,6 +753,16 @@ async function sendToStreamlit(edits) {
     }
 }
 
+function applyNodeState(state) {
+    // Keep the node object (it is part of the tree), replace its fields
+    for (const key of ['title', 'metadata', 'content', 'header_line', 'metadata_location',
+                       'content_location_start', 'content_location_end', 'node_hash']) {
+        if (key in state) {
+            currentNodeData[key] = state[key];
+        }
+    }
+}
+
 function applyEditsToLocalData(edits) {
     // Update metadata
     for (const [key, edit] of Object.entries(edits.metadata_edits)) {
@@ -807,20 +832,18 @@ def collect_dependencies(node, dependencies_list=None):
     if dependencies_list is None:
         dependencies_list = []
     
-    # Check for blocked_by
-    if node.metadata and 'blocked_by' in node.metadata and 'id' in node.metadata:
-        target_id = node.metadata['id']
-        blockers = node.metadata['blocked_by']
-        if isinstance(blockers, list):
-            for source_id in blockers:
-                 dependencies_list.append({"source": source_id, "target": target_id})
-    
-    for child in node.children:
-        collect_dependencies(child, dependencies_list)
+    for current in walk(node):
+        # Check for blocked_by
+        if current.metadata and 'blocked_by' in current.metadata and 'id' in current.metadata:
+            target_id = current.metadata['id']
+            blockers = current.metadata['blocked_by']
+            if isinstance(blockers, list):
+                for source_id in blockers:
+                     dependencies_list.append({"source": source_id, "target": target_id})
         
     return dependencies_list
 
-def generate_html(target_file, embed_d3=False, edit_disabled=False):
+def generate_html(target_file, embed_d3=False, edit_disabled=False, edits_pending=False):
     if not os.path.exists(target_file):
         raise FileNotFoundError(f"Target file not found: {target_file}")
 
@@ -834,8 +857,8 @@ def generate_html(target_file, embed_d3=False, edit_disabled=False):
     if MarkdownParser is None:
         raise ImportError("MarkdownParser library could not be loaded. Please check dependencies.")
         
-    parser = MarkdownParser()
-    root_node = parser.parse_file(target_file)
+    # Cached: Streamlit reruns regenerate the page even when the file has not changed
+    root_node = parse_file_cached(target_file)
 
     # Adjust root logic - we want the real content root
     if root_node.title == "Root" and len(root_node.children) == 1:
@@ -885,6 +908,7 @@ def generate_html(target_file, embed_d3=False, edit_disabled=False):
     html_content = HTML_TEMPLATE.replace("__DATA_PLACEHOLDER__", b64_data)
     html_content = html_content.replace("<!-- D3_LOADER_PLACEHOLDER -->", d3_loader)
     html_content = html_content.replace("__EDIT_DISABLED__", "true" if edit_disabled else "false")
+    html_content = html_content.replace("__EDITS_PENDING__", "true" if edits_pending else "false")
     html_content = html_content.replace("__RAW_FILE_PLACEHOLDER__", raw_file_b64)
 
     return html_content
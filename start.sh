@@ -27,9 +27,16 @@ STREAMLIT_PID=$!
 # Give Streamlit a moment to start
 sleep 3
 
-# Start nginx in foreground
+# Start nginx (in the background, so the TERM trap below can run)
 echo "Starting nginx reverse proxy on port 8080..."
-nginx -g 'daemon off;'
+nginx -g 'daemon off;' &
+NGINX_PID=$!
 
-# If nginx exits, kill Flask and Streamlit
+# Forward container shutdown to all services; Flask writes buffered edits on TERM
+trap 'kill -TERM $NGINX_PID $FLASK_PID $STREAMLIT_PID 2>/dev/null' TERM INT
+
+wait $NGINX_PID
+
+# If nginx exits, kill Flask and Streamlit, and let Flask finish writing
 kill $FLASK_PID $STREAMLIT_PID 2>/dev/null
+wait $FLASK_PID 2>/dev/null
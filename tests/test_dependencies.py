@@ -0,0 +1,77 @@
+"""Tests for blocked_by graph analyses (planner_lib/dependencies.py)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.dependencies import DependencyGraph, parse_estimate
+from planner_lib.md_parser import MarkdownParser
+
+PLAN = """# Plan
+
+## Repo A
+- type: repository
+
+### Design
+- id: a.design
+- estimate: 1d
+
+### Build
+- id: a.build
+- blocked_by: [a.design]
+- estimate: 3d
+
+### Ship
+- id: a.ship
+- blocked_by: [a.build, b.api, nowhere]
+- estimate: 4h
+
+## Repo B
+- type: repository
+
+### API
+- id: b.api
+- estimate: 1w
+
+### Loop one
+- id: b.one
+- blocked_by: [b.two]
+
+### Loop two
+- id: b.two
+- blocked_by: [b.one]
+"""
+
+
+def _graph():
+    return DependencyGraph(MarkdownParser().parse_lines(PLAN.splitlines(True)))
+
+
+def test_order_and_cycles():
+    graph = _graph()
+    order = graph.topological_order()
+    assert sorted(order) == ["a.build", "a.design", "a.ship", "b.api"]
+    assert order.index("a.design") < order.index("a.build") < order.index("a.ship")
+    assert order.index("b.api") < order.index("a.ship")
+    assert graph.cycles() == [["b.one", "b.two"]]
+    assert graph.missing == [("a.ship", "nowhere")]
+
+
+def test_blockers_and_paths():
+    graph = _graph()
+    assert graph.blockers("a.ship") == {"a.build", "a.design", "b.api"}
+    assert graph.blockers("b.one") == {"b.one", "b.two"}
+    # b.api (40h) + a.ship (4h) outweighs a.design + a.build (32h) + a.ship
+    assert graph.critical_path() == (["b.api", "a.ship"], 44.0)
+    chains = graph.longest_chains()
+    assert chains["Repo A"] == ["a.design", "a.build", "a.ship"]
+    assert chains["Repo B"] == ["b.api"]
+
+
+def test_parse_estimate():
+    assert parse_estimate("4h") == 4.0
+    assert parse_estimate("1.5W") == 60.0
+    assert parse_estimate(2) == 2.0
+    assert parse_estimate("soon") is None
+    assert parse_estimate(True) is None
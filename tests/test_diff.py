@@ -0,0 +1,66 @@
+"""Tests for the structural plan diff (planner_lib/diff.py)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.diff import ADDED, CONTENT, METADATA, MOVED, REMOVED, RENAMED, diff_texts, summarize
+
+OLD = """# Plan
+
+## Repo A
+- id: repo-a
+
+### Build
+- id: build
+- status: todo
+
+Compile it.
+
+### Notes
+Plain notes.
+
+## Repo B
+- id: repo-b
+
+### Docs
+- id: docs
+"""
+
+
+def _changes(new_text):
+    return sorted((change.kind, change.node.title) for change in diff_texts(OLD, new_text))
+
+
+def test_reordered_sections_are_not_changes():
+    repo_b = OLD[OLD.index("## Repo B"):]
+    reordered = OLD[:OLD.index("## Repo A")] + repo_b + "\n" + OLD[OLD.index("## Repo A"):OLD.index("## Repo B")]
+    assert _changes(reordered) == []
+
+
+def test_change_kinds():
+    new = (OLD.replace("- status: todo", "- status: done")
+              .replace("Compile it.", "Compile it.\nThen test it.")
+              .replace("### Docs\n- id: docs\n", "### Documentation\n- id: docs\n\n### Release\n- id: release\n")
+              .replace("### Notes\nPlain notes.\n\n", ""))
+    # Build moves from Repo A to Repo B
+    build = new[new.index("### Build"):new.index("## Repo B")]
+    new = new.replace(build, "") + "\n" + build
+    assert _changes(new) == [
+        (ADDED, "Release"),
+        (CONTENT, "Build"),
+        (METADATA, "Build"),
+        (MOVED, "Build"),
+        (REMOVED, "Notes"),
+        (RENAMED, "Documentation"),
+    ]
+
+
+def test_details_and_summary():
+    changes = diff_texts(OLD, OLD.replace("- status: todo", "- status: done"))
+    [change] = changes
+    assert change.details == {"status": ("todo", "done")}
+    assert change.path == "Plan > Repo A > Build"
+    assert summarize(changes)[METADATA] == 1 and summarize(changes)[ADDED] == 0
+    assert str(change) == "* metadata Plan > Repo A > Build (line 6): status todo -> done"
@@ -0,0 +1,67 @@
+"""Tests for write-behind edits (planner_lib/document_buffer.py with FileEditor)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.document_buffer import DocumentBuffer
+from planner_lib.file_editor import FileEditor
+from planner_lib.md_parser import MarkdownParser
+
+PLAN = """# Plan
+
+## Alpha
+- id: alpha
+- status: todo
+
+Alpha body
+
+## Beta
+- id: beta
+- status: todo
+
+Beta body
+"""
+
+
+def _content_edit(buffer, path, node_id, text):
+    node = buffer.get(path).index.get(node_id)
+    return FileEditor(index_cache=buffer).apply_edits({
+        "file_path": path,
+        "node_identifier": {"id": node_id},
+        "version": node.node_hash,
+        "content_edit": {"value": text},
+    })
+
+
+def test_failed_edit_keeps_earlier_buffered_edits(tmp_path, monkeypatch):
+    path = str(tmp_path / "plan.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(PLAN)
+    buffer = DocumentBuffer(flush_interval=60)
+
+    success, message = _content_edit(buffer, path, "alpha", "Edit A")
+    assert success, message
+    assert buffer.pending(path) == 1
+
+    # Edit B fails halfway: lines already spliced, tree not updated
+    reparse_range = MarkdownParser.reparse_range
+
+    def failing_reparse_range(self, root, lines, start, end, replacement, index=None):
+        lines[start:end] = replacement
+        raise RuntimeError("reparse failed")
+
+    monkeypatch.setattr(MarkdownParser, "reparse_range", failing_reparse_range)
+    success, message = _content_edit(buffer, path, "beta", "Edit B")
+    assert not success
+    monkeypatch.setattr(MarkdownParser, "reparse_range", reparse_range)
+
+    assert buffer.pending(path) == 1
+    assert buffer.flush(path) == 1
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert "Edit A" in text
+    assert "Edit B" not in text and "Beta body" in text
+    assert buffer.get(path).root.to_dict() == MarkdownParser().parse_file(path).to_dict()
+    buffer.close()
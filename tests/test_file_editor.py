@@ -0,0 +1,178 @@
+"""Tests for applying edits to plan files (planner_lib/file_editor.py)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.file_editor import FileEditor
+from planner_lib.index_cache import IndexCache
+from planner_lib.md_parser import MarkdownParser
+from planner_lib.node_index import NodeIndex
+
+PLAN = """# Plan
+
+## Alpha
+- id: alpha
+- status: todo
+
+Alpha body
+
+## Beta
+- id: beta
+- status: todo
+
+Beta body
+"""
+
+
+@pytest.fixture
+def plan_file(tmp_path):
+    path = str(tmp_path / "plan.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(PLAN)
+    return path
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _index(path):
+    index = NodeIndex()
+    with open(path, encoding="utf-8") as f:
+        MarkdownParser().parse_lines(f.readlines(), index)
+    return index
+
+
+def _status_edit(node, value):
+    return {
+        "node_identifier": {"id": node.metadata["id"]},
+        "metadata_edits": {"status": {"value": value, "line_number": node.metadata_location["status"]}},
+    }
+
+
+def test_batch_applies_every_edit_in_one_write(plan_file):
+    index = _index(plan_file)
+    alpha, beta = index.get("alpha"), index.get("beta")
+    editor = FileEditor()
+    ok, msg = editor.apply_edits_batch({"file_path": plan_file, "edits": [
+        _status_edit(alpha, "done"),
+        {"node_identifier": {"id": "beta"}, "content_edit": {
+            "value": "New beta\nsecond line",
+            "start_line": beta.content_location_start, "end_line": beta.content_location_end}},
+    ]})
+    assert ok, msg
+    assert "2 edits" in msg
+
+    index = _index(plan_file)
+    assert index.get("alpha").metadata["status"] == "done"
+    assert index.get("beta").content.strip() == "New beta\nsecond line"
+    assert [state["id"] for state in editor.updated_nodes] == ["alpha", "beta"]
+
+
+def test_batch_is_all_or_nothing(plan_file):
+    alpha = _index(plan_file).get("alpha")
+    bad = {"node_identifier": {"id": "beta"}, "metadata_edits": {"status": {"value": "done", "line_number": 999}}}
+    ok, msg = FileEditor().apply_edits_batch({"file_path": plan_file, "edits": [_status_edit(alpha, "done"), bad]})
+    assert not ok
+    assert msg.startswith("Validation error: Edit 2:")
+    assert _read(plan_file) == PLAN
+
+
+def test_batch_rejects_overlapping_and_malformed_edits(plan_file):
+    alpha = _index(plan_file).get("alpha")
+    editor = FileEditor()
+    ok, msg = editor.apply_edits_batch({"file_path": plan_file,
+                                        "edits": [_status_edit(alpha, "done"), _status_edit(alpha, "doing")]})
+    assert not ok and "overlap" in msg
+
+    ok, msg = editor.apply_edits_batch({"file_path": plan_file, "edits": []})
+    assert not ok and "edits must be a non-empty list" in msg
+
+    ok, msg = editor.apply_edits_batch({"file_path": plan_file,
+                                        "edits": [dict(_status_edit(alpha, "done"), file_path="other.md")]})
+    assert not ok and "Edit 1: file_path differs from the batch file_path" in msg
+    assert _read(plan_file) == PLAN
+
+
+def test_version_token_follows_moved_node_and_detects_changes(plan_file):
+    beta = _index(plan_file).get("beta")
+    stale = beta.node_hash
+
+    # Lines added above Beta move it, but its version stays valid
+    alpha = _index(plan_file).get("alpha")
+    ok, msg = FileEditor().apply_edits({
+        "file_path": plan_file, "node_identifier": {"id": "alpha"},
+        "content_edit": {"value": "Alpha body\nmore\nlines",
+                         "start_line": alpha.content_location_start, "end_line": alpha.content_location_end}})
+    assert ok, msg
+    editor = FileEditor()
+    ok, msg = editor.apply_edits({
+        "file_path": plan_file, "node_identifier": {"id": "beta"}, "version": stale,
+        "metadata_edits": {"status": {"value": "doing", "line_number": beta.metadata_location["status"]}}})
+    assert ok, msg
+    assert not editor.conflict
+    assert editor.updated_nodes[0]["metadata"]["status"] == "doing"
+
+    # Beta itself changed: the old token is now a conflict
+    ok, msg = editor.apply_edits({
+        "file_path": plan_file, "node_identifier": {"id": "beta"}, "version": stale,
+        "metadata_edits": {"status": {"value": "done"}}})
+    assert not ok and msg.startswith("Conflict:")
+    assert editor.conflict
+    assert editor.last_conflict["id"] == "beta"
+    assert editor.last_conflict["node_hash"] == _index(plan_file).get("beta").node_hash
+    assert _index(plan_file).get("beta").metadata["status"] == "doing"
+
+
+def test_require_version_rejects_edits_without_a_token(plan_file):
+    ok, msg = FileEditor(require_version=True).apply_edits({
+        "file_path": plan_file, "node_identifier": {"id": "alpha"},
+        "metadata_edits": {"status": {"value": "done"}}})
+    assert not ok and "version" in msg
+    assert _read(plan_file) == PLAN
+
+
+def test_edits_by_id_alone_use_the_cached_index(plan_file):
+    cache = IndexCache()
+    document = cache.get(plan_file)
+    editor = FileEditor(index_cache=cache)
+    ok, msg = editor.apply_edits({
+        "file_path": plan_file, "node_identifier": {"id": "beta"},
+        "metadata_edits": {"status": {"value": "done"}},
+        "content_edit": {"value": "Beta rewritten"}})
+    assert ok, msg
+
+    # The cached document was edited in place and matches the file
+    assert cache.get(plan_file) is document
+    assert document.lines == _read(plan_file).splitlines(True)
+    assert document.index.get("beta").metadata["status"] == "done"
+    assert _index(plan_file).get("beta").content.strip() == "Beta rewritten"
+
+
+def test_stale_line_numbers_and_ambiguous_titles_are_rejected(plan_file):
+    beta = _index(plan_file).get("beta")
+    with open(plan_file, "a", encoding="utf-8") as f:
+        f.write("\n## Beta\n- status: todo\n")
+    alpha = _index(plan_file).get("alpha")
+    ok, msg = FileEditor().apply_edits({
+        "file_path": plan_file, "node_identifier": {"id": "alpha"},
+        "content_edit": {"value": "Alpha\nnow longer",
+                         "start_line": alpha.content_location_start, "end_line": alpha.content_location_end}})
+    assert ok, msg
+    before = _read(plan_file)
+
+    ok, msg = FileEditor().apply_edits({
+        "file_path": plan_file, "node_identifier": {"id": "beta"},
+        "metadata_edits": {"status": {"value": "done", "line_number": beta.metadata_location["status"]}}})
+    assert not ok and "Line numbers do not match node 'Beta'" in msg
+
+    ok, msg = FileEditor().apply_edits({
+        "file_path": plan_file, "node_identifier": {"title": "Beta"},
+        "metadata_edits": {"status": {"value": "done"}}})
+    assert not ok and "2 nodes match 'Beta'" in msg
+    assert _read(plan_file) == before
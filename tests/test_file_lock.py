@@ -0,0 +1,104 @@
+"""Tests for per-file locks and atomic writes (planner_lib/file_lock.py)."""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.file_editor import FileEditor
+from planner_lib.file_lock import FileLockManager, atomic_write
+from planner_lib.md_parser import MarkdownParser
+from planner_lib.node_index import NodeIndex
+
+
+def test_lock_is_shared_by_every_spelling_and_times_out(tmp_path):
+    path = tmp_path / "plan.md"
+    path.write_text("# Plan\n")
+    link = tmp_path / "link.md"
+    link.symlink_to(path)
+    manager = FileLockManager()
+    held, release = threading.Event(), threading.Event()
+
+    def holder():
+        with manager.lock(str(link)):
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    held.wait()
+    try:
+        with pytest.raises(TimeoutError):
+            with manager.lock(str(path), timeout=0.05):
+                pass
+    finally:
+        release.set()
+        thread.join()
+    assert len(manager) == 0
+
+    with manager.lock(str(path)):
+        with manager.lock(str(path), timeout=0):
+            pass
+
+
+def test_atomic_write_keeps_original_on_error_and_follows_symlinks(tmp_path):
+    path = tmp_path / "plan.md"
+    path.write_text("old\n")
+    os.chmod(path, 0o640)
+    link = tmp_path / "link.md"
+    link.symlink_to(path)
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(link)) as f:
+            f.write("partial")
+            raise RuntimeError("crash")
+    assert path.read_text() == "old\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["link.md", "plan.md"]
+
+    with atomic_write(str(link)) as f:
+        f.write("new\n")
+    assert link.is_symlink()
+    assert path.read_text() == "new\n"
+    assert os.stat(path).st_mode & 0o777 == 0o640
+
+
+def test_concurrent_edits_to_one_file_lose_no_updates(tmp_path):
+    count = 8
+    path = str(tmp_path / "plan.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Plan\n\n")
+        for i in range(count):
+            f.write(f"## Task {i}\n- id: t{i}\n- status: todo\n\n")
+
+    def edit(i):
+        # Line numbers from the file as it was, before the other threads' edits
+        index = NodeIndex()
+        with open(path, encoding="utf-8") as f:
+            MarkdownParser().parse_lines(f.readlines(), index)
+        node = index.get(f"t{i}")
+        results[i] = FileEditor().apply_edits({
+            "file_path": path,
+            "node_identifier": {"id": f"t{i}"},
+            "version": node.node_hash,
+            "metadata_edits": {"status": {"value": "done"}},
+            "content_edit": {"value": f"Done by thread {i}"},
+        })
+
+    results = [None] * count
+    threads = [threading.Thread(target=edit, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(ok for ok, _ in results), results
+    index = NodeIndex()
+    with open(path, encoding="utf-8") as f:
+        MarkdownParser().parse_lines(f.readlines(), index)
+    for i in range(count):
+        node = index.get(f"t{i}")
+        assert node.metadata["status"] == "done"
+        assert node.content.strip() == f"Done by thread {i}"
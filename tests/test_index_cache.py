@@ -0,0 +1,77 @@
+"""Tests for the shared document cache (planner_lib/index_cache.py)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.index_cache import IndexCache
+from planner_lib.md_parser import MarkdownParser
+
+PLAN = """# Plan
+
+## Alpha
+- id: alpha
+- status: todo
+
+Alpha body
+
+## Beta
+- id: beta
+- status: todo
+
+Beta body
+"""
+
+
+def _replace(path, text, mtime_ns=None):
+    # Atomic replacement, as FileEditor writes it
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_outside_change_is_reparsed_in_place(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    cache = IndexCache()
+    document = cache.get(path)
+    alpha = document.index.get("alpha")
+    version = document.version
+
+    _replace(path, PLAN.replace("- status: todo\n\nBeta", "- status: done\n\nBeta"))
+
+    assert cache.get(path) is document
+    assert document.version == version + 1
+    assert document.root.to_dict() == MarkdownParser().parse_file(path).to_dict()
+    # Nodes outside the changed span are kept
+    assert document.index.get("alpha") is alpha
+    assert document.index.get("beta").metadata["status"] == "done"
+
+
+def test_same_size_replacement_with_same_mtime(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    cache = IndexCache()
+    document = cache.get(path)
+
+    # Same size and mtime, new inode
+    _replace(path, PLAN.replace("Beta body", "Zeta body"), os.stat(path).st_mtime_ns)
+
+    assert cache.get(path).root.to_dict() == MarkdownParser().parse_file(path).to_dict()
+    assert document.version == 1
+
+
+def test_unchanged_replacement_keeps_version(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    cache = IndexCache()
+    document = cache.get(path)
+
+    _replace(path, PLAN)
+
+    assert cache.get(path) is document
+    assert document.version == 0
@@ -0,0 +1,296 @@
+"""Tests for the parser, tree traversal and serializers (planner_lib/md_parser.py)."""
+
+import copy
+import io
+import json
+import os
+import pickle
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.dependencies import DependencyGraph
+from planner_lib.node_index import NodeIndex
+from planner_lib.md_parser import (EVENT_CONTENT, EVENT_END, EVENT_METADATA, EVENT_START, FrozenDict, FrozenList,
+                                   LazyContentNode, MarkdownParser, Node, invalidate_hashes, parse_many,
+                                   read_ndjson, walk, walk_postorder, write_markdown, write_ndjson)
+
+PLAN = """Preamble that belongs to no node
+
+# Plan
+- status: active
+<!-- content -->
+Plan overview
+
+## Setup
+- id: setup
+- status: done
+
+Install the tools.
+
+  Indented detail.
+## Build
+
+Build has no metadata.
+### Ship
+- id: ship
+- status: todo
+- blocked_by: [setup]
+"""
+
+
+def _write(tmp_path, text, name="plan.md"):
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_lazy_content_matches_eager_parse(tmp_path):
+    parser = MarkdownParser()
+    for text in (PLAN, PLAN.rstrip("\n"), PLAN + "\n\n", PLAN.replace("\n", "\r\n"), "# Only\n- id: x\n", ""):
+        path = _write(tmp_path, text)
+        assert parser.parse_file(path, lazy_content=True).to_dict() == parser.parse_file(path).to_dict()
+
+
+def test_lazy_content_is_cut_out_on_first_read(tmp_path):
+    path = _write(tmp_path, PLAN)
+    root = MarkdownParser().parse_file(path, lazy_content=True)
+    setup = root.children[0]
+    assert isinstance(setup, LazyContentNode)
+    assert setup._source is not None
+
+    assert setup.content == "Install the tools.\n\n  Indented detail."
+    assert setup._source is None
+
+    setup.content = "Replaced"
+    assert setup.content == "Replaced"
+
+
+def test_lazy_nodes_pickle_and_copy_with_content(tmp_path):
+    path = _write(tmp_path, PLAN)
+    eager = MarkdownParser().parse_file(path)
+    for clone in (pickle.loads(pickle.dumps(MarkdownParser().parse_file(path, lazy_content=True))),
+                  copy.deepcopy(MarkdownParser().parse_file(path, lazy_content=True))):
+        assert clone.to_dict() == eager.to_dict()
+
+
+def test_lazy_content_falls_back_with_fenced_code(tmp_path):
+    path = _write(tmp_path, PLAN)
+    root = MarkdownParser(fenced_code=True).parse_file(path, lazy_content=True)
+    assert type(root) is Node
+
+
+def test_dependency_graph_from_file(tmp_path):
+    graph = DependencyGraph.from_file(_write(tmp_path, PLAN))
+    assert graph.ids == ["setup", "ship"]
+    assert list(graph.blockers_of(graph.vertex["ship"])) == [graph.vertex["setup"]]
+
+
+def test_walk_postorder_yields_children_first():
+    root = MarkdownParser().parse_lines(PLAN.splitlines(True))
+    order = list(walk_postorder(root))
+    assert sorted(map(id, order)) == sorted(map(id, walk(root)))
+    position = {id(node): number for number, node in enumerate(order)}
+    for node in walk(root):
+        assert all(position[id(child)] < position[id(node)] for child in node.children)
+    assert order[-1] is root
+
+
+def test_subtree_hash_recomputes_only_invalidated_path():
+    root = MarkdownParser().parse_lines(PLAN.splitlines(True))
+    before = {id(node): node.subtree_hash for node in walk(root)}
+    leaf = next(node for node in walk(root) if not node.children and node is not root)
+    leaf.content = "changed"
+    invalidate_hashes(root, leaf)
+
+    # Rebuilt nodes have no cached hashes
+    fresh = Node.from_dict(root.to_dict())
+    assert [node.subtree_hash for node in walk(root)] == [node.subtree_hash for node in walk(fresh)]
+    changed = {id(node) for node in walk(root) if node.subtree_hash != before[id(node)]}
+    ancestors = {id(node) for node in walk(root) if any(current is leaf for current in walk(node))}
+    assert changed == ancestors
+
+
+def test_events_describe_the_parsed_tree():
+    parser = MarkdownParser()
+    root = parser.parse_lines(PLAN.splitlines(True))
+    nodes = [node for node in walk(root) if node.level > 0]
+    events = list(parser.iter_events(io.StringIO(PLAN)))
+
+    starts = [event for event in events if event[0] == EVENT_START]
+    assert [(level, title, line) for _, level, title, line in starts] == \
+        [(node.level, node.title, node.header_line) for node in nodes]
+    contents = [event[1:] for event in events if event[0] == EVENT_CONTENT]
+    assert contents == [(node.content, node.content_location_start, node.content_location_end) for node in nodes]
+
+    # START / END pairs nest like the tree
+    open_titles = []
+    for event in events:
+        if event[0] == EVENT_START:
+            open_titles.append(event[2])
+        elif event[0] == EVENT_END:
+            assert open_titles.pop() == event[2]
+    assert not open_titles
+
+
+def test_events_without_content():
+    parser = MarkdownParser()
+    events = list(parser.iter_events(io.StringIO(PLAN), with_content=False))
+    assert all(event[1] is None for event in events if event[0] == EVENT_CONTENT)
+    metadata = [event[1:3] for event in events if event[0] == EVENT_METADATA]
+    assert ("id", "setup") in metadata and ("status", "done") in metadata
+
+
+def test_line_classification_edge_cases():
+    text = (
+        "# Top\n- id: top\n#NoSpace\n####### Seven\n   # Indented\n\t# Tab\n- not: metadata here\n"
+        "## Child\n-key: v\n- id: child\n<!-- content -->\n- looks: like metadata\n"
+    )
+    root = MarkdownParser().parse_lines(text.splitlines(True))
+    assert [(node.level, node.title, node.metadata, node.content) for node in walk(root)] == [
+        (1, "Top", {"id": "top"}, "#NoSpace"),
+        # Any run of #s is a header; indented ones and metadata after content are content
+        (7, "Seven", {}, "# Indented\n\t# Tab\n- not: metadata here"),
+        (2, "Child", {"key": "v", "id": "child"}, "- looks: like metadata"),
+    ]
+
+
+REPARSE_EDITS = [
+    # (start, end, replacement) on PLAN's lines
+    (13, 14, ["  Indented detail, edited.\n"]),              # content only
+    (9, 10, ["- status: todo\n", "- owner: dev-1\n"]),    # metadata, one more line
+    (17, 17, ["## Test\n", "- id: test\n", "\n"]),       # new header adopts Ship
+    (14, 15, []),                                         # header removed
+    (21, 21, ["# Second top level\n"]),                  # new root sibling at the end
+]
+
+
+def _indexed(index, root):
+    """What the index says about each node: parent title and whether at_line finds it."""
+    result = []
+    for node in walk(root):
+        parent = index.parent_of(node)
+        result.append((node.title, parent.title if parent else None,
+                       index.at_line(node.header_line) is node if node.level else None))
+    return result
+
+
+def test_reparse_range_matches_full_parse():
+    parser = MarkdownParser()
+    for start, end, replacement in REPARSE_EDITS:
+        lines = PLAN.splitlines(True)
+        index = NodeIndex()
+        root = parser.parse_lines(lines, index)
+        setup = index.get("setup")
+
+        root = parser.reparse_range(root, lines, start, end, replacement, index)
+
+        expected = PLAN.splitlines(True)
+        expected[start:end] = replacement
+        assert lines == expected
+        fresh_index = NodeIndex()
+        fresh = parser.parse_lines(expected, fresh_index)
+        assert root.to_dict() == fresh.to_dict(), (start, end)
+        assert _indexed(index, root) == _indexed(fresh_index, fresh)
+        if start > 15:
+            # Nodes whose span the edit does not touch keep their identity
+            assert index.get("setup") is setup
+
+
+def test_nodes_are_slotted_and_still_copy():
+    root = MarkdownParser().parse_lines(PLAN.splitlines(True))
+    assert not hasattr(root, "__dict__")
+    for clone in (pickle.loads(pickle.dumps(root)), copy.deepcopy(root)):
+        assert clone.to_dict() == root.to_dict()
+
+
+def test_parse_many_keeps_input_order_and_reports_failures(tmp_path):
+    paths = []
+    for number in range(4):
+        path = tmp_path / f"plan{number}.md"
+        path.write_text(PLAN.replace("# Plan", f"# Plan {number}"), encoding="utf-8")
+        paths.append(str(path))
+    paths.insert(2, str(tmp_path / "missing.md"))
+
+    for workers in (1, 2):
+        results = parse_many(paths, workers=workers)
+        assert [path for path, _, _ in results] == paths
+        path, tree, error = results[2]
+        assert tree is None and error.startswith("FileNotFoundError")
+        for path, tree, error in results[:2] + results[3:]:
+            assert error is None
+            assert tree.to_dict() == MarkdownParser().parse_file(path).to_dict()
+
+
+def test_write_markdown_streams_to_markdown():
+    root = MarkdownParser().parse_lines(PLAN.splitlines(True))
+    out = io.StringIO()
+    write_markdown(root, out)
+    assert out.getvalue() == root.to_markdown()
+
+
+def test_ndjson_round_trip():
+    root = MarkdownParser().parse_lines(PLAN.splitlines(True))
+    out = io.StringIO()
+    write_ndjson(root, out)
+    lines = out.getvalue().splitlines(True)
+    assert len(lines) == sum(1 for _ in walk(root))
+    assert read_ndjson(lines).to_dict() == root.to_dict()
+
+
+def test_ndjson_rejects_orphans():
+    out = io.StringIO()
+    write_ndjson(MarkdownParser().parse_lines(PLAN.splitlines(True)), out)
+    lines = out.getvalue().splitlines(True)
+    # Without Build's record, Ship's parent is unknown
+    with pytest.raises(ValueError, match="not found"):
+        read_ndjson(lines[:2] + lines[3:])
+
+
+SHARED = """# Plan
+## One
+- status: todo
+- blocked_by: [setup, review]
+- context_dependencies: {"conventions": "MD_CONVENTIONS.md"}
+## Two
+- status: todo
+- blocked_by: [setup, review]
+- context_dependencies: {"conventions": "MD_CONVENTIONS.md"}
+"""
+
+
+def test_repeated_metadata_values_are_shared_and_frozen():
+    one, two = MarkdownParser().parse_lines(SHARED.splitlines(True)).children
+    for key in ("status", "blocked_by", "context_dependencies"):
+        assert one.metadata[key] is two.metadata[key]
+    blocked_by = one.metadata["blocked_by"]
+    assert isinstance(blocked_by, FrozenList) and blocked_by == ["setup", "review"]
+    assert isinstance(one.metadata["context_dependencies"], FrozenDict)
+
+    with pytest.raises(TypeError):
+        blocked_by.append("deploy")
+    with pytest.raises(TypeError):
+        one.metadata["context_dependencies"]["agents"] = "AGENTS.md"
+    # Replacing the value is the way to change it; the other node keeps its own
+    one.metadata["blocked_by"] = blocked_by + ["deploy"]
+    assert two.metadata["blocked_by"] == ["setup", "review"]
+    assert json.loads(json.dumps(two.to_dict()))["metadata"]["blocked_by"] == ["setup", "review"]
+
+
+def test_hashes_ignore_line_shifts_and_track_content():
+    parser = MarkdownParser()
+    root = parser.parse_lines(PLAN.splitlines(True))
+    shifted = parser.parse_lines(("Another preamble line\n\n" + PLAN).splitlines(True))
+    assert [(node.node_hash, node.subtree_hash) for node in walk(root)] == \
+        [(node.node_hash, node.subtree_hash) for node in walk(shifted)]
+
+    edited = parser.parse_lines(PLAN.replace("Build has no metadata.", "Build changed.").splitlines(True))
+    changed = [node.title for node, other in zip(walk(root), walk(edited)) if node.node_hash != other.node_hash]
+    assert changed == ["Build"]
+    changed = [node.title for node, other in zip(walk(root), walk(edited)) if node.subtree_hash != other.subtree_hash]
+    assert changed == ["Plan", "Build"]
+
+    record = root.to_dict()
+    assert (record["node_hash"], record["subtree_hash"]) == (root.node_hash, root.subtree_hash)
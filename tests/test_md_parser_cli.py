@@ -0,0 +1,52 @@
+"""Tests for the md_parser command line (run as a script, as users do)."""
+
+import json
+import os
+import subprocess
+import sys
+
+MD_PARSER = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                         "src", "planner_lib", "md_parser.py")
+
+PLAN = """# Plan
+- status: active
+- type: plan
+- context_dependencies: {"conventions": "MD_CONVENTIONS.md"}
+
+## Task
+- status: todo
+- type: task
+- blocked_by: [setup, review]
+"""
+
+
+def _run(tmp_path, *args):
+    # The cached path (no --no-cache), with any disk store kept in tmp_path
+    env = dict(os.environ, PLANNER_CACHE_DIR=str(tmp_path / "cache"))
+    return subprocess.run([sys.executable, MD_PARSER, *args], capture_output=True, text=True, env=env)
+
+
+def _write(tmp_path, name="plan.md"):
+    path = tmp_path / name
+    path.write_text(PLAN, encoding="utf-8")
+    return str(path)
+
+
+def test_cli_parses_list_and_dict_metadata(tmp_path):
+    path = _write(tmp_path)
+    for _ in range(2):  # cold, then from the cache
+        result = _run(tmp_path, path)
+        assert result.returncode == 0, result.stderr
+        tree = json.loads(result.stdout)
+        assert tree["metadata"]["context_dependencies"] == {"conventions": "MD_CONVENTIONS.md"}
+        assert tree["children"][0]["metadata"]["blocked_by"] == ["setup", "review"]
+
+
+def test_cli_batch_mode(tmp_path):
+    paths = [_write(tmp_path, "a.md"), _write(tmp_path, "b.md")]
+    result = _run(tmp_path, "--batch", "-j", "2", *paths)
+    assert result.returncode == 0, result.stderr
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert sorted(record["path"] for record in records) == sorted(paths)
+    assert all(record["errors"] == [] for record in records)
+    assert records[0]["tree"]["children"][0]["metadata"]["blocked_by"] == ["setup", "review"]
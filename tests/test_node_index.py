@@ -0,0 +1,74 @@
+"""Tests for node lookups (planner_lib/node_index.py)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.md_parser import MarkdownParser, invalidate_hashes
+from planner_lib.node_index import NodeIndex
+
+PLAN = """# Plan
+- id: plan
+
+## Repo
+- id: repo
+
+### Task
+- id: repo.task
+
+## Other
+- id: other
+
+### Task
+- id: repo.task
+"""
+
+
+def _parse():
+    index = NodeIndex()
+    root = MarkdownParser().parse_lines(PLAN.splitlines(True), index)
+    return root, index
+
+
+def test_lookups_built_while_parsing():
+    root, index = _parse()
+    repo, other = root.children
+    assert len(index) == 5
+    assert index.get("repo") is repo
+    # Repeated ids and titles: all of them, in document order
+    assert index.find_id("repo.task") == [repo.children[0], other.children[0]]
+    assert index.find_title("Task") == [repo.children[0], other.children[0]]
+    assert index.get_path("Plan.Repo.Task") is repo.children[0]
+    assert index.find_child(other, "Task") is other.children[0]
+    assert index.at_line(12) is other.children[0]
+    assert index.parent_of(repo.children[0]) is repo
+    assert index.parent_of(root) is None
+    assert index.path_of(other.children[0]) == ("Plan", "Other", "Task")
+
+
+def test_parse_index_equals_built_index():
+    root, index = _parse()
+    built = NodeIndex(root)
+    for node_id in ("plan", "repo", "repo.task", "other"):
+        assert built.find_id(node_id) == index.find_id(node_id)
+    for line in range(len(PLAN.splitlines())):
+        assert built.at_line(line) is index.at_line(line)
+
+
+def test_update_after_in_place_change():
+    root, index = _parse()
+    other = index.get("other")
+    other.title = "Renamed"
+    other.metadata = {"id": "renamed"}
+    invalidate_hashes(root, other)
+    index.update(other)
+
+    assert index.get("other") is None
+    assert index.get("renamed") is other
+    assert index.get_path("Plan.Renamed.Task") is other.children[0]
+    assert index.get_path("Plan.Other.Task") is None
+
+    index.remove_subtree(other)
+    assert other not in index and other.children[0] not in index
+    assert index.find_id("repo.task") == [index.get_path("Plan.Repo.Task")]
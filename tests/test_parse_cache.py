@@ -0,0 +1,105 @@
+"""Tests for the parse cache (planner_lib/parse_cache.py)."""
+
+import marshal
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.md_parser import MarkdownParser, parse_many
+from planner_lib.parse_cache import CACHE_FORMAT, CACHE_SUFFIX, ParseCache, dump_tree, enable_disk_cache
+
+PLAN = "# Plan\n\n## Task\n- id: task\n- status: todo\n\nBody\n"
+
+
+def _task(root):
+    return root.children[0]
+
+
+def _write(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def test_same_size_replacement_with_same_mtime_is_reparsed(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _write(path, PLAN)
+    cache = ParseCache()
+    stat = os.stat(path)
+    assert _task(cache.parse_file(path)).metadata["status"] == "todo"
+
+    # todo -> done keeps the size; force the old mtime as a coarse clock would
+    _write(path, PLAN.replace("todo", "done"))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert _task(cache.parse_file(path)).metadata["status"] == "done"
+
+
+def test_corrupt_disk_payload_falls_back_to_parse(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _write(path, PLAN)
+    cache_dir = str(tmp_path / "cache")
+    ParseCache(cache_dir).parse_file(path)
+
+    # A payload of the wrong shape (valid marshal data, not a tree)
+    for name in os.listdir(cache_dir):
+        with open(os.path.join(cache_dir, name), "wb") as f:
+            f.write(marshal.dumps(((CACHE_FORMAT, True, ()), [])))
+
+    root = ParseCache(cache_dir).parse_file(path)
+    assert _task(root).metadata["id"] == "task"
+
+
+def test_default_cache_has_no_disk_store_without_env():
+    import planner_lib.parse_cache as parse_cache
+    if not os.environ.get("PLANNER_CACHE_DIR"):
+        assert parse_cache.DEFAULT_CACHE_DIR is None
+
+
+def _payloads(cache_dir):
+    return [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(CACHE_SUFFIX)]
+
+
+def test_enable_disk_cache_keeps_a_configured_store(tmp_path, monkeypatch):
+    import planner_lib.parse_cache as parse_cache
+    monkeypatch.setattr(parse_cache, "_default_cache", ParseCache())
+    monkeypatch.setattr(parse_cache, "CLI_CACHE_DIR", str(tmp_path / "cli"))
+    assert enable_disk_cache().cache_dir == str(tmp_path / "cli")
+
+    monkeypatch.setattr(parse_cache, "_default_cache", ParseCache(str(tmp_path / "configured")))
+    assert enable_disk_cache().cache_dir == str(tmp_path / "configured")
+
+
+def test_parse_many_workers_reuse_the_disk_store(tmp_path, monkeypatch):
+    import planner_lib.parse_cache as parse_cache
+    monkeypatch.setattr(parse_cache, "_default_cache", ParseCache())
+    monkeypatch.setattr(parse_cache, "CLI_CACHE_DIR", str(tmp_path / "cli"))
+    path = str(tmp_path / "plan.md")
+    _write(path, PLAN)
+
+    [(_, root, error)] = parse_many([path], workers=1, use_cache=True)
+    assert error is None and _task(root).title == "Task"
+    [payload_path] = _payloads(str(tmp_path / "cli"))
+    # The caller's default cache stays in memory only
+    assert parse_cache.get_default_cache().cache_dir is None
+
+    # A hit returns the stored payload rather than parsing the file
+    other = MarkdownParser().parse_lines(PLAN.replace("## Task", "## Stored").splitlines(True))
+    with open(payload_path, "wb") as f:
+        f.write(dump_tree(other))
+    [(_, root, error)] = parse_many([path], workers=1, use_cache=True)
+    assert _task(root).title == "Stored"
+
+
+def test_cli_stores_trees_in_the_user_cache_dir(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _write(path, PLAN)
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmp_path / "xdg"))
+    env.pop("PLANNER_CACHE_DIR", None)
+    md_parser = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                             "src", "planner_lib", "md_parser.py")
+    result = subprocess.run([sys.executable, md_parser, path], capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stderr
+    assert len(_payloads(str(tmp_path / "xdg" / "planner"))) == 1
@@ -0,0 +1,124 @@
+"""Tests for metadata queries and the per-document engine (planner_lib/query.py)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.document_buffer import DocumentBuffer
+from planner_lib.file_editor import FileEditor
+from planner_lib.md_parser import MarkdownParser
+from planner_lib.query import QueryEngine, QuerySyntaxError, get_query_engine
+
+PLAN = """# Plan
+
+## Alpha
+- id: alpha
+- status: todo
+"""
+
+
+def _replace(path, text, mtime_ns=None):
+    # Atomic replacement, as FileEditor writes it
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _ids(path, expression):
+    return [node.metadata["id"] for node in get_query_engine(path).query(expression)]
+
+
+def test_same_size_replacement_with_same_mtime_is_requeried(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    assert _ids(path, "status=todo") == ["alpha"]
+
+    # Same size and mtime, new inode
+    _replace(path, PLAN.replace("todo", "done"), os.stat(path).st_mtime_ns)
+    assert _ids(path, "status=done") == ["alpha"]
+
+
+def test_engine_is_kept_with_the_document(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    buffer = DocumentBuffer(flush_interval=60)
+    engine = get_query_engine(path, index_cache=buffer)
+    assert get_query_engine(path, index_cache=buffer) is engine
+    # Built over the document's own tree
+    alpha = buffer.get(path).index.get("alpha")
+    assert engine.query("status=todo") == [alpha]
+
+    # A buffered edit is visible before it is written
+    success, message = FileEditor(index_cache=buffer).apply_edits({
+        "file_path": path,
+        "node_identifier": {"id": "alpha"},
+        "version": alpha.node_hash,
+        "metadata_edits": {"status": {"value": "done"}},
+    })
+    assert success, message
+    assert buffer.pending(path) == 1
+    assert get_query_engine(path, index_cache=buffer).query("status=done") == [alpha]
+    buffer.close()
+
+
+TREE = """# Plan
+- id: plan
+
+## Repo X
+- id: repo-x
+
+### Task one
+- id: x.one
+- status: todo
+- priority: high
+- blocked_by: [setup.env]
+
+### Task two
+- id: x.two
+- status: done
+- estimate: 2d
+
+## Other
+- id: other
+- status: todo
+- priority: critical
+"""
+
+
+def _query_ids(expression, limit=None):
+    engine = QueryEngine(MarkdownParser().parse_lines(TREE.splitlines(True)))
+    return [node.metadata["id"] for node in engine.query(expression, limit)]
+
+
+def test_operators():
+    assert _query_ids("status=todo") == ["x.one", "other"]
+    assert _query_ids("status!=todo") == ["x.two"]
+    assert _query_ids("priority IN (high, critical)") == ["x.one", "other"]
+    assert _query_ids("HAS estimate") == ["x.two"]
+    assert _query_ids("UNDER repo-x") == ["x.one", "x.two"]
+    assert _query_ids('UNDER "Repo X" AND NOT status=done') == ["x.one"]
+    # List values match per item
+    assert _query_ids("blocked_by=setup.env") == ["x.one"]
+    # NOT > AND > OR; keywords are case-insensitive
+    assert _query_ids("status=done or status=todo and priority=critical") == ["x.two", "other"]
+    assert _query_ids("(status=done OR status=todo) AND priority=critical") == ["other"]
+    assert _query_ids("not has status") == ["plan", "repo-x"]
+
+
+def test_limit_and_count():
+    engine = QueryEngine(MarkdownParser().parse_lines(TREE.splitlines(True)))
+    count, nodes = engine.search("HAS id", 2)
+    assert count == engine.count("HAS id") == 5
+    assert [node.metadata["id"] for node in nodes] == ["plan", "repo-x"]
+
+
+def test_syntax_errors():
+    for expression in ("status=", "status IN (a", "AND status=todo", 'title="open'):
+        with pytest.raises(QuerySyntaxError):
+            _query_ids(expression)
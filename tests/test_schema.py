@@ -0,0 +1,34 @@
+"""Tests for the compiled metadata schema (planner_lib/schema.py)."""
+
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib import schema
+from planner_lib.schema import DEFAULT_FIELDS, EXTRA_VALUES, FORMATS, Schema
+
+
+def test_builtin_rules_mirror_conventions():
+    compiled = Schema.from_conventions()
+    builtin = Schema(DEFAULT_FIELDS, FORMATS, EXTRA_VALUES)
+    assert {key: set(values) for key, values in compiled.allowed.items()} == \
+        {key: set(values) for key, values in builtin.allowed.items()}
+    assert {key: rule[0] for key, rule in compiled.rules.items()} == \
+        {key: rule[0] for key, rule in builtin.rules.items()}
+
+
+def test_missing_conventions_falls_back_with_warning(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(schema, "_default_schema", None)
+    monkeypatch.setattr(schema, "DEFAULT_CONVENTIONS_PATH", str(tmp_path / "missing.md"))
+    with caplog.at_level(logging.WARNING, logger=schema.logger.name):
+        fallback = schema.get_default_schema()
+    assert fallback.allowed == Schema(DEFAULT_FIELDS, FORMATS, EXTRA_VALUES).allowed
+    assert "built-in field rules" in caplog.text
+
+
+def test_validate_text_reports_lines():
+    errors = Schema(DEFAULT_FIELDS, FORMATS, EXTRA_VALUES).validate_text(
+        "# Plan\n- id: plan\n\n## Task\n- id: plan\n- status: started\n")
+    assert sorted((error.line, error.key) for error in errors) == [(4, "id"), (5, "status")]
@@ -0,0 +1,111 @@
+"""Tests for fuzzy search and the per-document search index (planner_lib/search.py)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.file_editor import FileEditor
+from planner_lib.index_cache import IndexCache
+from planner_lib.md_parser import MarkdownParser
+from planner_lib.search import TrigramIndex, search_file
+
+PLAN = """# Plan
+
+## Alpha
+- id: alpha
+- status: todo
+
+Alpha body
+
+## Beta
+- id: beta
+- status: todo
+
+Beta body
+"""
+
+
+def _replace(path, text):
+    # Same-size atomic replacement, as FileEditor writes it
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def test_search_after_same_line_count_edit(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    assert search_file(path, "Alpha")
+
+    _replace(path, PLAN.replace("Alpha body", "Gamma body"))
+    titles = [node.title for _, node, _ in search_file(path, "Gamma body")]
+    assert "Alpha" in titles
+
+
+def test_search_uses_the_cached_document_tree(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    cache = IndexCache()
+
+    _, node, field = search_file(path, "Beta", index_cache=cache)[0]
+
+    assert field == "name"
+    assert node is cache.get(path).index.get("beta")
+
+
+def test_search_sees_editor_commits(tmp_path):
+    path = str(tmp_path / "plan.md")
+    _replace(path, PLAN)
+    cache = IndexCache()
+    assert not search_file(path, "Zebra", index_cache=cache)
+
+    beta = cache.get(path).index.get("beta")
+    editor = FileEditor(index_cache=cache)
+    success, message = editor.apply_edits({
+        "file_path": path,
+        "node_identifier": {"id": "beta"},
+        "version": beta.node_hash,
+        "content_edit": {"value": "Zebra crossing"},
+    })
+    assert success, message
+
+    hits = search_file(path, "Zebra", index_cache=cache)
+    assert [node.metadata["id"] for _, node, _ in hits] == ["beta"]
+
+
+RANKED = """# Plan
+
+## Authentication service
+- id: auth.service
+
+Tokens and sessions.
+
+## Authentication
+- id: auth
+
+## Billing
+- id: billing
+
+Depends on the authentication service.
+"""
+
+
+def _search(text, **options):
+    index = TrigramIndex(MarkdownParser().parse_lines(RANKED.splitlines(True)))
+    return [(node.metadata["id"], field) for _, node, field in index.search(text, **options)]
+
+
+def test_typos_and_prefixes():
+    assert _search("authentcation")[0] == ("auth", "name")
+    # The last word is a prefix
+    assert _search("auth")[:2] == [("auth", "name"), ("auth.service", "name")]
+    assert _search("zzzz") == []
+
+
+def test_name_matches_rank_above_content():
+    # Equal name scores: the shorter name first; content matches after names
+    assert _search("authentication") == [("auth", "name"), ("auth.service", "name"), ("billing", "content")]
+    assert _search("tokens sessions") == [("auth.service", "content")]
+    assert _search("authentication", limit=1) == [("auth", "name")]
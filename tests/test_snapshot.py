@@ -0,0 +1,59 @@
+"""Tests for binary plan snapshots (planner_lib/snapshot.py)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+from planner_lib.md_parser import MarkdownParser
+from planner_lib.snapshot import dump_snapshot, load_snapshot, open_snapshot, save_snapshot
+
+PLAN = """# Plan
+- status: active
+- context_dependencies: {"conventions": "MD_CONVENTIONS.md"}
+<!-- content -->
+Überblick ✓
+
+## Setup
+- id: setup
+- blocked_by: [env, review]
+- estimate: 2d
+
+## Empty
+### Leaf
+- id: leaf
+Leaf body
+"""
+
+
+def _tree():
+    return MarkdownParser().parse_lines(PLAN.splitlines(True))
+
+
+def test_load_snapshot_round_trip():
+    root = _tree()
+    assert load_snapshot(dump_snapshot(root)).to_dict() == root.to_dict()
+
+
+def test_open_snapshot_reads_views(tmp_path):
+    root = _tree()
+    path = str(tmp_path / "plan.snap")
+    save_snapshot(root, path)
+    assert load_snapshot(path).to_dict() == root.to_dict()
+
+    with open_snapshot(path) as snapshot:
+        view = snapshot.root()
+        assert len(snapshot) == 4
+        assert view.title == "Plan" and view.content == "Überblick ✓"
+        setup = view.children[0]
+        assert setup.metadata == {"id": "setup", "blocked_by": ["env", "review"], "estimate": "2d"}
+        assert setup.metadata_location == root.children[0].metadata_location
+        assert view.to_dict() == root.to_dict()
+        assert snapshot.to_tree().to_dict() == root.to_dict()
+
+
+def test_load_snapshot_rejects_other_data():
+    with pytest.raises(ValueError):
+        load_snapshot(b"not a snapshot at all, just bytes")